@@ -0,0 +1,2 @@
+# benchmarks/__init__.py
+# Run individual benchmarks with: python -m benchmarks.<name> --help
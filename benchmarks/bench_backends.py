@@ -0,0 +1,216 @@
+# benchmarks/bench_backends.py
+"""
+Inference backends vs the float32 baseline.
+
+Each backend runs in a fresh interpreter (so memory is not shared between
+runs) and reports, for the generator and the embedding model:
+  - load time and resident memory after loading (peak RSS too)
+  - generation tokens/sec with greedy decoding on a fixed question set
+  - embedding texts/sec on a fixed sample of data_files/ chunks
+Agreement is measured against the `torch` run: exact-match rate and mean
+character similarity of the answers, mean / min cosine of the embeddings.
+
+Usage:
+    python -m benchmarks.bench_backends --backends torch int8 compile onnx --max-new-tokens 48
+"""
+import argparse
+import difflib
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+
+from benchmarks.bench_batching import QUESTIONS, _prompt
+from src.config import settings
+
+EMBED_SAMPLE = 256
+
+
+def _rss_mb() -> float:
+    """Current resident set size (Linux /proc); falls back to peak RSS."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        return _peak_rss_mb()
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def _embed_texts() -> List[str]:
+    from src.data_paths import list_data_files
+    from src.loaders import load_local_files
+
+    docs = load_local_files(sorted(list_data_files()))
+    texts = [d.page_content[:800] for d in docs if d.page_content.strip()]
+    return (QUESTIONS + texts)[:EMBED_SAMPLE]
+
+
+# ---------------------------------------------------------------------
+# --- One backend, in this process ---
+# ---------------------------------------------------------------------
+def run_worker(backend: str, max_new_tokens: int) -> Dict[str, Any]:
+    import torch
+
+    from src.registry import load_embeddings, load_llm
+
+    settings.embed_cache_enabled = False  # measure the model, not the cache
+    base_rss = _rss_mb()
+
+    t0 = time.perf_counter()
+    pipe = load_llm(backend).pipeline
+    llm_load_s = time.perf_counter() - t0
+    llm_rss = _rss_mb() - base_rss
+    model, tokenizer = pipe.model, pipe.tokenizer
+
+    def generate(prompt: str):
+        enc = tokenizer(prompt, return_tensors="pt").to(model.device)
+        with torch.inference_mode():
+            out = model.generate(
+                **enc, max_new_tokens=max_new_tokens, do_sample=False, pad_token_id=tokenizer.eos_token_id
+            )
+        new = out[0, enc["input_ids"].shape[1]:]
+        return tokenizer.decode(new, skip_special_tokens=True), int(new.shape[0])
+
+    generate(_prompt(0))  # warm-up (compilation / ORT session init) outside the timing
+    answers, tokens, gen_s = [], 0, 0.0
+    for i in range(len(QUESTIONS)):
+        t0 = time.perf_counter()
+        text, n = generate(_prompt(i))
+        gen_s += time.perf_counter() - t0
+        answers.append(text.strip())
+        tokens += n
+
+    rss_before_emb = _rss_mb()
+    t0 = time.perf_counter()
+    embeddings = load_embeddings(backend)
+    emb_load_s = time.perf_counter() - t0
+    emb_rss = _rss_mb() - rss_before_emb
+
+    texts = _embed_texts()
+    embeddings.embed_documents(texts[:8])  # warm-up
+    t0 = time.perf_counter()
+    vectors = embeddings.embed_documents(texts)
+    emb_s = time.perf_counter() - t0
+
+    return {
+        "backend": backend,
+        "llm": {
+            "load_s": round(llm_load_s, 2),
+            "rss_mb": round(llm_rss, 1),
+            "tokens": tokens,
+            "tokens_per_s": round(tokens / gen_s, 2) if gen_s else 0.0,
+            "answers": answers,
+        },
+        "embeddings": {
+            "load_s": round(emb_load_s, 2),
+            "rss_mb": round(emb_rss, 1),
+            "texts": len(texts),
+            "texts_per_s": round(len(texts) / emb_s, 1) if emb_s else 0.0,
+            "vectors": vectors,
+        },
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+    }
+
+
+# ---------------------------------------------------------------------
+# --- Driver ---
+# ---------------------------------------------------------------------
+def _run_isolated(backend: str, max_new_tokens: int) -> Dict[str, Any]:
+    with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as f:
+        out_path = f.name
+    try:
+        subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_backends", "--worker", backend,
+             "--max-new-tokens", str(max_new_tokens), "--worker-output", out_path],
+            check=True,
+        )
+        with open(out_path, encoding="utf-8") as f:
+            return json.load(f)
+    finally:
+        os.unlink(out_path)
+
+
+def _agreement(row: Dict[str, Any], baseline: Dict[str, Any]) -> Dict[str, float]:
+    a, b = row["llm"]["answers"], baseline["llm"]["answers"]
+    exact = sum(x == y for x, y in zip(a, b)) / len(b)
+    similarity = float(np.mean([difflib.SequenceMatcher(None, x, y).ratio() for x, y in zip(a, b)]))
+    va = np.asarray(row["embeddings"]["vectors"], dtype=np.float32)
+    vb = np.asarray(baseline["embeddings"]["vectors"], dtype=np.float32)
+    cos = (va * vb).sum(axis=1) / (np.linalg.norm(va, axis=1) * np.linalg.norm(vb, axis=1) + 1e-12)
+    return {
+        "answer_exact_match": round(exact, 3),
+        "answer_similarity": round(similarity, 3),
+        "embedding_cosine_mean": round(float(cos.mean()), 5),
+        "embedding_cosine_min": round(float(cos.min()), 5),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=["torch", "int8", "compile", "onnx"])
+    parser.add_argument("--max-new-tokens", type=int, default=48)
+    parser.add_argument("--output", help="Optional JSON file for the results")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--worker-output", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        result = run_worker(args.worker, args.max_new_tokens)
+        with open(args.worker_output, "w", encoding="utf-8") as f:
+            json.dump(result, f)
+        return
+
+    backends = ["torch"] + [b for b in args.backends if b != "torch"]
+    runs: Dict[str, Dict[str, Any]] = {}
+    for backend in backends:
+        print(f"\n=== {backend} ===")
+        try:
+            runs[backend] = _run_isolated(backend, args.max_new_tokens)
+        except subprocess.CalledProcessError as e:
+            print(f"[bench_backends] {backend} failed (exit {e.returncode}); skipping")
+
+    baseline = runs.get("torch")
+    results = []
+    print(f"\n{'backend':8s} {'llm tok/s':>10s} {'llm MB':>8s} {'emb txt/s':>10s} {'emb MB':>8s} "
+          f"{'exact':>6s} {'sim':>6s} {'cos min':>8s}")
+    for backend, row in runs.items():
+        agree = _agreement(row, baseline) if baseline else {}
+        results.append({
+            "backend": backend,
+            "llm": {k: v for k, v in row["llm"].items() if k != "answers"},
+            "embeddings": {k: v for k, v in row["embeddings"].items() if k != "vectors"},
+            "peak_rss_mb": row["peak_rss_mb"],
+            "agreement": agree,
+            "answers": row["llm"]["answers"],
+        })
+        print(
+            f"{backend:8s} {row['llm']['tokens_per_s']:>10.2f} {row['llm']['rss_mb']:>8.0f} "
+            f"{row['embeddings']['texts_per_s']:>10.1f} {row['embeddings']['rss_mb']:>8.0f} "
+            f"{agree.get('answer_exact_match', float('nan')):>6.2f} {agree.get('answer_similarity', float('nan')):>6.2f} "
+            f"{agree.get('embedding_cosine_min', float('nan')):>8.4f}"
+        )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({
+                "llm_model": settings.llm_model_name,
+                "embedding_model": settings.embedding_model_name,
+                "max_new_tokens": args.max_new_tokens,
+                "questions": QUESTIONS,
+                "results": results,
+            }, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
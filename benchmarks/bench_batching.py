@@ -0,0 +1,106 @@
+# benchmarks/bench_batching.py
+"""
+Micro-batching vs one-request-at-a-time generation.
+
+Drives the shared TinyLlama model from N concurrent client threads and
+reports requests/sec plus p50/p95 latency for:
+  - direct:  every client calls the HF pipeline itself (today's /chat path)
+  - batched: every client submits to BatchScheduler
+
+Usage:
+    python -m benchmarks.bench_batching --concurrency 1 4 16 64 --max-new-tokens 32
+"""
+import argparse
+import json
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List
+
+from src.config import settings
+from src.prompts import ANSWER_PROMPT, SYSTEM_PRIMER
+from src.registry import registry
+
+QUESTIONS = [
+    "Where can I buy ski passes?",
+    "What are the snow conditions today?",
+    "How do I get to Mt Hotham by bus?",
+    "Which restaurants are open in the village?",
+    "What safety rules apply on the mountain?",
+    "Is there accommodation near the lifts?",
+    "How many visitors did Mt Hotham have in 2019?",
+    "Where can I park my car?",
+]
+
+CONTEXT = "Mt Hotham is an alpine resort in Victoria, Australia."
+
+
+def _prompt(i: int) -> str:
+    return ANSWER_PROMPT.format(system_primer=SYSTEM_PRIMER, question=QUESTIONS[i % len(QUESTIONS)], context=CONTEXT)
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[idx]
+
+
+def _drive(call: Callable[[str], str], concurrency: int, total: int) -> Dict[str, float]:
+    latencies: List[float] = []
+
+    def one(i: int) -> None:
+        t0 = time.perf_counter()
+        call(_prompt(i))
+        latencies.append(time.perf_counter() - t0)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(total)))
+    elapsed = time.perf_counter() - start
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "req_per_s": round(total / elapsed, 3),
+        "p50_s": round(statistics.median(latencies), 3),
+        "p95_s": round(_percentile(latencies, 95), 3),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--requests-per-client", type=int, default=2)
+    parser.add_argument("--max-new-tokens", type=int, default=32)
+    parser.add_argument("--output", help="Optional JSON file for the results")
+    args = parser.parse_args()
+
+    pipe = registry.llm().pipeline
+    scheduler = registry.scheduler()
+
+    def direct(prompt: str) -> str:
+        return pipe(prompt, max_new_tokens=args.max_new_tokens, return_full_text=False)[0]["generated_text"]
+
+    def batched(prompt: str) -> str:
+        return scheduler.submit(prompt, max_new_tokens=args.max_new_tokens, timeout=settings.generation_timeout_s)
+
+    direct(_prompt(0))  # warm-up outside the measurements
+
+    results = []
+    for c in args.concurrency:
+        total = c * args.requests_per_client
+        for mode, call in (("direct", direct), ("batched", batched)):
+            row = {"mode": mode, **_drive(call, c, total)}
+            results.append(row)
+            print(
+                f"{mode:8s} c={c:<3d} n={total:<4d} {row['req_per_s']:>8.3f} req/s  "
+                f"p50={row['p50_s']:.3f}s  p95={row['p95_s']:.3f}s"
+            )
+
+    print(f"scheduler: {scheduler.stats()}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"model": settings.llm_model_name, "max_new_tokens": args.max_new_tokens, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
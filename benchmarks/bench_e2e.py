@@ -0,0 +1,248 @@
+# benchmarks/bench_e2e.py
+"""
+End-to-end benchmark of the FastAPI app, driven in-process.
+
+src.api:app runs under Starlette's TestClient (no uvicorn, no network)
+against a throwaway data directory, and the run reports:
+  - ingest:    POST /ingest (full rebuild of data_files/) until the job
+               finishes, with the job's per-stage timings and throughput
+  - retrieval: query embedding + hybrid search + context packing per
+               workload question (no generation)
+  - chat:      POST /chat latency (p50/p95/p99) and requests/sec at each
+               --concurrency level
+  - stages:    mean ms per pipeline stage from the /metrics histograms
+Workload: the evaluation questions quoted in README.md plus the titles in
+requests.jsonl.
+
+The default `stub` backend (echo LLM, hashed embeddings) needs no model
+downloads, so runs are deterministic and work offline; --token-delay-ms
+makes the stub LLM sleep per generated word to mimic decoding. Pass
+--llm-backend torch --embedding-backend torch to measure the real models.
+Write --output JSON files and diff them between commits.
+
+Usage:
+    python -m benchmarks.bench_e2e --concurrency 1 4 16 --output bench_e2e.json
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+ROOT = Path(__file__).resolve().parent.parent
+_QUOTED_RE = re.compile(r"^“(.+\?)”\s*$", re.MULTILINE)
+
+
+# ---------------------------------------------------------------------
+# --- Workload ---
+# ---------------------------------------------------------------------
+def load_workload(readme: Path, requests_file: Path) -> List[str]:
+    """README evaluation questions, then the request titles (duplicates dropped)."""
+    questions: List[str] = []
+    if readme.exists():
+        questions += _QUOTED_RE.findall(readme.read_text(encoding="utf-8"))
+    if requests_file.exists():
+        for line in requests_file.read_text(encoding="utf-8").splitlines():
+            if line.strip():
+                row = json.loads(line)
+                text = row.get("message") or row.get("question") or row.get("title")
+                if text:
+                    questions.append(text)
+    return list(dict.fromkeys(questions))
+
+
+def _configure(args: argparse.Namespace, workdir: str) -> None:
+    """Point settings at a scratch data dir; must run before anything imports src.config."""
+    os.environ.update({
+        "DATA_DIR": workdir,
+        "CHROMA_DIR": os.path.join(workdir, "chroma"),
+        "EMBED_CACHE_DIR": os.path.join(workdir, "embed_cache"),
+        "CRAWL_CACHE_DIR": os.path.join(workdir, "crawl_cache"),
+        "LLM_BACKEND": args.llm_backend,
+        "EMBEDDING_BACKEND": args.embedding_backend,
+        "PRELOAD_MODELS": "false",
+        "ANSWER_CACHE_ENABLED": str(args.answer_cache).lower(),
+        "BATCHING_ENABLED": str(args.batching).lower(),
+    })
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        )
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _latency_summary(latencies: List[float]) -> Dict[str, float]:
+    from benchmarks.bench_batching import _percentile
+
+    return {
+        "p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "p95_ms": round(_percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(_percentile(latencies, 99) * 1000, 2),
+        "mean_ms": round(statistics.mean(latencies) * 1000, 2),
+    }
+
+
+# ---------------------------------------------------------------------
+# --- Phases ---
+# ---------------------------------------------------------------------
+def bench_ingest(client, timeout_s: float) -> Dict[str, Any]:
+    t0 = time.perf_counter()
+    job = client.post("/ingest", json={"full_rebuild": True}).json()
+    while True:
+        status = client.get(job["status_url"]).json()
+        if status["status"] in ("succeeded", "failed"):
+            break
+        if time.perf_counter() - t0 > timeout_s:
+            raise TimeoutError(f"ingest job {job['job_id']} still {status['status']} after {timeout_s}s")
+        time.sleep(0.05)
+    result = status.get("result") or {}
+    return {
+        "status": status["status"],
+        "error": status.get("error"),
+        "wall_s": round(time.perf_counter() - t0, 3),
+        "chunks_added": result.get("added"),
+        "timings": result.get("timings"),
+        "throughput": result.get("throughput"),
+    }
+
+
+def bench_retrieval(questions: List[str], repeats: int) -> Dict[str, Any]:
+    from src.rag_chain import _retrieve
+    from src.router import route_intent
+
+    inputs = [{"question": q, "intent": route_intent(q), "facts": None} for q in questions]
+    _retrieve(inputs[0])  # warm-up: opens Chroma, loads the BM25 sidecar
+    latencies, docs = [], []
+    for _ in range(repeats):
+        for x in inputs:
+            t0 = time.perf_counter()
+            docs.append(len(_retrieve(dict(x))))
+            latencies.append(time.perf_counter() - t0)
+    return {"queries": len(latencies), "mean_docs": round(statistics.mean(docs), 2), **_latency_summary(latencies)}
+
+
+def bench_chat(client, questions: List[str], concurrency: int, per_client: int) -> Dict[str, Any]:
+    total = concurrency * per_client
+    latencies: List[float] = []
+    errors: List[int] = []
+
+    def one(i: int) -> None:
+        t0 = time.perf_counter()
+        r = client.post("/chat", json={"message": questions[i % len(questions)]})
+        latencies.append(time.perf_counter() - t0)
+        if r.status_code != 200:
+            errors.append(r.status_code)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(total)))
+    elapsed = time.perf_counter() - start
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "errors": len(errors),
+        "req_per_s": round(total / elapsed, 2),
+        **_latency_summary(latencies),
+    }
+
+
+def stage_summary() -> Dict[str, Dict[str, float]]:
+    from src import metrics
+
+    out: Dict[str, Dict[str, float]] = {}
+    for (pipeline, stage), (count, total) in sorted(metrics.STAGE_SECONDS.totals().items()):
+        out[f"{pipeline}.{stage}"] = {"count": count, "mean_ms": round(total / count * 1000, 3) if count else 0.0}
+    return out
+
+
+# ---------------------------------------------------------------------
+# --- Driver ---
+# ---------------------------------------------------------------------
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--llm-backend", default="stub")
+    parser.add_argument("--embedding-backend", default="stub")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--requests-per-client", type=int, default=4)
+    parser.add_argument("--retrieval-repeats", type=int, default=3)
+    parser.add_argument("--token-delay-ms", type=float, default=0.0, help="Stub LLM sleep per generated word")
+    parser.add_argument("--answer-cache", action="store_true", help="Keep the answer cache on (off by default)")
+    parser.add_argument("--batching", action="store_true", help="Micro-batch generation (needs a real model)")
+    parser.add_argument("--ingest-timeout-s", type=float, default=1800)
+    parser.add_argument("--readme", default=str(ROOT / "README.md"))
+    parser.add_argument("--requests-file", default=str(ROOT / "requests.jsonl"))
+    parser.add_argument("--workdir", help="Scratch data dir (default: a temporary directory)")
+    parser.add_argument("--output", help="Optional JSON file for the results")
+    args = parser.parse_args()
+
+    questions = load_workload(Path(args.readme), Path(args.requests_file))
+    if not questions:
+        parser.error("empty workload: no README questions and no requests.jsonl entries found")
+
+    with tempfile.TemporaryDirectory(prefix="bench_e2e_") as tmp:
+        _configure(args, args.workdir or tmp)
+        from fastapi.testclient import TestClient
+
+        from src.api import app
+        from src.config import settings
+        from src.registry import registry
+
+        with TestClient(app) as client:
+            print(f"🔹 Workload: {len(questions)} questions; backends llm={args.llm_backend} "
+                  f"embeddings={args.embedding_backend}")
+            ingest = bench_ingest(client, args.ingest_timeout_s)
+            print(f"   ingest     {ingest['status']} in {ingest['wall_s']:.2f}s (+{ingest['chunks_added']} chunks)")
+            if ingest["status"] != "succeeded":
+                raise SystemExit(f"ingest failed: {ingest['error']}")
+
+            retrieval = bench_retrieval(questions, args.retrieval_repeats)
+            print(f"   retrieval  p50={retrieval['p50_ms']:.1f} ms  p95={retrieval['p95_ms']:.1f} ms")
+
+            if args.llm_backend == "stub":
+                registry.llm().token_delay_s = args.token_delay_ms / 1000
+            client.post("/chat", json={"message": questions[0]})  # warm-up
+            chat = []
+            for c in args.concurrency:
+                row = bench_chat(client, questions, c, args.requests_per_client)
+                chat.append(row)
+                print(f"   chat c={c:<4d} {row['req_per_s']:>8.2f} req/s  p50={row['p50_ms']:.1f} ms  "
+                      f"p95={row['p95_ms']:.1f} ms  errors={row['errors']}")
+
+        result = {
+            "commit": _git_commit(),
+            "config": {
+                "llm_backend": args.llm_backend,
+                "embedding_backend": args.embedding_backend,
+                "llm_model": settings.llm_model_name if args.llm_backend != "stub" else "stub",
+                "embedding_model": settings.embedding_model_name if args.embedding_backend != "stub" else "stub",
+                "token_delay_ms": args.token_delay_ms,
+                "answer_cache": args.answer_cache,
+                "batching": args.batching,
+                "context_packing": settings.context_packing_enabled,
+                "hybrid": settings.hybrid_enabled,
+            },
+            "workload": {"questions": len(questions)},
+            "ingest": ingest,
+            "retrieval": retrieval,
+            "chat": chat,
+            "stages": stage_summary(),
+        }
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
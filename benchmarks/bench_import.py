@@ -0,0 +1,113 @@
+# benchmarks/bench_import.py
+"""
+Cold import time of the service entry points, via `python -X importtime`.
+
+Each module is imported in a fresh interpreter a few times; the median
+cumulative import time is checked against a budget, and the run fails if
+any heavy ML dependency (torch, transformers, Chroma, ...) was imported.
+This is what a worker restart / autoscaled cold start pays before it can
+answer /health.
+
+Usage:
+    python -m benchmarks.bench_import
+    python -m benchmarks.bench_import --runs 5 --top 15 --output import_times.json
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+# Median cumulative import time (ms) allowed per entry point
+BUDGETS_MS = {
+    "src.api": 900.0,
+    "src.main": 400.0,
+    "src.ingest": 500.0,
+}
+
+# Must only be imported by the code paths that actually load a model / index
+HEAVY_MODULES = (
+    "torch", "transformers", "sentence_transformers", "chromadb",
+    "langchain_community", "langchain_core", "pandas",
+)
+
+
+def _importtime(module: str) -> Tuple[float, Dict[str, float], List[str]]:
+    """
+    One fresh-interpreter import: (total ms, {module: cumulative ms} for the
+    imports made directly by the entry point, every module name imported).
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, check=True,
+    )
+    total = 0.0
+    direct: Dict[str, float] = {}
+    names: List[str] = []
+    for line in proc.stderr.splitlines():
+        fields = line[len("import time:"):].split("|")
+        if not line.startswith("import time:") or len(fields) != 3 or "cumulative" in line:
+            continue
+        ms = int(fields[1]) / 1000.0
+        raw = fields[2][1:]
+        depth = (len(raw) - len(raw.lstrip())) // 2
+        name = raw.strip()
+        names.append(name)
+        if depth == 0:  # the statement's own imports (e.g. `src`, then `src.api`)
+            total += ms
+        elif depth == 1:
+            direct[name] = direct.get(name, 0.0) + ms
+    return total, direct, names
+
+
+def measure(module: str, runs: int) -> Dict[str, object]:
+    totals: List[float] = []
+    direct: Dict[str, float] = {}
+    names: List[str] = []
+    for _ in range(runs):
+        total, direct, names = _importtime(module)
+        totals.append(total)
+    heavy = sorted({n.split(".")[0] for n in names} & set(HEAVY_MODULES))
+    return {
+        "module": module,
+        "median_ms": round(statistics.median(totals), 1),
+        "min_ms": round(min(totals), 1),
+        "budget_ms": BUDGETS_MS.get(module),
+        "heavy_imports": heavy,
+        "direct_imports_ms": dict(sorted(((k, round(v, 1)) for k, v in direct.items()), key=lambda kv: -kv[1])),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modules", nargs="+", default=list(BUDGETS_MS))
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=8, help="Show the N most expensive top-level imports")
+    parser.add_argument("--output", help="Optional JSON file for the results")
+    args = parser.parse_args()
+
+    results = []
+    failed = False
+    for module in args.modules:
+        row = measure(module, args.runs)
+        results.append(row)
+        budget = row["budget_ms"]
+        over = budget is not None and row["median_ms"] > budget
+        failed = failed or over or bool(row["heavy_imports"])
+        verdict = "OVER BUDGET" if over else "ok"
+        print(f"{module:12s} median={row['median_ms']:>8.1f} ms  min={row['min_ms']:>8.1f} ms  "
+              f"budget={budget if budget is not None else '-':>6} ms  {verdict}")
+        if row["heavy_imports"]:
+            print(f"  ✗ heavy modules imported: {', '.join(row['heavy_imports'])}")
+        for name, ms in list(row["direct_imports_ms"].items())[:args.top]:
+            print(f"    {name:28s} {ms:>8.1f} ms")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"python": sys.version.split()[0], "runs": args.runs, "results": results}, f, indent=2)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
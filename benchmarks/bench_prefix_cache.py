@@ -0,0 +1,131 @@
+# benchmarks/bench_prefix_cache.py
+"""
+Time-to-first-token with and without the static-prefix KV cache.
+
+TTFT is measured as a greedy generate() of one new token, i.e. prefill
+plus one decode step:
+  - full:   tokenize the whole prompt and prefill every token
+  - cached: start from PrefixKVCache and prefill only question + context
+for single prompts and for one padded batch. A greedy run of
+--check-tokens tokens per question verifies that both paths produce the
+same text.
+
+Usage:
+    python -m benchmarks.bench_prefix_cache --repeats 5 --batch-size 8
+"""
+import argparse
+import json
+import statistics
+import time
+from typing import Callable, Dict, List
+
+import torch
+
+from benchmarks.bench_batching import QUESTIONS, _percentile, _prompt
+from src.config import settings
+from src.prefix_cache import PrefixKVCache
+from src.prompts import STATIC_PREFIX
+from src.registry import registry
+
+
+def _timed(fn: Callable[[], object], repeats: int) -> List[float]:
+    out = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        out.append(time.perf_counter() - t0)
+    return out
+
+
+def _summary(latencies: List[float]) -> Dict[str, float]:
+    return {
+        "p50_ms": round(statistics.median(latencies) * 1000, 1),
+        "p95_ms": round(_percentile(latencies, 95) * 1000, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--check-tokens", type=int, default=24)
+    parser.add_argument("--output", help="Optional JSON file for the results")
+    args = parser.parse_args()
+
+    pipe = registry.llm().pipeline
+    model, tokenizer = pipe.model, pipe.tokenizer
+    tokenizer.padding_side = "left"
+    if tokenizer.pad_token is None:
+        tokenizer.pad_token = tokenizer.eos_token
+    greedy = {"do_sample": False, "pad_token_id": tokenizer.pad_token_id}
+
+    t0 = time.perf_counter()
+    prefix = PrefixKVCache(model, tokenizer, STATIC_PREFIX)
+    build_s = time.perf_counter() - t0
+    prompts = [_prompt(i) for i in range(len(QUESTIONS))]
+    prompt_tokens = [len(tokenizer(p)["input_ids"]) for p in prompts]
+
+    def full(prompt: str, n: int):
+        enc = tokenizer(prompt, return_tensors="pt").to(model.device)
+        with torch.inference_mode():
+            return model.generate(**enc, max_new_tokens=n, **greedy)[0, enc["input_ids"].shape[1]:]
+
+    def cached(prompt: str, n: int):
+        kwargs = prefix.prepare(prompt)
+        with torch.inference_mode():
+            return model.generate(**kwargs, max_new_tokens=n, **greedy)[0, kwargs["input_ids"].shape[1]:]
+
+    full(prompts[0], 1)
+    cached(prompts[0], 1)  # warm-up outside the measurements
+
+    single = {"full": [], "cached": []}
+    for p in prompts:
+        single["full"] += _timed(lambda: full(p, 1), args.repeats)
+        single["cached"] += _timed(lambda: cached(p, 1), args.repeats)
+
+    batch = [prompts[i % len(prompts)] for i in range(args.batch_size)]
+
+    def full_batch():
+        enc = tokenizer(batch, return_tensors="pt", padding=True).to(model.device)
+        with torch.inference_mode():
+            model.generate(**enc, max_new_tokens=1, **greedy)
+
+    def cached_batch():
+        kwargs = prefix.prepare_batch(batch)
+        with torch.inference_mode():
+            model.generate(**kwargs, max_new_tokens=1, **greedy)
+
+    batched = {"full": _timed(full_batch, args.repeats), "cached": _timed(cached_batch, args.repeats)}
+
+    same = [
+        tokenizer.decode(full(p, args.check_tokens), skip_special_tokens=True)
+        == tokenizer.decode(cached(p, args.check_tokens), skip_special_tokens=True)
+        for p in prompts
+    ]
+
+    result = {
+        "model": settings.llm_model_name,
+        "prefix_tokens": prefix.length,
+        "prefix_build_ms": round(build_s * 1000, 1),
+        "mean_prompt_tokens": round(statistics.mean(prompt_tokens), 1),
+        "single": {mode: _summary(v) for mode, v in single.items()},
+        "batched": {"batch_size": args.batch_size, **{mode: _summary(v) for mode, v in batched.items()}},
+        "greedy_agreement": round(sum(same) / len(same), 3),
+        "cache": prefix.stats(),
+    }
+    result["single"]["ttft_speedup"] = round(result["single"]["full"]["p50_ms"] / result["single"]["cached"]["p50_ms"], 2)
+    result["batched"]["speedup"] = round(result["batched"]["full"]["p50_ms"] / result["batched"]["cached"]["p50_ms"], 2)
+
+    print(f"prefix: {prefix.length} of ~{result['mean_prompt_tokens']} prompt tokens (built in {result['prefix_build_ms']} ms)")
+    for label, block in (("single", result["single"]), (f"batch={args.batch_size}", result["batched"])):
+        print(f"{label:10s} full p50={block['full']['p50_ms']:>8.1f} ms  cached p50={block['cached']['p50_ms']:>8.1f} ms  "
+              f"speedup x{block.get('ttft_speedup', block.get('speedup'))}")
+    print(f"greedy agreement over {len(same)} prompts: {result['greedy_agreement']:.0%}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
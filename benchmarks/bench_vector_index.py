@@ -0,0 +1,151 @@
+# benchmarks/bench_vector_index.py
+"""
+Chroma vs the memory-mapped vector index (exact and IVF).
+
+The data_files/ chunks are embedded once (settings' embedding backend;
+EMBEDDING_BACKEND=stub runs offline) and the same vectors are loaded into
+each store in a scratch directory. Per store it reports:
+  - build_s:   add + persist
+  - open_ms:   cold open of the persisted index (new handle, first search)
+  - search:    p50/p95 of top-k search latency over the chunk texts as queries
+  - recall@k:  overlap with exact brute-force top-k
+  - disk_mb:   size of the index directory
+
+Usage:
+    python -m benchmarks.bench_vector_index --k 4 --nlist 4 --nprobe 2
+"""
+import argparse
+import json
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from benchmarks.bench_batching import _percentile
+from src.config import settings
+
+MAX_QUERIES = 200
+
+
+class _Precomputed(Embeddings):
+    """Serves vectors computed up front so every store is fed identical inputs."""
+
+    def __init__(self, texts: List[str], vectors: List[List[float]], fallback: Embeddings):
+        self.table = dict(zip(texts, vectors))
+        self.fallback = fallback
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self.table.get(t) or self.fallback.embed_query(t) for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.table.get(text) or self.fallback.embed_query(text)
+
+
+def _disk_mb(path: Path) -> float:
+    return sum(f.stat().st_size for f in path.rglob("*") if f.is_file()) / 2**20
+
+
+def _bench_store(
+    name: str, open_store: Callable[[], Any], ids: List[str], texts: List[str], metas: List[dict],
+    queries: np.ndarray, exact: List[set], k: int, directory: Path,
+) -> Dict[str, Any]:
+    t0 = time.perf_counter()
+    store = open_store()
+    for i in range(0, len(texts), settings.ingest_batch_size):
+        j = i + settings.ingest_batch_size
+        store.add_texts(texts[i:j], metadatas=metas[i:j], ids=ids[i:j])
+    store.persist()
+    build_s = time.perf_counter() - t0
+    del store
+
+    t0 = time.perf_counter()
+    store = open_store()
+    store.similarity_search_by_vector_with_relevance_scores(queries[0].tolist(), k=k)
+    open_ms = (time.perf_counter() - t0) * 1000
+
+    latencies, recalls = [], []
+    for q, truth in zip(queries, exact):
+        t0 = time.perf_counter()
+        hits = store.similarity_search_by_vector_with_relevance_scores(q.tolist(), k=k)
+        latencies.append(time.perf_counter() - t0)
+        recalls.append(len({d.page_content for d, _ in hits} & truth) / len(truth))
+    row = {
+        "store": name,
+        "build_s": round(build_s, 3),
+        "open_ms": round(open_ms, 2),
+        "search_p50_ms": round(statistics.median(latencies) * 1000, 3),
+        "search_p95_ms": round(_percentile(latencies, 95) * 1000, 3),
+        f"recall@{k}": round(float(np.mean(recalls)), 4),
+        "disk_mb": round(_disk_mb(directory), 2),
+    }
+    print(f"{name:12s} build={row['build_s']:>7.3f}s open={row['open_ms']:>8.2f}ms "
+          f"p50={row['search_p50_ms']:>8.3f}ms p95={row['search_p95_ms']:>8.3f}ms "
+          f"recall={row[f'recall@{k}']:.3f} disk={row['disk_mb']:.2f}MB")
+    return row
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--nlist", type=int, default=4, help="IVF lists for the mmap+ivf run")
+    parser.add_argument("--nprobe", type=int, default=2)
+    parser.add_argument("--output", help="Optional JSON file for the results")
+    args = parser.parse_args()
+
+    from langchain_community.vectorstores import Chroma
+
+    from src.data_paths import list_data_files
+    from src.ingest import _chunk_with_ids
+    from src.loaders import load_local_files
+    from src.registry import COLLECTION_NAME, load_embeddings
+    from src.vector_index import MmapVectorStore, _normalize
+
+    ids, chunks = _chunk_with_ids(load_local_files(sorted(list_data_files())))
+    texts, metas = [c.page_content for c in chunks], [c.metadata for c in chunks]
+    base = load_embeddings()
+    t0 = time.perf_counter()
+    vectors = base.embed_documents(texts)
+    embed_s = time.perf_counter() - t0
+    embeddings = _Precomputed(texts, vectors, base)
+    print(f"🔹 {len(texts)} chunks embedded in {embed_s:.2f}s ({settings.embedding_model_name}, "
+          f"backend={settings.embedding_backend})")
+
+    matrix = _normalize(np.asarray(vectors, dtype=np.float32))
+    step = max(1, len(texts) // MAX_QUERIES)
+    queries = matrix[::step][:MAX_QUERIES]
+    exact = [{texts[i] for i in np.argsort(-(matrix @ q))[: args.k]} for q in queries]
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="bench_vector_index_") as tmp:
+        stores = {
+            "chroma": lambda d: Chroma(persist_directory=str(d), embedding_function=embeddings,
+                                       collection_name=COLLECTION_NAME),
+            "mmap": lambda d: MmapVectorStore(str(d), embeddings),
+            "mmap+ivf": lambda d: MmapVectorStore(str(d), embeddings, nlist=args.nlist, nprobe=args.nprobe),
+        }
+        for name, factory in stores.items():
+            directory = Path(tmp) / name.replace("+", "_")
+            results.append(_bench_store(
+                name, lambda: factory(directory), ids, texts, metas, queries, exact, args.k, directory
+            ))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({
+                "embedding_model": settings.embedding_model_name,
+                "embedding_backend": settings.embedding_backend,
+                "chunks": len(texts),
+                "queries": len(queries),
+                "k": args.k,
+                "nlist": args.nlist,
+                "nprobe": args.nprobe,
+                "results": results,
+            }, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+# src/admission.py
+"""
+Admission control for the answer endpoints.
+
+Generation used to run on FastAPI's shared threadpool with no bound, so a
+burst of /chat requests queued unlimited work behind the model and starved
+/health. An AdmissionQueue instead runs answers on its own executor of
+`concurrency` threads. At most `max_queue` further requests wait for a
+slot, each for at most `queue_timeout_s`. Anything beyond that is rejected
+at once with Overloaded (503 + Retry-After at the API). A running request
+has a deadline; when it passes, the caller gets TimeoutError (504). The
+slot is only freed once the worker thread really finishes, so the pool
+never oversubscribes the model.
+
+    result = await chat_queue.run(answer, question)       # one call
+    chat_queue.check()                                     # a stream: 503 up front,
+    async with chat_queue.admit():                         # slot taken in the body
+        item = await chat_queue.call(next, it, None)
+
+Queue depth, running count, wait time and rejections go to /metrics and
+stats().
+"""
+import asyncio
+import contextvars
+import functools
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, Optional
+
+from src import metrics
+
+
+class Overloaded(RuntimeError):
+    """No execution slot available; retry after `retry_after` seconds."""
+
+    def __init__(self, message: str, retry_after: int = 1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class AdmissionQueue:
+    def __init__(
+        self, name: str, concurrency: int, max_queue: int, queue_timeout_s: float, deadline_s: float
+    ):
+        self.name = name
+        self.concurrency = max(1, concurrency)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout_s = queue_timeout_s
+        self.deadline_s = deadline_s
+        self._executor = ThreadPoolExecutor(self.concurrency, thread_name_prefix=f"{name}-worker")
+        # Counters are only touched from the event loop thread. asyncio
+        # primitives bind to one loop; recreated if the app is served from a
+        # new loop (e.g. a second TestClient)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.waiting = 0
+        self.running = 0
+        self.admitted = 0
+        self.rejected = 0
+        self._avg_service_s = 0.0
+        self._publish()
+
+    # -- bookkeeping ---------------------------------------------------
+    def _semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop, self._slots = loop, asyncio.Semaphore(self.concurrency)
+        return self._slots
+
+    def _publish(self) -> None:
+        metrics.ADMISSION_DEPTH.set(self.waiting, queue=self.name, state="waiting")
+        metrics.ADMISSION_DEPTH.set(self.running, queue=self.name, state="running")
+
+    def _reject(self, reason: str, message: str) -> Overloaded:
+        self.rejected += 1
+        metrics.ADMISSION_REJECTED.inc(queue=self.name, reason=reason)
+        return Overloaded(message, self.retry_after())
+
+    def retry_after(self) -> int:
+        """Seconds until the current backlog should have drained (at least 1)."""
+        backlog = self.waiting + self.running
+        return max(1, math.ceil(self._avg_service_s * backlog / self.concurrency))
+
+    def _finished(self, service_s: float) -> None:
+        # EWMA of time per admitted request, for Retry-After
+        prev = self._avg_service_s
+        self._avg_service_s = service_s if not prev else 0.8 * prev + 0.2 * service_s
+
+    async def _acquire(self) -> float:
+        self.check()
+        slots = self._semaphore()
+        self.waiting += 1
+        self._publish()
+        t0 = time.perf_counter()
+        try:
+            await asyncio.wait_for(slots.acquire(), timeout=self.queue_timeout_s)
+        except asyncio.TimeoutError:
+            raise self._reject("queue_timeout", f"no {self.name} slot within {self.queue_timeout_s}s") from None
+        finally:
+            self.waiting -= 1
+            metrics.ADMISSION_WAIT_SECONDS.observe(time.perf_counter() - t0, queue=self.name)
+            self._publish()
+        self.admitted += 1
+        self.running += 1
+        self._publish()
+        return time.perf_counter()
+
+    def _release(self, started: float) -> None:
+        self.running -= 1
+        self._finished(time.perf_counter() - started)
+        self._slots.release()
+        self._publish()
+
+    # -- API -----------------------------------------------------------
+    def check(self) -> None:
+        """Raise Overloaded if the queue is full right now; takes no slot (call from the event loop)."""
+        if self._semaphore().locked() and self.waiting >= self.max_queue:
+            raise self._reject("queue_full", f"{self.name} queue full ({self.max_queue} waiting)")
+
+    @asynccontextmanager
+    async def admit(self) -> AsyncIterator[None]:
+        """Hold one execution slot for the block, or raise Overloaded."""
+        started = await self._acquire()
+        try:
+            yield
+        finally:
+            self._release(started)
+
+    async def call(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Run `fn` on the dedicated executor (caller must hold a slot), with contextvars."""
+        ctx = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor, functools.partial(ctx.run, fn, *args, **kwargs)
+        )
+
+    async def run(self, fn: Callable[..., Any], *args: Any, deadline_s: Optional[float] = None, **kwargs: Any) -> Any:
+        """Admit, run `fn` in the pool and wait up to the deadline (TimeoutError after)."""
+        deadline_s = min(deadline_s or self.deadline_s, self.deadline_s)
+        started = await self._acquire()
+        # The worker thread cannot be interrupted, so its slot is released
+        # when it returns, not when the caller gives up (deadline/disconnect)
+        future = asyncio.ensure_future(self.call(fn, *args, **kwargs))
+        future.add_done_callback(lambda _: self._release(started))
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout=deadline_s)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"Answer did not finish within {deadline_s}s") from None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "concurrency": self.concurrency,
+            "max_queue": self.max_queue,
+            "waiting": self.waiting,
+            "running": self.running,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "avg_service_s": round(self._avg_service_s, 3),
+        }
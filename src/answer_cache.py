@@ -0,0 +1,141 @@
+# src/answer_cache.py
+"""
+Two-level answer cache in front of rag_chain.answer().
+
+Level 1: exact match on (normalized question, intent).
+Level 2: near-duplicate match — cosine similarity between the query
+embedding and cached query embeddings (one matrix-vector product over
+a preallocated array), restricted to the same intent.
+
+Entries expire by TTL, are evicted LRU, and the whole cache is dropped
+whenever the ingest generation changes.
+"""
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.generation import current_generation
+
+
+def normalize_question(question: str) -> str:
+    q = " ".join(question.lower().split())
+    return re.sub(r"[\s?!.]+$", "", q)
+
+
+class AnswerCache:
+    def __init__(self, max_entries: int = 512, ttl_s: float = 900.0, similarity_threshold: float = 0.92):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.similarity_threshold = similarity_threshold
+        self._lock = threading.Lock()
+        self._generation = current_generation()
+        # (normalized question, intent) -> (slot, payload); order = LRU
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[int, Dict[str, Any]]]" = OrderedDict()
+        self._slot_keys: Dict[int, Tuple[str, str]] = {}
+        self._free = list(range(max_entries - 1, -1, -1))
+        self._vecs: Optional[np.ndarray] = None  # (max_entries, dim), rows L2-normalized
+        self._active = np.zeros(max_entries, dtype=bool)
+        self._expires = np.zeros(max_entries, dtype=np.float64)
+        self._intent_ids = np.full(max_entries, -1, dtype=np.int32)
+        self._intents: Dict[str, int] = {}
+        self.hits = {"exact": 0, "semantic": 0}
+        self.misses = 0
+
+    # -- internals -----------------------------------------------------
+    def _check_generation(self) -> None:
+        gen = current_generation()
+        if gen != self._generation:
+            self._clear()
+            self._generation = gen
+
+    def _clear(self) -> None:
+        self._entries.clear()
+        self._slot_keys.clear()
+        self._free = list(range(self.max_entries - 1, -1, -1))
+        self._active[:] = False
+
+    def _drop(self, key: Tuple[str, str]) -> None:
+        slot, _ = self._entries.pop(key)
+        self._slot_keys.pop(slot, None)
+        self._active[slot] = False
+        self._free.append(slot)
+
+    def _intent_id(self, intent: str) -> int:
+        return self._intents.setdefault(intent, len(self._intents))
+
+    @staticmethod
+    def _unit(vector: Sequence[float]) -> np.ndarray:
+        v = np.asarray(vector, dtype=np.float32)
+        n = float(np.linalg.norm(v))
+        return v / n if n else v
+
+    # -- public API ----------------------------------------------------
+    def get_exact(self, question: str, intent: str) -> Optional[Dict[str, Any]]:
+        key = (normalize_question(question), intent)
+        with self._lock:
+            self._check_generation()
+            hit = self._entries.get(key)
+            if hit is None:
+                return None
+            slot, payload = hit
+            if self._expires[slot] < time.time():
+                self._drop(key)
+                return None
+            self._entries.move_to_end(key)
+            self.hits["exact"] += 1
+            return payload
+
+    def get_similar(self, vector: Sequence[float], intent: str) -> Optional[Tuple[Dict[str, Any], float]]:
+        with self._lock:
+            self._check_generation()
+            if self._vecs is None or intent not in self._intents:
+                self.misses += 1
+                return None
+            mask = self._active & (self._intent_ids == self._intents[intent]) & (self._expires >= time.time())
+            if not mask.any():
+                self.misses += 1
+                return None
+            sims = self._vecs @ self._unit(vector)
+            sims[~mask] = -1.0
+            slot = int(np.argmax(sims))
+            score = float(sims[slot])
+            if score < self.similarity_threshold:
+                self.misses += 1
+                return None
+            key = self._slot_keys[slot]
+            self._entries.move_to_end(key)
+            self.hits["semantic"] += 1
+            return self._entries[key][1], score
+
+    def put(self, question: str, intent: str, vector: Optional[Sequence[float]], payload: Dict[str, Any]) -> None:
+        key = (normalize_question(question), intent)
+        with self._lock:
+            self._check_generation()
+            if key in self._entries:
+                self._drop(key)
+            if not self._free:
+                self._drop(next(iter(self._entries)))  # least recently used
+            slot = self._free.pop()
+            if vector is not None:
+                unit = self._unit(vector)
+                if self._vecs is None:
+                    self._vecs = np.zeros((self.max_entries, unit.shape[0]), dtype=np.float32)
+                self._vecs[slot] = unit
+                self._active[slot] = True
+            self._expires[slot] = time.time() + self.ttl_s
+            self._intent_ids[slot] = self._intent_id(intent)
+            self._entries[key] = (slot, payload)
+            self._slot_keys[slot] = key
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "generation": self._generation,
+            "hits_exact": self.hits["exact"],
+            "hits_semantic": self.hits["semantic"],
+            "misses": self.misses,
+        }
@@ -1,16 +1,45 @@
 # src/api.py
-from fastapi import FastAPI, Body, Query
+import json
+import threading
+import time
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Body, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel, Field
 from typing import List, Optional
 from datetime import datetime
 from zoneinfo import ZoneInfo
 
-from src.ingest import run_ingest
-from src.rag_chain import answer
+# src.rag_chain / src.ingest (LangChain, Chroma, torch) are imported inside
+# the handlers that need them so the app object, /health and /ready load fast.
+from src import metrics
+from src.admission import AdmissionQueue, Overloaded
+from src.inference_client import InferenceBusy
+from src.jobs import IngestJobManager
+from src import index_versions
+from src.generation import bump_generation
+from src.registry import registry
 from src.data_paths import list_data_files
 from src.config import settings  # <-- import to show model info in metadata
 
 
+# -------------------------------------------------------------------
+# Lifespan: load models once per worker
+# -------------------------------------------------------------------
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load in a background thread so /health answers while weights load;
+    # /ready stays 503 until the worker is warm.
+    if settings.preload_models:
+        threading.Thread(
+            target=registry.startup,
+            kwargs={"warmup": settings.warmup_on_startup},
+            name="model-preload",
+            daemon=True,
+        ).start()
+    yield
+
+
 # -------------------------------------------------------------------
 # FastAPI App Configuration
 # -------------------------------------------------------------------
@@ -19,6 +48,7 @@ app = FastAPI(
     description="Local RAG pipeline using TinyLlama and Chroma vectorstore. \
 Supports ingestion of local CSV/JSON/TXT/MD files plus optional site crawl.",
     version="2.0.0",
+    lifespan=lifespan,
 )
 
 
@@ -28,12 +58,43 @@ Supports ingestion of local CSV/JSON/TXT/MD files plus optional site crawl.",
 class ChatRequest(BaseModel):
     message: str = Field(..., description="User query")
     intent: Optional[str] = Field(None, description="Optional intent override")
+    debug: bool = Field(False, description="Include per-stage timings in the response")
+    deadline_s: Optional[float] = Field(
+        None, description="Give up (504) after this many seconds; capped at CHAT_DEADLINE_S"
+    )
 
 
 class IngestRequest(BaseModel):
     include_crawl: bool = Field(False, description="Also crawl official pages")
     crawl_depth: int = Field(1, description="Crawl depth for site crawling")
     extra_paths: Optional[List[str]] = Field(None, description="Extra files to ingest")
+    full_rebuild: bool = Field(False, description="Ignore the manifest and re-embed everything")
+    crawl_cache_only: bool = Field(False, description="Reuse the local page cache instead of crawling")
+
+
+# -------------------------------------------------------------------
+# Metrics
+# -------------------------------------------------------------------
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    # Streaming responses are timed to their first byte; the stream's own
+    # stages are recorded under pipeline="stream"
+    t0 = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    metrics.HTTP_SECONDS.observe(
+        time.perf_counter() - t0,
+        method=request.method,
+        route=getattr(route, "path", "unmatched"),
+        status=str(response.status_code),
+    )
+    return response
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics_endpoint():
+    """Prometheus text exposition of stage, HTTP and generation metrics."""
+    return PlainTextResponse(metrics.REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
 
 
 # -------------------------------------------------------------------
@@ -50,20 +111,76 @@ def health():
     }
 
 
+@app.exception_handler(TimeoutError)
+async def generation_timeout_handler(request: Request, exc: TimeoutError):
+    return JSONResponse(status_code=504, content={"ok": False, "message": str(exc)})
+
+
+@app.exception_handler(InferenceBusy)
+async def inference_busy_handler(request: Request, exc: InferenceBusy):
+    return JSONResponse(status_code=503, headers={"Retry-After": "1"}, content={"ok": False, "message": str(exc)})
+
+
+@app.exception_handler(Overloaded)
+async def overloaded_handler(request: Request, exc: Overloaded):
+    return JSONResponse(
+        status_code=503, headers={"Retry-After": str(exc.retry_after)}, content={"ok": False, "message": str(exc)}
+    )
+
+
+@app.get("/ready")
+def ready():
+    """Readiness probe: 200 only once models are loaded (and warmed up)."""
+    status = {**registry.status(), "admission": chat_queue.stats()}
+    return JSONResponse(status_code=200 if status["ready"] else 503, content=status)
+
+
 # -------------------------------------------------------------------
 # Ingest Endpoints
 # -------------------------------------------------------------------
-@app.post("/ingest")
+def _run_ingest(**kwargs):
+    from src.ingest import run_ingest
+
+    return run_ingest(**kwargs)
+
+
+# Jobs build a new index version in the background; on success the
+# registry swaps to it without reloading the models.
+ingest_jobs = IngestJobManager(
+    _run_ingest,
+    max_history=settings.ingest_job_history,
+    on_success=lambda res: registry.reload_vectorstore(res.get("active_index")),
+)
+
+# Answers (/chat, /chat/stream, /GetData) run on their own bounded pool so
+# a burst cannot take over the event loop's threadpool or starve /health.
+# The micro-batcher only sees as many concurrent generations as there are
+# pool threads, so with batching on the pool holds at least one full batch.
+chat_concurrency = settings.chat_concurrency
+if settings.batching_enabled and not settings.use_inference_server:
+    chat_concurrency = max(chat_concurrency, settings.batch_max_size)
+chat_queue = AdmissionQueue(
+    "chat",
+    concurrency=chat_concurrency,
+    max_queue=settings.chat_queue_depth,
+    queue_timeout_s=settings.chat_queue_timeout_s,
+    deadline_s=settings.chat_deadline_s,
+)
+
+
+@app.post("/ingest", status_code=202)
 def ingest_endpoint(req: IngestRequest):
     print(
         f"📥 Ingest request received. Crawl={req.include_crawl}, depth={req.crawl_depth}"
     )
-    res = run_ingest(
+    job = ingest_jobs.submit(
         include_crawl=req.include_crawl,
         crawl_depth=req.crawl_depth,
         extra_paths=req.extra_paths,
+        full_rebuild=req.full_rebuild,
+        crawl_cache_only=req.crawl_cache_only,
     )
-    return res
+    return {"ok": True, "job_id": job.id, "status": job.status, "status_url": f"/ingest/{job.id}"}
 
 
 @app.get("/ingest/default-files")
@@ -71,30 +188,118 @@ def list_default_files():
     return {"scanned_files": list_data_files()}
 
 
+@app.get("/ingest/jobs")
+def list_ingest_jobs():
+    return {"jobs": [j.as_dict() for j in ingest_jobs.list()]}
+
+
+@app.get("/ingest/versions")
+def list_index_versions():
+    return {
+        "active": index_versions.active_chroma_dir(),
+        "previous": index_versions.previous_chroma_dir(),
+        "versions": index_versions.list_versions(),
+    }
+
+
+@app.post("/ingest/rollback")
+def rollback_index():
+    """Point /chat back at the previous index version (no re-embedding)."""
+    pointer = index_versions.rollback()
+    if pointer is None:
+        raise HTTPException(status_code=409, detail="No previous index version to roll back to")
+    registry.reload_vectorstore(pointer["active"])
+    bump_generation()
+    return {"ok": True, **pointer}
+
+
+@app.get("/ingest/{job_id}")
+def ingest_status(job_id: str):
+    job = ingest_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown ingest job: {job_id}")
+    return job.as_dict()
+
+
 # -------------------------------------------------------------------
 # Chat Endpoints
 # -------------------------------------------------------------------
-@app.post("/chat")
-def chat_endpoint(req: ChatRequest):
-    print(f"💬 Chat request: {req.message[:80]}...")
-    res = answer(req.message, intent=req.intent)
+def _stamp(res: dict) -> dict:
     # Attach model + timestamp for debugging convenience
     res["served_by"] = settings.llm_model_name
     res["timestamp"] = datetime.now(ZoneInfo(settings.app_timezone)).isoformat()
     return res
 
 
+@app.post("/chat")
+async def chat_endpoint(req: ChatRequest):
+    from src.rag_chain import answer
+
+    print(f"💬 Chat request: {req.message[:80]}...")
+    res = await chat_queue.run(
+        answer, req.message, intent=req.intent, debug=req.debug or settings.debug, deadline_s=req.deadline_s
+    )
+    return _stamp(res)
+
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@app.post("/chat/stream")
+async def chat_stream_endpoint(req: ChatRequest, request: Request):
+    """
+    Server-Sent Events: `sources` first, then `token` events as TinyLlama
+    generates, then `done` with the same payload as POST /chat.
+    Disconnecting stops generation.
+    """
+    from src.rag_chain import stream_answer
+
+    print(f"💬 Streaming chat request: {req.message[:80]}...")
+    cancel = threading.Event()
+    # A full queue is still a plain 503, but the slot itself is taken inside
+    # the body: a response whose body never runs (client gone before the
+    # first send) must not hold one
+    chat_queue.check()
+
+    async def events():
+        try:
+            async with chat_queue.admit():
+                stream = stream_answer(
+                    req.message, intent=req.intent, cancel_event=cancel, debug=req.debug or settings.debug
+                )
+                try:
+                    while (ev := await chat_queue.call(next, stream, None)) is not None:
+                        if await request.is_disconnected():
+                            break
+                        data = _stamp(ev["data"]) if ev["event"] == "done" else ev["data"]
+                        yield _sse(ev["event"], data)
+                finally:
+                    cancel.set()
+                    await chat_queue.call(stream.close)
+        except Overloaded as e:
+            # Lost the race for a slot after the check; the 200 is already sent
+            yield _sse("error", {"ok": False, "message": str(e), "retry_after": e.retry_after})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 # -------------------------------------------------------------------
 # Simple GET (for Postman quick tests)
 # Example: /GetData?q=where can I buy ski passes?
 # -------------------------------------------------------------------
 @app.get("/GetData")
-def get_data(
+async def get_data(
     q: str = Query(..., description="Your search query"),
     intent: Optional[str] = Query(None, description="Optional intent override"),
+    debug: bool = Query(False, description="Include per-stage timings in the response"),
 ):
+    from src.rag_chain import answer
+
     print(f"🔎 GET request: {q[:80]}...")
-    res = answer(q, intent=intent)
-    res["served_by"] = settings.llm_model_name
-    res["timestamp"] = datetime.now(ZoneInfo(settings.app_timezone)).isoformat()
-    return res
+    res = await chat_queue.run(answer, q, intent=intent, debug=debug or settings.debug)
+    return _stamp(res)
@@ -0,0 +1,138 @@
+# src/batching.py
+"""
+Dynamic micro-batching in front of the shared TinyLlama model.
+
+Requests submit a prompt and block on a Future; a single scheduler thread
+collects whatever arrives within `window_ms` (or until `max_batch_size`),
+runs one left-padded batched `model.generate()` and routes each decoded
+continuation back to its caller. With a PrefixKVCache the batch starts from
+the shared static-prefix cache and only the per-request suffixes are
+prefilled.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import torch
+
+
+@dataclass
+class _Pending:
+    prompt: str
+    max_new_tokens: int
+    deadline: float
+    future: Future = field(default_factory=Future)
+
+
+class BatchScheduler:
+    def __init__(
+        self,
+        model,
+        tokenizer,
+        max_batch_size: int = 8,
+        window_ms: float = 15.0,
+        generation_kwargs: Optional[Dict[str, Any]] = None,
+        prefix_cache=None,
+    ):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.max_batch_size = max_batch_size
+        self.window_s = window_ms / 1000.0
+        self.generation_kwargs = dict(generation_kwargs or {})
+        self.default_max_new_tokens = self.generation_kwargs.pop("max_new_tokens", 512)
+        self.prefix_cache = prefix_cache
+
+        # Decoder-only models need left padding so every row ends at the same position
+        self.tokenizer.padding_side = "left"
+        if self.tokenizer.pad_token is None:
+            self.tokenizer.pad_token = self.tokenizer.eos_token
+
+        self._queue: "queue.Queue[_Pending]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.batches_run = 0
+        self.requests_served = 0
+
+    # -- lifecycle -----------------------------------------------------
+    def start(self) -> "BatchScheduler":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="batch-scheduler", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    # -- public API ----------------------------------------------------
+    def submit(self, prompt: str, max_new_tokens: Optional[int] = None, timeout: Optional[float] = None) -> str:
+        """Queue a prompt and wait for its continuation (raises TimeoutError)."""
+        deadline = time.monotonic() + timeout if timeout else float("inf")
+        item = _Pending(prompt, max_new_tokens or self.default_max_new_tokens, deadline)
+        self._queue.put(item)
+        try:
+            return item.future.result(timeout=timeout)
+        except FutureTimeout:
+            item.future.cancel()
+            raise TimeoutError(f"Generation did not finish within {timeout}s")
+
+    # -- scheduler loop ------------------------------------------------
+    def _collect(self) -> List[_Pending]:
+        try:
+            batch = [self._queue.get(timeout=0.1)]
+        except queue.Empty:
+            return []
+        window_end = time.monotonic() + self.window_s
+        while len(batch) < self.max_batch_size:
+            remaining = window_end - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        now = time.monotonic()
+        # Drop requests whose caller already gave up (timed out / cancelled)
+        return [p for p in batch if p.deadline > now and p.future.set_running_or_notify_cancel()]
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            batch = self._collect()
+            if batch:
+                self._run(batch)
+
+    def _run(self, batch: List[_Pending]) -> None:
+        try:
+            prompts = [p.prompt for p in batch]
+            enc = self.prefix_cache.prepare_batch(prompts) if self.prefix_cache is not None else None
+            if enc is None:
+                enc = self.tokenizer(prompts, return_tensors="pt", padding=True).to(self.model.device)
+            with torch.inference_mode():
+                out = self.model.generate(
+                    **enc,
+                    **self.generation_kwargs,
+                    max_new_tokens=max(p.max_new_tokens for p in batch),
+                    pad_token_id=self.tokenizer.pad_token_id,
+                )
+            new_tokens = out[:, enc["input_ids"].shape[1]:]
+            for row, p in zip(new_tokens, batch):
+                p.future.set_result(self.tokenizer.decode(row[:p.max_new_tokens], skip_special_tokens=True))
+            self.batches_run += 1
+            self.requests_served += len(batch)
+        except Exception as e:
+            for p in batch:
+                if not p.future.done():
+                    p.future.set_exception(e)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": self._queue.qsize(),
+            "batches_run": self.batches_run,
+            "requests_served": self.requests_served,
+            "avg_batch_size": round(self.requests_served / self.batches_run, 2) if self.batches_run else 0.0,
+        }
@@ -0,0 +1,182 @@
+# src/chunkers.py
+"""
+Format-specific chunkers for the files in data_files/.
+
+The generic path (whole document -> RecursiveCharacterTextSplitter) cuts
+scraped pages mid-section, embeds dict JSON twice (whole dump + per key)
+and turns each CSV row into a tiny `Unnamed: 0: ...` document. For the
+shapes we know, the loaders call these chunkers instead:
+
+- site_data.json   {page: {headings, paragraphs, lists, visitation_links}}
+                   -> per page, headings packed together with the
+                   paragraphs after them, then the page's links
+- text_content.json {site: [text, ...]} -> per site, deduplicated texts
+                   packed up to CHUNK_SIZE
+- visitation CSVs  -> one compact document per resort (its whole series)
+                   and per season (all resorts), with normalized names
+
+Documents that already fit CHUNK_SIZE are marked `prechunked` and the
+ingest splitter passes them through unchanged. Bump CHUNKER_VERSION when
+the output changes; the manifest then re-embeds everything.
+"""
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+if TYPE_CHECKING:
+    # ingest imports the chunk settings from here; keep that import cheap
+    from langchain_core.documents import Document
+
+CHUNK_SIZE = 800
+CHUNK_OVERLAP = 100
+CHUNKER_VERSION = 2
+
+# Menu entries longer than this are concatenated nav blocks, not link text
+MAX_LINK_CHARS = 60
+
+
+def _doc(text: str, metadata: Dict[str, Any]) -> "Document":
+    from langchain_core.documents import Document
+
+    # Oversized units (one very long paragraph) still go through the splitter
+    return Document(page_content=text, metadata={**metadata, "prechunked": len(text) <= CHUNK_SIZE})
+
+
+def _unique(items: Optional[Iterable[Any]]) -> List[str]:
+    seen, out = set(), []
+    for item in items or ():
+        text = " ".join(str(item).split())
+        if text and text not in seen:
+            seen.add(text)
+            out.append(text)
+    return out
+
+
+def _pack(header: str, blocks: Sequence[Tuple[bool, str]], max_chars: int = CHUNK_SIZE) -> List[str]:
+    """
+    Greedily join (is_heading, text) blocks under `header` into chunks of at
+    most `max_chars`. A heading starts a new chunk once the current one is
+    half full, so sections stay whole where they can.
+    """
+    chunks: List[List[str]] = []
+    current: List[str] = []
+    size = len(header)
+    for is_heading, text in blocks:
+        line = f"## {text}" if is_heading else text
+        if current and (size + 1 + len(line) > max_chars or (is_heading and size > max_chars // 2)):
+            chunks.append(current)
+            current, size = [], len(header)
+        current.append(line)
+        size += 1 + len(line)
+    if current:
+        chunks.append(current)
+    return [header + "\n" + "\n".join(c) for c in chunks]
+
+
+# -------------------------------------------------------------------------
+# 🔹 Scraped JSON
+# -------------------------------------------------------------------------
+def _is_site_pages(data: Dict[str, Any]) -> bool:
+    return bool(data) and all(
+        isinstance(v, dict) and ("headings" in v or "paragraphs" in v) for v in data.values()
+    )
+
+
+def _is_site_texts(data: Dict[str, Any]) -> bool:
+    return bool(data) and all(
+        isinstance(v, list) and all(isinstance(t, str) for t in v) for v in data.values()
+    )
+
+
+def _page_blocks(page: Dict[str, Any]) -> List[Tuple[bool, str]]:
+    # Calendar tiles scrape as bare day numbers ("29"); they are not headings
+    headings = [h for h in _unique(page.get("headings")) if any(c.isalpha() for c in h)]
+    paragraphs = _unique(page.get("paragraphs"))
+    # The scraper stores headings and paragraphs as separate lists, each in
+    # page order; interleave them by relative position so every heading is
+    # packed with the paragraphs that follow it
+    keyed = [(i / len(headings), 0, True, h) for i, h in enumerate(headings)]
+    keyed += [(j / len(paragraphs), 1, False, p) for j, p in enumerate(paragraphs)]
+    blocks = [(is_heading, text) for _, _, is_heading, text in sorted(keyed)]
+
+    known = set(headings)
+    links = [
+        item for item in _unique(i for group in page.get("lists") or () for i in group)
+        if len(item) <= MAX_LINK_CHARS and item not in known
+    ]
+    # The scraper's ARV visitation-statistics URLs: the only place the site
+    # data says where the visitation figures come from
+    links += _unique(page.get("visitation_links"))
+    if links:
+        blocks.append((True, "Links on this page"))
+        blocks.append((False, " · ".join(links)))
+    return blocks
+
+
+def chunk_site_pages(data: Dict[str, Dict[str, Any]], source: str) -> List["Document"]:
+    out: List["Document"] = []
+    for key, page in data.items():
+        title = key.replace("_", "/", 1)
+        for text in _pack(f"Page: {title}", _page_blocks(page)):
+            out.append(_doc(text, {"source": source, "doc_type": "json", "json_key": key}))
+    return out
+
+
+def chunk_site_texts(data: Dict[str, List[str]], source: str) -> List["Document"]:
+    out: List["Document"] = []
+    for site, texts in data.items():
+        for text in _pack(f"Site: {site}", [(False, t) for t in _unique(texts)]):
+            out.append(_doc(text, {"source": source, "doc_type": "json", "json_key": site}))
+    return out
+
+
+def chunk_json(data: Dict[str, Any], source: str) -> Optional[List["Document"]]:
+    """Chunks for a known dict-JSON shape, or None to fall back to the generic loader."""
+    if _is_site_pages(data):
+        return chunk_site_pages(data, source)
+    if _is_site_texts(data):
+        return chunk_site_texts(data, source)
+    return None
+
+
+# -------------------------------------------------------------------------
+# 🔹 Visitation tables
+# -------------------------------------------------------------------------
+def is_visitation_table(path: Path) -> bool:
+    from src.structured import VISITATION_PATTERN
+
+    return path.match(VISITATION_PATTERN)
+
+
+def chunk_visitation_table(path: Path, source: str) -> List["Document"]:
+    """
+    One document per season (every resort's figure) and, for multi-season
+    tables, one per resort (its whole series), in the structured engine's
+    normalized names and units.
+    """
+    from src.structured import DATASET_LABELS, WINTER_NOTE, format_count, load_visitation_table
+
+    table = load_visitation_table(path)
+    out: List["Document"] = []
+    if table.empty:
+        return out
+
+    def add(text: str, key: str) -> None:
+        out.append(_doc(text, {"source": source, "doc_type": "table", "row_index": len(out), "table_key": key}))
+
+    for dataset, rows in table.groupby("dataset", sort=False):
+        label = DATASET_LABELS.get(dataset, dataset)
+        note = f"\n{WINTER_NOTE}" if dataset == "winter" else ""
+        seasons = list(dict.fromkeys(rows["season"]))
+        for season in seasons:
+            sel = rows[rows["season"] == season]
+            mark = "*" if sel["footnote"].any() else ""
+            figures = "; ".join(f"{r.resort}: {format_count(r.visitors)}" for r in sel.itertuples())
+            add(f"{season}{mark} {label} by resort (Alpine Resorts Victoria)\n{figures}{note}", f"{dataset}:{season}")
+        if len(seasons) < 2:
+            continue
+        for resort, sel in rows.groupby("resort", sort=False):
+            series = "; ".join(
+                f"{r.season}{'*' if r.footnote else ''}: {format_count(r.visitors)}" for r in sel.itertuples()
+            )
+            add(f"{resort} {label} by season (Alpine Resorts Victoria)\n{series}{note}", f"{dataset}:{resort}")
+    return out
@@ -1,4 +1,6 @@
 import os
+from typing import List
+
 from pydantic import BaseModel
 from dotenv import load_dotenv
 
@@ -33,12 +35,88 @@ class Settings(BaseModel):
         "DEVICE", "cuda" if os.environ.get("CUDA_VISIBLE_DEVICES") else "cpu"
     )
 
+    # Inference backend for the generator / embedder:
+    # torch (fp32 baseline) | int8 (dynamic quantization) | compile | onnx
+    # | stub (offline echo LLM / hashed embeddings, for benchmarks and CI)
+    llm_backend: str = os.getenv("LLM_BACKEND", "torch")
+    embedding_backend: str = os.getenv("EMBEDDING_BACKEND", "torch")
+
     # -------------------------------------------------------------------------
     # 🔹 Paths
     # -------------------------------------------------------------------------
     data_dir: str = os.getenv("DATA_DIR", "data")
     chroma_dir: str = os.getenv("CHROMA_DIR", "data/chroma")
     vectorstore_dir: str = os.getenv("VECTORSTORE_DIR", "data/vectorstore")
+    onnx_dir: str = os.getenv("ONNX_DIR", "data/onnx")
+
+    # Vectorstore backend: chroma | mmap (src/vector_index.py, stored in chroma_dir)
+    vector_store: str = os.getenv("VECTOR_STORE", "chroma")
+    # mmap only: IVF lists built at persist (0 = always exact search) and lists probed per query
+    vector_index_nlist: int = int(os.getenv("VECTOR_INDEX_NLIST", "0"))
+    vector_index_nprobe: int = int(os.getenv("VECTOR_INDEX_NPROBE", "4"))
+
+    # -------------------------------------------------------------------------
+    # 🔹 Retrieval
+    # -------------------------------------------------------------------------
+    retrieval_k: int = int(os.getenv("RETRIEVAL_K", "3"))
+    # Search the routed intent's chunks first; fall back to the whole
+    # collection when fewer than k of them score at least this relevance
+    intent_partitioning: bool = os.getenv("INTENT_PARTITIONING", "true").lower() == "true"
+    partition_min_score: float = float(os.getenv("PARTITION_MIN_SCORE", "0.35"))
+    # Hybrid retrieval: merge BM25 and vector candidates with reciprocal-rank fusion
+    hybrid_enabled: bool = os.getenv("HYBRID_ENABLED", "true").lower() == "true"
+    hybrid_fetch_k: int = int(os.getenv("HYBRID_FETCH_K", "8"))
+
+    # Answer numeric / comparison / trend questions from the CSV tables;
+    # when the LLM is still needed, retrieve only this many supporting chunks
+    structured_enabled: bool = os.getenv("STRUCTURED_ENABLED", "true").lower() == "true"
+    structured_k: int = int(os.getenv("STRUCTURED_K", "1"))
+
+    # Context packing: fetch RETRIEVAL_K × this factor candidates (packing
+    # drops some of them), drop duplicate / overlapping text, merge
+    # neighbouring chunks and fill at most this many LLM tokens
+    context_packing_enabled: bool = os.getenv("CONTEXT_PACKING_ENABLED", "true").lower() == "true"
+    context_fetch_factor: int = int(os.getenv("CONTEXT_FETCH_FACTOR", "2"))
+    context_token_budget: int = int(os.getenv("CONTEXT_TOKEN_BUDGET", "600"))
+
+    # -------------------------------------------------------------------------
+    # 🔹 Ingest Pipeline
+    # -------------------------------------------------------------------------
+    # Files are parsed in a pool and new chunks are embedded + upserted in
+    # batches of this size, so memory stays flat as data_files/ grows
+    ingest_workers: int = int(os.getenv("INGEST_WORKERS", "4"))
+    ingest_use_processes: bool = os.getenv("INGEST_USE_PROCESSES", "false").lower() == "true"
+    ingest_batch_size: int = int(os.getenv("INGEST_BATCH_SIZE", "128"))
+    # Background ingest jobs build a new index version and switch the active
+    # pointer; this many versions (active + previous for rollback) are kept
+    index_versions_keep: int = int(os.getenv("INDEX_VERSIONS_KEEP", "2"))
+    ingest_job_history: int = int(os.getenv("INGEST_JOB_HISTORY", "50"))
+
+    # -------------------------------------------------------------------------
+    # 🔹 Site Crawler
+    # -------------------------------------------------------------------------
+    crawl_cache_dir: str = os.getenv("CRAWL_CACHE_DIR", "data/crawl_cache")
+    crawl_concurrency: int = int(os.getenv("CRAWL_CONCURRENCY", "8"))
+    crawl_timeout_s: float = float(os.getenv("CRAWL_TIMEOUT_S", "15"))
+
+    # -------------------------------------------------------------------------
+    # 🔹 Embedding Cache (memory-mapped, keyed by model + chunk text)
+    # -------------------------------------------------------------------------
+    embed_cache_enabled: bool = os.getenv("EMBED_CACHE_ENABLED", "true").lower() == "true"
+    embed_cache_dir: str = os.getenv("EMBED_CACHE_DIR", "data/embed_cache")
+    embed_cache_max_entries: int = int(os.getenv("EMBED_CACHE_MAX_ENTRIES", "50000"))
+    embed_cache_dtype: str = os.getenv("EMBED_CACHE_DTYPE", "float16")  # or float32
+    embed_batch_size: int = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+
+    # -------------------------------------------------------------------------
+    # 🔹 Live Data (fast-changing files: read on change, never embedded)
+    # -------------------------------------------------------------------------
+    live_data_enabled: bool = os.getenv("LIVE_DATA_ENABLED", "true").lower() == "true"
+    # Comma-separated file names / globs inside data_files/
+    live_data_files: List[str] = [
+        p.strip() for p in os.getenv("LIVE_DATA_FILES", "hotham_snow.csv").split(",") if p.strip()
+    ]
+    live_data_poll_s: float = float(os.getenv("LIVE_DATA_POLL_S", "10"))
 
     # -------------------------------------------------------------------------
     # 🔹 Application Settings
@@ -46,6 +124,54 @@ class Settings(BaseModel):
     app_timezone: str = os.getenv("APP_TIMEZONE", "UTC")
     debug: bool = os.getenv("DEBUG", "false").lower() == "true"
 
+    # -------------------------------------------------------------------------
+    # 🔹 Generation Scheduling
+    # -------------------------------------------------------------------------
+    # Micro-batch concurrent /chat generations into one padded generate() call
+    batching_enabled: bool = os.getenv("BATCHING_ENABLED", "false").lower() == "true"
+    batch_max_size: int = int(os.getenv("BATCH_MAX_SIZE", "8"))
+    batch_window_ms: float = float(os.getenv("BATCH_WINDOW_MS", "15"))
+    generation_timeout_s: float = float(os.getenv("GENERATION_TIMEOUT_S", "120"))
+    # Admission control for /chat, /chat/stream and /GetData: answers run on
+    # a dedicated pool of `chat_concurrency` threads; at most
+    # `chat_queue_depth` more wait (each up to `chat_queue_timeout_s`), the
+    # rest get 503 + Retry-After. `chat_deadline_s` bounds the whole request.
+    # With local batching on, the pool is widened to at least
+    # `batch_max_size`, or a batch could never fill.
+    chat_concurrency: int = int(os.getenv("CHAT_CONCURRENCY", "4"))
+    chat_queue_depth: int = int(os.getenv("CHAT_QUEUE_DEPTH", "16"))
+    chat_queue_timeout_s: float = float(os.getenv("CHAT_QUEUE_TIMEOUT_S", "10"))
+    chat_deadline_s: float = float(os.getenv("CHAT_DEADLINE_S", "150"))
+    # Compute the static prompt prefix's KV cache once per model load and
+    # start every generation (single, streamed or batched) from it
+    prefix_cache_enabled: bool = os.getenv("PREFIX_CACHE_ENABLED", "true").lower() == "true"
+
+    # -------------------------------------------------------------------------
+    # 🔹 Answer Cache (exact + near-duplicate questions, per ingest generation)
+    # -------------------------------------------------------------------------
+    answer_cache_enabled: bool = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+    answer_cache_max_entries: int = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "512"))
+    answer_cache_ttl_s: float = float(os.getenv("ANSWER_CACHE_TTL_S", "900"))
+    answer_cache_similarity: float = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.92"))
+
+    # Load models at API startup (in the background) and run one short
+    # generation so the first real request does not pay for lazy setup
+    preload_models: bool = os.getenv("PRELOAD_MODELS", "true").lower() == "true"
+    warmup_on_startup: bool = os.getenv("WARMUP_ON_STARTUP", "true").lower() == "true"
+
+    # -------------------------------------------------------------------------
+    # 🔹 Shared Inference Server (one model process for many API workers)
+    # -------------------------------------------------------------------------
+    # API workers send generate/embed calls to `inference_server` instead of
+    # loading their own models; `python -m src.main` starts it when needed
+    use_inference_server: bool = os.getenv("USE_INFERENCE_SERVER", "false").lower() == "true"
+    # unix:<socket path> or http://127.0.0.1:<port>
+    inference_server: str = os.getenv("INFERENCE_SERVER", "unix:data/inference.sock")
+    inference_pool_size: int = int(os.getenv("INFERENCE_POOL_SIZE", "8"))  # in-flight calls per API worker
+    inference_queue_timeout_s: float = float(os.getenv("INFERENCE_QUEUE_TIMEOUT_S", "5"))
+    inference_server_max_inflight: int = int(os.getenv("INFERENCE_SERVER_MAX_INFLIGHT", "64"))
+    api_workers: int = int(os.getenv("API_WORKERS", "1"))
+
 
 # -------------------------------------------------------------------------
 # Global settings instance
@@ -59,3 +185,6 @@ if settings.debug:
     print(f" - Embedding model: {settings.embedding_model_name}")
     print(f" - Vector store: {settings.vectorstore_dir}")
     print(f" - Device: {settings.device}")
+    print(f" - Backends: llm={settings.llm_backend}, embeddings={settings.embedding_backend}")
+    if settings.use_inference_server:
+        print(f" - Inference server: {settings.inference_server}")
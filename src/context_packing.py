@@ -0,0 +1,138 @@
+# src/context_packing.py
+"""
+Context assembly between retrieval and the prompt.
+
+Retrieved chunks overlap: the splitter keeps CHUNK_OVERLAP characters
+between neighbours, and generic dict JSON is indexed both whole and per key.
+pack_context() turns the ranked candidates into a compact context:
+
+1. drop exact duplicates (whitespace-normalized text)
+2. merge chunks that are adjacent or overlapping in the same source
+   document, using the splitter's `start_index`
+3. drop chunks whose word 5-grams are mostly covered by chunks already kept
+4. fill up to `budget_tokens` (counted with the model tokenizer) in rank
+   order, truncating the last chunk that only partly fits
+"""
+import re
+from typing import Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+from langchain_core.documents import Document
+
+SHINGLE_SIZE = 5
+# A chunk is redundant when this share of its 5-grams is already in the context
+OVERLAP_THRESHOLD = 0.8
+# Do not bother truncating a chunk into a gap smaller than this
+MIN_TRUNCATED_TOKENS = 32
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def _normalized(text: str) -> str:
+    return " ".join(text.split())
+
+
+def _parent_key(doc: Document) -> Tuple:
+    """Chunks split from the same loaded document share this key."""
+    m = doc.metadata
+    return m.get("source", ""), m.get("doc_type"), m.get("row_index"), m.get("json_key")
+
+
+def _shingles(text: str) -> Set[Tuple[str, ...]]:
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < SHINGLE_SIZE:
+        return {tuple(words)} if words else set()
+    return {tuple(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def _merge_adjacent(docs: List[Document]) -> List[Document]:
+    """
+    Merge chunks of the same parent document whose character spans touch or
+    overlap. The merged chunk takes the rank of its best-ranked piece.
+    """
+    groups: Dict[Tuple, List[Tuple[int, Document]]] = {}
+    for rank, d in enumerate(docs):
+        groups.setdefault(_parent_key(d), []).append((rank, d))
+
+    merged: List[Tuple[int, Document]] = []
+    for members in groups.values():
+        spans = [(r, d) for r, d in members if isinstance(d.metadata.get("start_index"), int)]
+        merged.extend((r, d) for r, d in members if not isinstance(d.metadata.get("start_index"), int))
+        spans.sort(key=lambda rd: rd[1].metadata["start_index"])
+        current: Optional[Tuple[int, int, str, Document, int]] = None  # rank, start, text, first doc, pieces
+        for rank, d in spans:
+            start, text = d.metadata["start_index"], d.page_content
+            if current is not None and start <= current[1] + len(current[2]):
+                c_rank, c_start, c_text, c_doc, pieces = current
+                tail = text[c_start + len(c_text) - start:] if start + len(text) > c_start + len(c_text) else ""
+                current = (min(c_rank, rank), c_start, c_text + tail, c_doc, pieces + 1)
+                continue
+            if current is not None:
+                merged.append(_emit(current))
+            current = (rank, start, text, d, 1)
+        if current is not None:
+            merged.append(_emit(current))
+
+    merged.sort(key=lambda rd: rd[0])
+    return [d for _, d in merged]
+
+
+def _emit(current: Tuple[int, int, str, Document, int]) -> Tuple[int, Document]:
+    rank, start, text, first, pieces = current
+    if pieces == 1:
+        return rank, first
+    meta = dict(first.metadata, start_index=start, merged_chunks=pieces)
+    return rank, Document(page_content=text, metadata=meta)
+
+
+def pack_context(
+    docs: Sequence[Document],
+    budget_tokens: int,
+    count_tokens: Callable[[str], int],
+    truncate: Optional[Callable[[str, int], str]] = None,
+) -> List[Document]:
+    """
+    Deduplicated, merged docs in rank order whose total size fits
+    `budget_tokens`. `truncate(text, n)` (first n tokens) lets the last
+    chunk be cut instead of dropped.
+    """
+    seen_text: Set[str] = set()
+    unique: List[Document] = []
+    for d in docs:
+        key = _normalized(d.page_content)
+        if key and key not in seen_text:
+            seen_text.add(key)
+            unique.append(d)
+
+    packed: List[Document] = []
+    covered: Set[Tuple[str, ...]] = set()
+    used = 0
+    for d in _merge_adjacent(unique):
+        shingles = _shingles(d.page_content)
+        if shingles and len(shingles & covered) / len(shingles) >= OVERLAP_THRESHOLD:
+            continue
+        n = count_tokens(d.page_content)
+        remaining = budget_tokens - used
+        if n > remaining:
+            if truncate is None or remaining < MIN_TRUNCATED_TOKENS:
+                continue  # a later, smaller chunk may still fit
+            d = Document(page_content=truncate(d.page_content, remaining), metadata=dict(d.metadata, truncated=True))
+            n = remaining
+        packed.append(d)
+        covered |= shingles
+        used += n
+        if used >= budget_tokens:
+            break
+    return packed
+
+
+def tokenizer_budget_fns(tokenizer) -> Tuple[Callable[[str], int], Callable[[str, int], str]]:
+    """count / truncate helpers backed by a Hugging Face tokenizer."""
+
+    def count(text: str) -> int:
+        return len(tokenizer(text, add_special_tokens=False)["input_ids"])
+
+    def truncate(text: str, n: int) -> str:
+        ids = tokenizer(text, add_special_tokens=False)["input_ids"][:n]
+        return tokenizer.decode(ids, skip_special_tokens=True)
+
+    return count, truncate
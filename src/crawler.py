@@ -0,0 +1,228 @@
+# src/crawler.py
+"""
+Concurrent, conditional site crawler.
+
+- one pooled `httpx.AsyncClient` for the whole crawl
+- a global semaphore caps in-flight requests
+- URLs are deduplicated across all seeds, page bodies by content hash
+- depth follows the old RecursiveUrlLoader: `max_depth=1` fetches only the
+  seeds, each further level follows links that stay under a seed's URL
+  prefix (`prevent_outside`)
+- ETag / Last-Modified are cached on disk; unchanged pages come back as
+  304 and are served from the local page cache instead of re-downloaded
+
+The page cache (`<cache_dir>/pages/<sha1(url)>.html` + `index.json`) can be
+read back by ingest without any network access via `cached_documents()`.
+"""
+import asyncio
+import hashlib
+import json
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+from urllib.parse import urldefrag, urljoin
+
+import httpx
+from bs4 import BeautifulSoup
+from langchain_core.documents import Document
+
+USER_AGENT = "mthotham-assistant-crawler/1.0"
+
+
+def _url_key(url: str) -> str:
+    return hashlib.sha1(url.encode("utf-8")).hexdigest()
+
+
+def extract_text(html: str) -> str:
+    """Visible text from the content-bearing tags, scripts/styles stripped."""
+    soup = BeautifulSoup(html, "html.parser")
+    for tag in soup(["script", "style", "noscript", "nav", "footer", "header"]):
+        tag.decompose()
+    root = soup.find("main") or soup.find("article") or soup.body or soup
+    return " ".join(root.get_text(" ").split())
+
+
+def extract_links(html: str, base_url: str) -> List[str]:
+    soup = BeautifulSoup(html, "html.parser")
+    out = []
+    for a in soup.find_all("a", href=True):
+        url, _ = urldefrag(urljoin(base_url, a["href"]))
+        if url.startswith(("http://", "https://")):
+            out.append(url)
+    return out
+
+
+@dataclass
+class CrawlStats:
+    fetched: int = 0
+    not_modified: int = 0
+    duplicate_content: int = 0
+    errors: int = 0
+    skipped_urls: int = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        return dict(self.__dict__)
+
+
+@dataclass
+class CrawlResult:
+    documents: List[Document] = field(default_factory=list)
+    stats: CrawlStats = field(default_factory=CrawlStats)
+
+
+class PageCache:
+    """On-disk cache of page bodies plus their validators (ETag / Last-Modified)."""
+
+    def __init__(self, cache_dir: str):
+        self.dir = Path(cache_dir)
+        self.pages_dir = self.dir / "pages"
+        self.index_path = self.dir / "index.json"
+        self.index: Dict[str, dict] = {}
+        if self.index_path.exists():
+            try:
+                self.index = json.loads(self.index_path.read_text(encoding="utf-8"))
+            except (OSError, ValueError) as e:
+                print(f"[crawler] WARNING: unreadable page cache index, starting empty: {e}")
+
+    def validators(self, url: str) -> Dict[str, str]:
+        entry = self.index.get(url) or {}
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def read(self, url: str) -> Optional[str]:
+        path = self.pages_dir / f"{_url_key(url)}.html"
+        try:
+            return path.read_text(encoding="utf-8")
+        except OSError:
+            return None
+
+    def write(self, url: str, html: str, etag: Optional[str], last_modified: Optional[str], content_hash: str) -> None:
+        self.pages_dir.mkdir(parents=True, exist_ok=True)
+        (self.pages_dir / f"{_url_key(url)}.html").write_text(html, encoding="utf-8")
+        self.index[url] = {"etag": etag, "last_modified": last_modified, "content_hash": content_hash}
+
+    def save(self) -> None:
+        self.dir.mkdir(parents=True, exist_ok=True)
+        tmp = self.index_path.with_name(self.index_path.name + ".tmp")
+        tmp.write_text(json.dumps(self.index, ensure_ascii=False, indent=1), encoding="utf-8")
+        os.replace(tmp, self.index_path)
+
+
+class SiteCrawler:
+    def __init__(
+        self,
+        cache_dir: str,
+        max_concurrency: int = 8,
+        timeout_s: float = 15.0,
+        prevent_outside: bool = True,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.cache = PageCache(cache_dir)
+        self.max_concurrency = max_concurrency
+        self.timeout_s = timeout_s
+        self.prevent_outside = prevent_outside
+        # Injectable so tests can point the crawler at a local stand-in server
+        self.transport = transport
+
+    async def crawl(self, seeds: List[str], max_depth: int = 1) -> CrawlResult:
+        result = CrawlResult()
+        seen_urls: Set[str] = set()
+        seen_hashes: Set[str] = set()
+        prefixes = tuple(urldefrag(u)[0] for u in seeds)
+        sem = asyncio.Semaphore(self.max_concurrency)
+        limits = httpx.Limits(max_connections=self.max_concurrency, max_keepalive_connections=self.max_concurrency)
+
+        async with httpx.AsyncClient(
+            transport=self.transport,
+            limits=limits,
+            timeout=self.timeout_s,
+            follow_redirects=True,
+            headers={"User-Agent": USER_AGENT},
+        ) as client:
+            frontier = []
+            for u in seeds:
+                u, _ = urldefrag(u)
+                if u not in seen_urls:
+                    seen_urls.add(u)
+                    frontier.append(u)
+
+            for depth in range(max_depth):
+                pages = await asyncio.gather(*(self._fetch(client, sem, u, result.stats) for u in frontier))
+                next_frontier: List[str] = []
+                for url, html in zip(frontier, pages):
+                    if html is None:
+                        continue
+                    text = extract_text(html)
+                    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+                    if digest in seen_hashes:
+                        result.stats.duplicate_content += 1
+                    else:
+                        seen_hashes.add(digest)
+                        if text:
+                            result.documents.append(Document(
+                                page_content=text,
+                                metadata={"source": url, "doc_type": "web", "content_hash": digest},
+                            ))
+                    if depth + 1 < max_depth:
+                        for link in extract_links(html, url):
+                            if link in seen_urls:
+                                continue
+                            if self.prevent_outside and not link.startswith(prefixes):
+                                result.stats.skipped_urls += 1
+                                continue
+                            seen_urls.add(link)
+                            next_frontier.append(link)
+                frontier = next_frontier
+                if not frontier:
+                    break
+
+        self.cache.save()
+        return result
+
+    async def _fetch(self, client: httpx.AsyncClient, sem: asyncio.Semaphore, url: str, stats: CrawlStats) -> Optional[str]:
+        async with sem:
+            try:
+                resp = await client.get(url, headers=self.cache.validators(url))
+            except httpx.HTTPError as e:
+                print(f"[crawler] ERROR fetching {url}: {e}")
+                stats.errors += 1
+                return None
+        if resp.status_code == 304:
+            cached = self.cache.read(url)
+            if cached is not None:
+                stats.not_modified += 1
+                return cached
+            # Validator without a cached body: refetch unconditionally
+            self.cache.index.pop(url, None)
+            return await self._fetch(client, sem, url, stats)
+        if resp.status_code != 200 or "html" not in resp.headers.get("content-type", "html"):
+            stats.errors += 1
+            return None
+        html = resp.text
+        stats.fetched += 1
+        self.cache.write(
+            url, html,
+            resp.headers.get("etag"), resp.headers.get("last-modified"),
+            hashlib.sha256(html.encode("utf-8")).hexdigest(),
+        )
+        return html
+
+    def cached_documents(self) -> List[Document]:
+        """Documents from the local page cache only (no network), deduplicated by content."""
+        docs: List[Document] = []
+        seen: Set[str] = set()
+        for url in self.cache.index:
+            html = self.cache.read(url)
+            if html is None:
+                continue
+            text = extract_text(html)
+            digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+            if text and digest not in seen:
+                seen.add(digest)
+                docs.append(Document(page_content=text, metadata={"source": url, "doc_type": "web", "content_hash": digest}))
+        return docs
@@ -1,5 +1,6 @@
+from fnmatch import fnmatch
 from pathlib import Path
-from typing import List
+from typing import List, Optional
 
 # Directory inside the repo where you will drop files
 DATA_FILES_DIR = Path("data_files")
@@ -7,17 +8,45 @@ DATA_FILES_DIR = Path("data_files")
 # Allowed extensions we auto-scan
 ALLOWED_EXTS = {".csv", ".json", ".txt", ".md"}
 
-def list_data_files() -> List[str]:
+def is_live_data_file(path) -> bool:
+    """True for files served by the live-data store (LIVE_DATA_FILES) instead of the index."""
+    from src.config import settings
+
+    if not settings.live_data_enabled:
+        return False
+    name = Path(path).name
+    return any(fnmatch(name, pattern) for pattern in settings.live_data_files)
+
+def list_data_files(include_live: bool = False) -> List[str]:
     """
     Recursively scan data_files/ for allowed extensions and return relative paths (str).
+    Live-data files are left out unless `include_live` is set: they are read
+    by src.live_data on every change, never embedded.
     """
     if not DATA_FILES_DIR.exists():
         return []
     files: List[str] = []
     for p in DATA_FILES_DIR.rglob("*"):
-        if p.is_file() and p.suffix.lower() in ALLOWED_EXTS:
+        if p.is_file() and p.suffix.lower() in ALLOWED_EXTS and (include_live or not is_live_data_file(p)):
             files.append(str(p))
     return files
 
-# Backward-compat alias used elsewhere
-DEFAULT_LOCAL_FILES: List[str] = list_data_files()
+def list_live_data_files() -> List[str]:
+    return [p for p in list_data_files(include_live=True) if is_live_data_file(p)]
+
+def __getattr__(name: str):
+    # Backward-compat alias used elsewhere; scanned on access, not at import
+    if name == "DEFAULT_LOCAL_FILES":
+        return list_data_files()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def index_sidecar_path(name: str, chroma_dir: Optional[str] = None) -> Path:
+    """
+    Path of an index artifact stored next to the Chroma directory,
+    e.g. data/chroma -> data/chroma.manifest.json
+    """
+    from src.config import settings
+
+    base = Path(chroma_dir or settings.chroma_dir)
+    return base.parent / f"{base.name}.{name}"
@@ -0,0 +1,258 @@
+# src/embedding_cache.py
+"""
+Persistent on-disk embedding cache.
+
+Vectors live in one memory-mapped array file per embedding model
+(`<cache_dir>/<model>.<dtype>.bin`, shape = (capacity, dim)); a small
+`.npz` index maps sha1(model + normalized text) -> row slot and keeps a
+last-used tick per slot for LRU eviction.
+
+Single writer, enforced: the first process to open a cache file takes an
+exclusive flock on `<model>.<dtype>.lock` and keeps it while it lives.
+Any other process (a second API worker, an ingest run next to the API)
+opens the cache read-only: it serves hits from a private copy of the rows
+the on-disk index referenced when it opened, and its misses are embedded
+but not stored. The owner writes the index before reusing an evicted slot,
+so a reader never copies a row that was overwritten under a stale index.
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, a single process is assumed
+    fcntl = None
+
+KEY_BYTES = 20  # sha1 digest
+EVICT_FRACTION = 0.1
+# A reader retries its snapshot if the owner rewrote the index meanwhile
+SNAPSHOT_ATTEMPTS = 3
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(text.split())
+
+
+def _slug(name: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", name)
+
+
+class EmbeddingCache:
+    def __init__(self, cache_dir: str, model_name: str, max_entries: int = 50_000, dtype: str = "float16"):
+        if dtype not in ("float16", "float32"):
+            raise ValueError(f"Unsupported embedding cache dtype: {dtype}")
+        self.model_name = model_name
+        self.capacity = int(max_entries)
+        self.dtype = np.dtype(dtype)
+        self.dir = Path(cache_dir)
+        base = self.dir / f"{_slug(model_name)}.{dtype}"
+        self.vectors_path = base.with_name(base.name + ".bin")
+        self.index_path = base.with_name(base.name + ".index.npz")
+        self.meta_path = base.with_name(base.name + ".meta.json")
+        self.lock_path = base.with_name(base.name + ".lock")
+
+        self._lock = threading.Lock()
+        self._slots: Dict[bytes, int] = {}
+        self._last_used = np.zeros(self.capacity, dtype=np.int64)
+        self._tick = 0
+        self._dim: Optional[int] = None
+        self._vectors: Optional[np.ndarray] = None  # memmap (owner) or in-memory copy (reader)
+        self._free: List[int] = []
+        self._dirty = False
+        self.hits = 0
+        self.misses = 0
+        self._lock_file = None
+        self.read_only = not self._acquire_writer()
+        self._load()
+        used = set(self._slots.values())
+        self._free = [s for s in range(self.capacity - 1, -1, -1) if s not in used]
+
+    # -- persistence ---------------------------------------------------
+    def _acquire_writer(self) -> bool:
+        """Take the writer lock for the life of this object; False if another holder has it."""
+        if fcntl is None:
+            return True
+        self.dir.mkdir(parents=True, exist_ok=True)
+        f = open(self.lock_path, "a+")
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            print(f"[embedding_cache] NOTE: {self.vectors_path.name} is in use by another process, opening read-only")
+            return False
+        self._lock_file = f
+        return True
+
+    def close(self) -> None:
+        """Flush and give up the writer lock."""
+        self.flush()
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+    def _index_version(self):
+        st = self.index_path.stat()
+        return st.st_ino, st.st_mtime_ns
+
+    def _load(self) -> None:
+        if not (self.meta_path.exists() and self.index_path.exists() and self.vectors_path.exists()):
+            return
+        try:
+            for _ in range(SNAPSHOT_ATTEMPTS):
+                version = self._index_version()
+                meta = json.loads(self.meta_path.read_text(encoding="utf-8"))
+                if meta.get("capacity") != self.capacity or meta.get("model") != self.model_name:
+                    print(f"[embedding_cache] NOTE: cache settings changed, starting empty: {self.vectors_path}")
+                    return
+                idx = np.load(self.index_path)
+                dim = int(meta["dim"])
+                mode = "r" if self.read_only else "r+"
+                vectors = np.memmap(self.vectors_path, dtype=self.dtype, mode=mode, shape=(self.capacity, dim))
+                keys, slots = [bytes(k) for k in idx["keys"]], idx["slots"]
+                if not self.read_only:
+                    self._dim, self._tick, self._vectors = dim, int(meta.get("tick", 0)), vectors
+                    self._slots = dict(zip(keys, slots.tolist()))
+                    self._last_used[slots] = idx["last_used"]
+                    return
+                # Reader: copy the referenced rows, compacted to slots 0..n-1.
+                # If the index was replaced meanwhile, the owner may have
+                # reused one of those slots, so take the snapshot again
+                rows = np.array(vectors[slots])
+                if self._index_version() == version:
+                    self._dim, self._vectors = dim, rows
+                    self._slots = {k: i for i, k in enumerate(keys)}
+                    return
+            print(f"[embedding_cache] WARNING: {self.index_path.name} kept changing while loading, starting empty")
+        except (OSError, ValueError, KeyError) as e:
+            print(f"[embedding_cache] WARNING: could not load cache, starting empty: {e}")
+            self._slots, self._dim, self._vectors = {}, None, None
+            self._last_used[:] = 0
+
+    def _ensure_storage(self, dim: int) -> None:
+        if self._vectors is not None:
+            return
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self._dim = dim
+        self._vectors = np.memmap(self.vectors_path, dtype=self.dtype, mode="w+", shape=(self.capacity, dim))
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._dirty:
+                self._write_index()
+
+    def _write_index(self) -> None:
+        if self.read_only or self._vectors is None:
+            return
+        self._vectors.flush()
+        slots = np.fromiter(self._slots.values(), dtype=np.int64, count=len(self._slots))
+        keys = np.array(list(self._slots.keys()), dtype=f"S{KEY_BYTES}")
+        tmp = self.index_path.with_name(self.index_path.name + ".tmp.npz")
+        np.savez(tmp, keys=keys, slots=slots, last_used=self._last_used[slots])
+        os.replace(tmp, self.index_path)
+        self.meta_path.write_text(
+            json.dumps({"model": self.model_name, "dim": self._dim, "capacity": self.capacity, "tick": self._tick}),
+            encoding="utf-8",
+        )
+        self._dirty = False
+
+    # -- lookups -------------------------------------------------------
+    def key(self, text: str) -> bytes:
+        return hashlib.sha1(f"{self.model_name}\0{normalize_text(text)}".encode("utf-8")).digest()
+
+    def get_many(self, keys: Sequence[bytes]) -> List[Optional[np.ndarray]]:
+        out: List[Optional[np.ndarray]] = []
+        with self._lock:
+            for k in keys:
+                slot = self._slots.get(k)
+                if slot is None:
+                    out.append(None)
+                    self.misses += 1
+                    continue
+                self._tick += 1
+                self._last_used[slot] = self._tick
+                out.append(np.asarray(self._vectors[slot], dtype=np.float32))
+                self.hits += 1
+        return out
+
+    def put_many(self, keys: Sequence[bytes], vectors: Sequence[Sequence[float]]) -> None:
+        if not keys or self.read_only:
+            return
+        arr = np.asarray(vectors, dtype=np.float32)
+        with self._lock:
+            self._ensure_storage(arr.shape[1])
+            for k, vec in zip(keys, arr):
+                slot = self._slots.get(k)
+                if slot is None:
+                    slot = self._free_slot()
+                    self._slots[k] = slot
+                self._vectors[slot] = vec
+                self._tick += 1
+                self._last_used[slot] = self._tick
+            self._dirty = True
+
+    def _free_slot(self) -> int:
+        if not self._free:
+            # Full: evict the least recently used fraction in one pass
+            n_evict = max(1, int(self.capacity * EVICT_FRACTION))
+            victims = np.argpartition(self._last_used, n_evict - 1)[:n_evict]
+            victim_set = set(victims.tolist())
+            self._slots = {k: s for k, s in self._slots.items() if s not in victim_set}
+            self._last_used[victims] = 0
+            self._free = sorted(victim_set, reverse=True)
+            # Drop the victims from the on-disk index before their slots are
+            # overwritten, so readers opening from now on never copy them
+            self._write_index()
+        return self._free.pop()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._slots), "capacity": self.capacity, "hits": self.hits, "misses": self.misses,
+            "read_only": self.read_only,
+        }
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    LangChain `Embeddings` wrapper: documents are looked up in the cache
+    first and only misses are sent (in batches) to the wrapped model.
+    Queries pass straight through.
+    """
+
+    def __init__(self, base: Embeddings, cache: EmbeddingCache, batch_size: int = 64):
+        self.base = base
+        self.cache = cache
+        self.batch_size = batch_size
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [self.cache.key(t) for t in texts]
+        found = self.cache.get_many(keys)
+
+        # Unique misses only: the same chunk text appearing twice is embedded once
+        pending: Dict[bytes, str] = {}
+        for k, t, v in zip(keys, texts, found):
+            if v is None and k not in pending:
+                pending[k] = t
+
+        computed: Dict[bytes, np.ndarray] = {}
+        items = list(pending.items())
+        for i in range(0, len(items), self.batch_size):
+            batch = items[i:i + self.batch_size]
+            vecs = self.base.embed_documents([t for _, t in batch])
+            self.cache.put_many([k for k, _ in batch], vecs)
+            for (k, _), v in zip(batch, vecs):
+                computed[k] = np.asarray(v, dtype=np.float32)
+        if computed:
+            self.cache.flush()
+
+        return [(v if v is not None else computed[k]).tolist() for k, v in zip(keys, found)]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.base.embed_query(text)
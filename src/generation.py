@@ -0,0 +1,45 @@
+# src/generation.py
+"""
+Ingest generation counter.
+
+run_ingest() bumps it after every successful sync; anything derived from
+the index (e.g. cached answers) is keyed to it. The value is kept in a
+small file under settings.data_dir so every worker process sees the bump.
+"""
+import os
+from pathlib import Path
+from typing import Optional, Tuple
+
+from src.config import settings
+
+_cached: Optional[Tuple[float, int]] = None  # (file mtime, value)
+
+
+def _path() -> Path:
+    return Path(settings.data_dir) / "ingest_generation"
+
+
+def current_generation() -> int:
+    """Current generation; re-reads the file only when its mtime changes."""
+    global _cached
+    path = _path()
+    try:
+        mtime = path.stat().st_mtime
+    except FileNotFoundError:
+        return 0
+    if _cached is None or _cached[0] != mtime:
+        try:
+            _cached = (mtime, int(path.read_text(encoding="utf-8").strip() or 0))
+        except (OSError, ValueError):
+            return 0
+    return _cached[1]
+
+
+def bump_generation() -> int:
+    path = _path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    value = current_generation() + 1
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(str(value), encoding="utf-8")
+    os.replace(tmp, path)
+    return value
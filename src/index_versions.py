@@ -0,0 +1,159 @@
+# src/index_versions.py
+"""
+Blue/green index versions.
+
+Every ingest job builds into its own directory
+
+    <chroma_dir>.versions/<version>/chroma            Chroma persist dir
+    <chroma_dir>.versions/<version>/chroma.*          manifest / BM25 sidecars
+
+and then atomically rewrites the active pointer (<chroma_dir>.active, JSON
+with `active` and `previous`). The chat path only ever opens the directory
+the pointer names, so it never sees a half-written index, and the previous
+version stays on disk for an instant rollback.
+
+Without a pointer file the legacy in-place index at settings.chroma_dir is
+active, and the first versioned build starts from a copy of it.
+"""
+import json
+import os
+import shutil
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from src.config import settings
+from src.data_paths import index_sidecar_path
+
+# Sidecars copied along with the Chroma dir so incremental sync keeps working
+SIDECARS = ("manifest.json", "bm25.npz", "bm25.json")
+
+_cached: Optional[Tuple[float, Dict[str, Optional[str]]]] = None  # (file mtime, pointer)
+_swap_lock = threading.Lock()
+# Called with a version's Chroma dir right before it is deleted, so open
+# handles on it (the registry's chromadb systems) are released first
+_remove_hooks: List[Callable[[str], None]] = []
+
+
+def _pointer_path() -> Path:
+    return index_sidecar_path("active")
+
+
+def _versions_root() -> Path:
+    return index_sidecar_path("versions")
+
+
+def _read_pointer() -> Dict[str, Optional[str]]:
+    """Pointer contents; re-reads the file only when its mtime changes."""
+    global _cached
+    path = _pointer_path()
+    try:
+        mtime = path.stat().st_mtime
+    except FileNotFoundError:
+        return {"active": None, "previous": None}
+    if _cached is None or _cached[0] != mtime:
+        try:
+            _cached = (mtime, json.loads(path.read_text(encoding="utf-8")))
+        except (OSError, ValueError) as e:
+            print(f"[index_versions] WARNING: unreadable active pointer {path}: {e}")
+            return {"active": None, "previous": None}
+    return _cached[1]
+
+
+def _write_pointer(active: str, previous: Optional[str]) -> None:
+    path = _pointer_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps({
+        "active": active,
+        "previous": previous,
+        "switched_at": datetime.now().isoformat(timespec="seconds"),
+    }, indent=1), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def active_chroma_dir() -> str:
+    """Chroma directory the chat path should read right now."""
+    return _read_pointer().get("active") or settings.chroma_dir
+
+
+def previous_chroma_dir() -> Optional[str]:
+    return _read_pointer().get("previous")
+
+
+def list_versions() -> List[str]:
+    root = _versions_root()
+    if not root.exists():
+        return []
+    return sorted(str(p / Path(settings.chroma_dir).name) for p in root.iterdir() if p.is_dir())
+
+
+def on_remove(hook: Callable[[str], None]) -> None:
+    _remove_hooks.append(hook)
+
+
+def _remove_version(chroma_dir: str) -> None:
+    for hook in _remove_hooks:
+        hook(chroma_dir)
+    shutil.rmtree(Path(chroma_dir).parent, ignore_errors=True)
+
+
+def _copy_index(src_dir: str, dst_dir: str) -> None:
+    src, dst = Path(src_dir), Path(dst_dir)
+    if src.exists():
+        shutil.copytree(src, dst)
+    for name in SIDECARS:
+        side = index_sidecar_path(name, src_dir)
+        if side.exists():
+            shutil.copy2(side, index_sidecar_path(name, dst_dir))
+
+
+def new_version(copy_active: bool = True) -> str:
+    """
+    Create a staging directory for the next index version and return its
+    Chroma path. With `copy_active` it starts as a copy of the active index
+    (vectors, manifest, BM25) so the incremental sync only embeds changes.
+    """
+    version = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+    chroma_dir = str(_versions_root() / version / Path(settings.chroma_dir).name)
+    Path(chroma_dir).parent.mkdir(parents=True, exist_ok=True)
+    if copy_active:
+        _copy_index(active_chroma_dir(), chroma_dir)
+    return chroma_dir
+
+
+def discard_version(chroma_dir: str) -> None:
+    """Remove a staging version that was never activated (failed or no-op build)."""
+    if chroma_dir not in (active_chroma_dir(), previous_chroma_dir()):
+        _remove_version(chroma_dir)
+
+
+def activate(chroma_dir: str) -> Dict[str, Optional[str]]:
+    """Atomically point the chat path at `chroma_dir`; the old active becomes `previous`."""
+    with _swap_lock:
+        old = active_chroma_dir()
+        _write_pointer(chroma_dir, old if old != chroma_dir else previous_chroma_dir())
+        _prune()
+    print(f"🔀 Active index switched: {old} -> {chroma_dir}")
+    return _read_pointer()
+
+
+def rollback() -> Optional[Dict[str, Optional[str]]]:
+    """Swap active and previous; None when there is nothing to roll back to."""
+    with _swap_lock:
+        prev = previous_chroma_dir()
+        if not prev or not Path(prev).exists():
+            return None
+        _write_pointer(prev, active_chroma_dir())
+    print(f"↩️  Active index rolled back to {prev}")
+    return _read_pointer()
+
+
+def _prune() -> None:
+    """Delete versions other than active/previous beyond settings.index_versions_keep."""
+    keep = {active_chroma_dir(), previous_chroma_dir()}
+    stale = [v for v in list_versions() if v not in keep]
+    excess = len(stale) - max(settings.index_versions_keep - len(keep - {None}), 0)
+    for v in stale[:max(excess, 0)]:
+        _remove_version(v)
@@ -0,0 +1,169 @@
+# src/inference_backends.py
+"""
+Pluggable inference backends for the generator and the embedding model.
+
+    torch    float32 on CPU / float16 on CUDA (the baseline)
+    int8     PyTorch dynamic int8 quantization of every nn.Linear (CPU only)
+    compile  torch.compile'd forward (first calls pay the compilation)
+    onnx     ONNX Runtime via `optimum` (optional dependency:
+             `pip install optimum[onnxruntime]`); the export is cached under
+             settings.onnx_dir and reused on the next load
+    stub     no model at all: EchoLLM / HashEmbeddings from src.stub_models,
+             for offline benchmarks and CI
+
+Selected with LLM_BACKEND / EMBEDDING_BACKEND; compare them with
+`python -m benchmarks.bench_backends`.
+"""
+import re
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, List, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from src.config import settings
+
+if TYPE_CHECKING:
+    from langchain_community.embeddings import HuggingFaceEmbeddings
+
+BACKENDS = ("torch", "int8", "compile", "onnx", "stub")
+
+
+def _check(backend: str) -> str:
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend {backend!r}; expected one of {', '.join(BACKENDS)}")
+    return backend
+
+
+def _onnx_dir(model_name: str, kind: str) -> Path:
+    return Path(settings.onnx_dir) / kind / re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name)
+
+
+def _import_optimum(cls_name: str):
+    try:
+        import optimum.onnxruntime as ort
+    except ImportError as e:
+        raise ImportError(
+            "The 'onnx' backend needs optimum with ONNX Runtime: pip install 'optimum[onnxruntime]'"
+        ) from e
+    return getattr(ort, cls_name)
+
+
+def _load_onnx(cls_name: str, model_name: str, kind: str):
+    """ORT model from the cached export, exporting it on first use."""
+    cls = _import_optimum(cls_name)
+    export_dir = _onnx_dir(model_name, kind)
+    if (export_dir / "model.onnx").exists():
+        return cls.from_pretrained(export_dir)
+    print(f"🔹 Exporting {model_name} to ONNX at {export_dir} (one-off)...")
+    model = cls.from_pretrained(model_name, export=True)
+    model.save_pretrained(export_dir)
+    return model
+
+
+def _cpu_only(backend: str) -> str:
+    import torch
+
+    if backend == "int8" and torch.cuda.is_available():
+        print("[inference] WARNING: int8 dynamic quantization is CPU-only; using the torch backend on CUDA")
+        return "torch"
+    return backend
+
+
+def quantize_int8(module):
+    """Dynamic int8 quantization of the Linear layers (weights int8, activations quantized on the fly)."""
+    import torch
+
+    # In place, so the float32 weights are not held twice while loading
+    return torch.ao.quantization.quantize_dynamic(module, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+
+
+def compile_forward(module):
+    """Compile the module's forward in place (keeps `.generate()` and attributes intact)."""
+    import torch
+
+    module.forward = torch.compile(module.forward, dynamic=True)
+    return module
+
+
+# ---------------------------------------------------------------------
+# --- Generator ---
+# ---------------------------------------------------------------------
+def load_causal_lm(model_name: str, backend: str) -> Tuple[Any, Any]:
+    """(model, tokenizer) for the text-generation pipeline, using `backend`."""
+    import torch
+    from transformers import AutoModelForCausalLM, AutoTokenizer
+
+    backend = _cpu_only(_check(backend))
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    if backend == "onnx":
+        return _load_onnx("ORTModelForCausalLM", model_name, "llm"), tokenizer
+
+    model = AutoModelForCausalLM.from_pretrained(
+        model_name,
+        torch_dtype=torch.float16 if torch.cuda.is_available() else torch.float32,
+        device_map="auto" if torch.cuda.is_available() else None,
+    )
+    model.eval()
+    if backend == "int8":
+        model = quantize_int8(model)
+    elif backend == "compile":
+        model = compile_forward(model)
+    return model, tokenizer
+
+
+# ---------------------------------------------------------------------
+# --- Embeddings ---
+# ---------------------------------------------------------------------
+class OnnxEmbeddings(Embeddings):
+    """
+    Sentence embeddings from an ONNX Runtime export: mean pooling over the
+    attention mask, then L2 normalization (what the MiniLM
+    sentence-transformers pipeline does).
+    """
+
+    def __init__(self, model_name: str, batch_size: int = 32):
+        from transformers import AutoTokenizer
+
+        self.model = _load_onnx("ORTModelForFeatureExtraction", model_name, "embeddings")
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        self.batch_size = batch_size
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        out = []
+        for i in range(0, len(texts), self.batch_size):
+            enc = self.tokenizer(
+                texts[i:i + self.batch_size], padding=True, truncation=True, return_tensors="np"
+            )
+            hidden = np.asarray(self.model(**enc).last_hidden_state, dtype=np.float32)
+            mask = enc["attention_mask"][..., None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            out.append(pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None))
+        return np.concatenate(out) if out else np.zeros((0, 0), dtype=np.float32)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._encode(list(texts)).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._encode([text])[0].tolist()
+
+
+def load_base_embeddings(model_name: str, backend: str) -> Embeddings:
+    """Uncached embedding model for `backend`."""
+    if _check(backend) == "stub":
+        from src.stub_models import HashEmbeddings
+
+        return HashEmbeddings()
+    backend = _cpu_only(backend)
+    if backend == "onnx":
+        return OnnxEmbeddings(model_name)
+
+    from langchain_community.embeddings import HuggingFaceEmbeddings
+
+    emb: "HuggingFaceEmbeddings" = HuggingFaceEmbeddings(model_name=model_name)
+    if backend == "int8":
+        emb.client = quantize_int8(emb.client)
+    elif backend == "compile":
+        # SentenceTransformer module 0 is the HF transformer the pipeline calls
+        compile_forward(emb.client[0].auto_model)
+    return emb
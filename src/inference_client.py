@@ -0,0 +1,155 @@
+# src/inference_client.py
+"""
+Client side of the shared inference server (USE_INFERENCE_SERVER=true).
+
+Every API worker keeps one InferenceClient: a pooled httpx client on the
+server's Unix socket or local HTTP port, with at most INFERENCE_POOL_SIZE
+requests in flight. A caller that cannot get a slot within
+INFERENCE_QUEUE_TIMEOUT_S, or that the server turns away because its own
+in-flight limit is reached, gets InferenceBusy (503 + Retry-After at the
+API) instead of queueing without bound.
+
+httpx is imported when the first client is built, so importing this
+module (the API does, for the exception handler) stays cheap.
+"""
+import json
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+UNIX_PREFIX = "unix:"
+
+
+class InferenceBusy(RuntimeError):
+    """No pool slot / server capacity for this request right now."""
+
+
+class InferenceClient:
+    def __init__(self, address: str, pool_size: int = 8, queue_timeout_s: float = 5.0, timeout_s: float = 120.0):
+        import httpx
+
+        self.address = address
+        self.pool_size = pool_size
+        self.queue_timeout_s = queue_timeout_s
+        limits = httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+        if address.startswith(UNIX_PREFIX):
+            transport = httpx.HTTPTransport(uds=address[len(UNIX_PREFIX):], limits=limits)
+            base_url = "http://inference"
+        else:
+            transport = httpx.HTTPTransport(limits=limits)
+            base_url = address.rstrip("/")
+        self._http = httpx.Client(base_url=base_url, transport=transport, timeout=timeout_s)
+        self._slots = threading.BoundedSemaphore(pool_size)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.requests = 0
+        self.rejected = 0
+
+    @contextmanager
+    def _slot(self) -> Iterator[None]:
+        if not self._slots.acquire(timeout=self.queue_timeout_s):
+            with self._lock:
+                self.rejected += 1
+            raise InferenceBusy(f"all {self.pool_size} inference connections busy for {self.queue_timeout_s}s")
+        with self._lock:
+            self.in_flight += 1
+            self.requests += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+            self._slots.release()
+
+    def _check(self, response) -> None:
+        if response.status_code == 503:
+            with self._lock:
+                self.rejected += 1
+            raise InferenceBusy("inference server at capacity")
+        if response.status_code == 504:
+            raise TimeoutError("generation timed out on the inference server")
+        response.raise_for_status()
+
+    def _post(self, path: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        with self._slot():
+            response = self._http.post(path, json=payload)
+            self._check(response)
+            return response.json()
+
+    # -- API -----------------------------------------------------------
+    def embed(self, texts: List[str], query: bool = False) -> List[List[float]]:
+        return self._post("/embed", {"texts": texts, "query": query})["vectors"]
+
+    def generate(self, prompt: str, max_new_tokens: Optional[int] = None) -> str:
+        return self._post("/generate", {"prompt": prompt, "max_new_tokens": max_new_tokens})["text"]
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        """Text pieces as the server generates them; closing the iterator cancels generation."""
+        with self._slot():
+            with self._http.stream("POST", "/generate/stream", json={"prompt": prompt}) as response:
+                if response.status_code != 200:
+                    response.read()
+                    self._check(response)
+                for line in response.iter_lines():
+                    if line:
+                        yield json.loads(line)["text"]
+
+    def health(self) -> Dict[str, Any]:
+        response = self._http.get("/health", timeout=2.0)
+        response.raise_for_status()
+        return response.json()
+
+    def wait_ready(self, timeout_s: float, require_models: bool = True) -> Dict[str, Any]:
+        """Poll /health until the server answers (and, by default, has its models loaded)."""
+        import httpx
+
+        deadline = time.monotonic() + timeout_s
+        while True:
+            try:
+                status = self.health()
+                if status.get("ready") or not require_models:
+                    return status
+                if status.get("error"):
+                    raise RuntimeError(f"inference server failed to start: {status['error']}")
+            except httpx.TransportError:
+                pass
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"inference server at {self.address} not ready after {timeout_s}s")
+            time.sleep(0.5)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "address": self.address,
+            "pool_size": self.pool_size,
+            "in_flight": self.in_flight,
+            "requests": self.requests,
+            "rejected": self.rejected,
+        }
+
+    def close(self) -> None:
+        self._http.close()
+
+
+def spawn_server(client: InferenceClient, start_timeout_s: float = 30.0) -> Optional[subprocess.Popen]:
+    """
+    Start `python -m src.main --inference-server` unless something already
+    answers at the client's address. Returns the child process (or None)
+    once the server is listening; models keep loading in the background.
+    """
+    try:
+        client.health()
+        print(f"🔹 Using the inference server already running at {client.address}")
+        return None
+    except Exception:
+        pass
+    print(f"🚀 Starting shared inference server at {client.address}")
+    proc = subprocess.Popen([sys.executable, "-m", "src.main", "--inference-server"])
+    try:
+        client.wait_ready(start_timeout_s, require_models=False)
+    except Exception:
+        proc.terminate()
+        raise
+    return proc
@@ -0,0 +1,151 @@
+# src/inference_server.py
+"""
+Shared inference server: one process owns the LLM, the embedding model,
+the prefix KV cache and the micro-batching scheduler, and serves every API
+worker over a Unix socket (or a local HTTP port).
+
+    POST /embed            {"texts": [...], "query": false} -> {"vectors": [...]}
+    POST /generate         {"prompt": "...", "max_new_tokens": null} -> {"text": "..."}
+    POST /generate/stream  {"prompt": "..."} -> NDJSON lines {"text": "..."}
+    GET  /health           registry status (ready once models are loaded)
+
+At most INFERENCE_SERVER_MAX_INFLIGHT requests run at once; beyond that
+the server answers 503 + Retry-After and the client raises InferenceBusy.
+Started by `python -m src.main` when USE_INFERENCE_SERVER=true, or on its
+own with `python -m src.main --inference-server`.
+"""
+import json
+import threading
+from contextlib import asynccontextmanager
+from typing import List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel
+from starlette.concurrency import iterate_in_threadpool
+
+from src.config import settings
+from src.inference_client import UNIX_PREFIX
+from src.registry import registry, GENERATION_KWARGS
+
+# This process owns the models; it must never forward to itself
+settings.use_inference_server = False
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    threading.Thread(
+        target=registry.startup,
+        kwargs={"warmup": settings.warmup_on_startup},
+        name="model-preload",
+        daemon=True,
+    ).start()
+    yield
+
+
+app = FastAPI(title="Mt Hotham Assistant inference server", lifespan=lifespan)
+
+_inflight_lock = threading.Lock()
+_inflight = 0
+
+
+class EmbedRequest(BaseModel):
+    texts: List[str]
+    query: bool = False
+
+
+class GenerateRequest(BaseModel):
+    prompt: str
+    max_new_tokens: Optional[int] = None
+
+
+@app.middleware("http")
+async def limit_inflight(request: Request, call_next):
+    global _inflight
+    if request.url.path == "/health":
+        return await call_next(request)
+    with _inflight_lock:
+        if _inflight >= settings.inference_server_max_inflight:
+            return JSONResponse(
+                status_code=503, headers={"Retry-After": "1"},
+                content={"ok": False, "message": "inference server at capacity"},
+            )
+        _inflight += 1
+    try:
+        return await call_next(request)
+    finally:
+        # Streaming responses release their slot once the headers are sent;
+        # the client-side pool still bounds them per API worker
+        with _inflight_lock:
+            _inflight -= 1
+
+
+@app.exception_handler(TimeoutError)
+async def generation_timeout_handler(request: Request, exc: TimeoutError):
+    return JSONResponse(status_code=504, content={"ok": False, "message": str(exc)})
+
+
+@app.get("/health")
+def health():
+    return {**registry.status(), "in_flight": _inflight}
+
+
+@app.post("/embed")
+def embed(req: EmbedRequest):
+    embeddings = registry.embeddings()
+    if req.query and len(req.texts) == 1:
+        return {"vectors": [embeddings.embed_query(req.texts[0])]}
+    return {"vectors": embeddings.embed_documents(req.texts)}
+
+
+@app.post("/generate")
+def generate(req: GenerateRequest):
+    if settings.batching_enabled:
+        text = registry.scheduler().submit(
+            req.prompt, max_new_tokens=req.max_new_tokens, timeout=settings.generation_timeout_s
+        )
+        return {"text": text}
+    kwargs = dict(GENERATION_KWARGS)
+    if req.max_new_tokens:
+        kwargs["max_new_tokens"] = req.max_new_tokens
+    prefix = registry.prefix_cache()
+    if prefix is not None:
+        return {"text": prefix.generate(req.prompt, **kwargs)}
+    return {"text": registry.llm().invoke(req.prompt)}
+
+
+@app.post("/generate/stream")
+async def generate_stream(req: GenerateRequest, request: Request):
+    from src.rag_chain import stream_tokens
+
+    cancel = threading.Event()
+
+    async def lines():
+        try:
+            async for text in iterate_in_threadpool(stream_tokens(req.prompt, cancel)):
+                if await request.is_disconnected():
+                    break
+                yield json.dumps({"text": text}, ensure_ascii=False) + "\n"
+        finally:
+            cancel.set()
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+def serve() -> None:
+    """Run the server on settings.inference_server (single process by design)."""
+    import os
+    from urllib.parse import urlparse
+
+    import uvicorn
+
+    address = settings.inference_server
+    if address.startswith(UNIX_PREFIX):
+        path = address[len(UNIX_PREFIX):]
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        if os.path.exists(path):
+            os.remove(path)  # stale socket from a previous run
+        uvicorn.run(app, uds=path, workers=1)
+    else:
+        url = urlparse(address)
+        uvicorn.run(app, host=url.hostname or "127.0.0.1", port=url.port or 8001, workers=1)
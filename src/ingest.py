@@ -1,66 +1,368 @@
 import os
-from typing import List
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_community.vectorstores import Chroma
-from langchain_core.documents import Document
-from langchain_huggingface import HuggingFaceEmbeddings
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
 
+from src import metrics
+from src.chunkers import CHUNK_OVERLAP, CHUNK_SIZE, CHUNKER_VERSION
 from src.config import settings
-from src.loaders import load_local_files, load_site
-from src.data_paths import DEFAULT_LOCAL_FILES, list_data_files
+from src.registry import registry, COLLECTION_NAME, close_vectordb, embedding_model_key, open_vectordb
+from src import data_paths
+from src.data_paths import list_data_files, index_sidecar_path
+from src.manifest import IngestManifest, chunk_id
+from src.generation import bump_generation
+from src.router import TAGGER_VERSION, intent_metadata
+from src import index_versions
+
+if TYPE_CHECKING:
+    # Splitter, Chroma, loaders (pandas) and the BM25 builder are imported
+    # where they are used, so `import src.ingest` stays cheap
+    from langchain_community.vectorstores import Chroma
+    from langchain_core.documents import Document
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+DELETE_BATCH_SIZE = 1000
+# Chunks read from the collection per get() when rebuilding the BM25 sidecar
+LEXICAL_PAGE_SIZE = 1000
+
+# Manifest key for crawled pages (they have no local file to stat)
+CRAWL_KEY = "crawl://site"
+
+# progress(stage, details) callback used by background ingest jobs
+ProgressFn = Callable[[str, Dict[str, Any]], None]
+
+
+def _no_progress(stage: str, details: Dict[str, Any]) -> None:
+    pass
+
+
+# -------------------------------------------------------------------------
+# 🔹 Chunking
+# -------------------------------------------------------------------------
+def _splitter() -> "RecursiveCharacterTextSplitter":
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    return RecursiveCharacterTextSplitter(
+        chunk_size=CHUNK_SIZE,
+        chunk_overlap=CHUNK_OVERLAP,
+        separators=["\n\n", "\n", ". ", " ", ""],
+        # Character offset in the parent document, used to merge neighbours at query time
+        add_start_index=True,
+    )
+
+
+def _chunk_with_ids(docs: List["Document"]) -> Tuple[List[str], List["Document"]]:
+    """
+    Split documents, tag each chunk with its intents and give it a
+    content-hash id. Identical chunks from the same source collapse into one.
+    Documents a format chunker marked `prechunked` are kept as they are.
+    """
+    ids: List[str] = []
+    chunks: List["Document"] = []
+    seen = set()
+    whole = [d for d in docs if d.metadata.get("prechunked")]
+    rest = [d for d in docs if not d.metadata.get("prechunked")]
+    for chunk in whole + (_splitter().split_documents(rest) if rest else []):
+        cid = chunk_id(chunk.metadata.get("source", ""), chunk.page_content)
+        if cid in seen:
+            continue
+        seen.add(cid)
+        chunk.metadata.update(intent_metadata(chunk.page_content))
+        ids.append(cid)
+        chunks.append(chunk)
+    return ids, chunks
+
+
+def _manifest_config() -> Dict[str, object]:
+    """Settings that invalidate every stored vector when they change."""
+    return {
+        "embedding_model": embedding_model_key(),
+        "collection": COLLECTION_NAME,
+        "vector_store": settings.vector_store,
+        "chunk_size": CHUNK_SIZE,
+        "chunk_overlap": CHUNK_OVERLAP,
+        "start_index": True,
+        "chunker": CHUNKER_VERSION,
+        "intent_tagger": TAGGER_VERSION,
+    }
+
+
+# -------------------------------------------------------------------------
+# 🔹 Vectorstore helpers
+# -------------------------------------------------------------------------
+def _open_vectorstore(chroma_dir: Optional[str] = None) -> "Chroma":
+    chroma_dir = chroma_dir or settings.chroma_dir
+    os.makedirs(chroma_dir, exist_ok=True)
+    return open_vectordb(registry.embeddings(), chroma_dir)
+
+
+def _delete_chunks(vectordb: "Chroma", ids: List[str]) -> None:
+    for i in range(0, len(ids), DELETE_BATCH_SIZE):
+        vectordb.delete(ids=ids[i:i + DELETE_BATCH_SIZE])
 
 
 # -------------------------------------------------------------------------
 # 🔹 Build Vectorstore (Local FAISS/Chroma)
 # -------------------------------------------------------------------------
-def build_vectorstore(docs: List[Document]) -> None:
+def build_vectorstore(docs: List["Document"], chroma_dir: Optional[str] = None) -> None:
     """
     Splits documents into manageable chunks, embeds them using a local model,
-    and saves a persistent Chroma vectorstore.
+    and saves a persistent Chroma vectorstore (full rebuild, no manifest).
     """
-    os.makedirs(settings.chroma_dir, exist_ok=True)
-
     print(f"🔹 Splitting {len(docs)} documents into chunks...")
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=800,
-        chunk_overlap=100,
-        separators=["\n\n", "\n", ". ", " ", ""],
-    )
-    chunks = splitter.split_documents(docs)
+    ids, chunks = _chunk_with_ids(docs)
     print(f"✅ Created {len(chunks)} chunks for embedding.")
 
-    # Local embedding model from config
-    print(f"🔹 Loading embedding model: {settings.embedding_model_name}")
-    embeddings = HuggingFaceEmbeddings(model_name=settings.embedding_model_name)
-
-    print(f"🔹 Building Chroma vectorstore at {settings.chroma_dir} ...")
-    vectordb = Chroma.from_documents(
-        documents=chunks,
-        embedding=embeddings,
-        persist_directory=settings.chroma_dir,
-        collection_name="mthotham",
-    )
+    print(f"🔹 Building {settings.vector_store} vectorstore at {chroma_dir or settings.chroma_dir} ...")
+    vectordb = _open_vectorstore(chroma_dir)
+    vectordb.delete_collection()
+    vectordb = _open_vectorstore(chroma_dir)
+    for i in range(0, len(chunks), settings.ingest_batch_size):
+        vectordb.add_documents(
+            chunks[i:i + settings.ingest_batch_size], ids=ids[i:i + settings.ingest_batch_size]
+        )
     vectordb.persist()
+    build_lexical_index(vectordb, chroma_dir)
     print("✅ Vectorstore successfully built and persisted.")
 
 
+def build_lexical_index(vectordb: "Chroma", chroma_dir: Optional[str] = None) -> None:
+    """
+    Rebuild the BM25 sidecar from exactly the chunks now in the collection,
+    paging through it LEXICAL_PAGE_SIZE chunks per get() instead of one
+    call that materializes the whole collection.
+    """
+    from src.lexical import LexicalIndexBuilder
+
+    builder = LexicalIndexBuilder()
+    offset = 0
+    while True:
+        page = vectordb.get(include=["documents", "metadatas"], limit=LEXICAL_PAGE_SIZE, offset=offset)
+        builder.add(page["ids"], page["documents"], page["metadatas"])
+        if len(page["ids"]) < LEXICAL_PAGE_SIZE:
+            break
+        offset += LEXICAL_PAGE_SIZE
+    index = builder.build()
+    index.save(index_sidecar_path("bm25", chroma_dir))
+    print(f"✅ BM25 index rebuilt over {len(index.ids)} chunks ({len(index.vocab)} terms).")
+
+
+class _Throughput:
+    """Items and seconds per ingest stage, for docs/s, chunks/s, embeddings/s logging."""
+
+    def __init__(self) -> None:
+        self.items: Dict[str, int] = {}
+        self.seconds: Dict[str, float] = {}
+
+    def add(self, stage: str, items: int, seconds: float) -> None:
+        self.items[stage] = self.items.get(stage, 0) + items
+        self.seconds[stage] = self.seconds.get(stage, 0.0) + seconds
+
+    def report(self) -> Dict[str, Dict[str, float]]:
+        return {
+            stage: {
+                "items": n,
+                "seconds": round(self.seconds[stage], 3),
+                "per_s": round(n / self.seconds[stage], 1) if self.seconds[stage] else 0.0,
+            }
+            for stage, n in self.items.items()
+        }
+
+    def log(self) -> None:
+        units = {"parse": "docs", "split": "chunks", "embed": "embeddings"}
+        for stage, r in self.report().items():
+            print(f"   ⏱️  {stage:<6} {r['items']:>7} {units.get(stage, 'items')} in {r['seconds']:.2f}s ({r['per_s']}/s)")
+
+
+class _UpsertBuffer:
+    """Accumulates new chunks and embeds + upserts them in fixed-size batches."""
+
+    def __init__(self, vectordb: "Chroma", batch_size: int, throughput: _Throughput):
+        self.vectordb = vectordb
+        self.batch_size = batch_size
+        self.throughput = throughput
+        self.ids: List[str] = []
+        self.chunks: List["Document"] = []
+
+    def add(self, ids: List[str], chunks: List["Document"]) -> None:
+        self.ids.extend(ids)
+        self.chunks.extend(chunks)
+        while len(self.ids) >= self.batch_size:
+            self._flush(self.batch_size)
+
+    def flush(self) -> None:
+        while self.ids:
+            self._flush(self.batch_size)
+
+    def _flush(self, n: int) -> None:
+        ids, chunks = self.ids[:n], self.chunks[:n]
+        del self.ids[:n], self.chunks[:n]
+        t0 = time.perf_counter()
+        self.vectordb.add_documents(chunks, ids=ids)
+        self.throughput.add("embed", len(ids), time.perf_counter() - t0)
+
+
+def sync_vectorstore(
+    paths: List[str],
+    site_docs: Optional[List["Document"]] = None,
+    full_rebuild: bool = False,
+    chroma_dir: Optional[str] = None,
+    progress: ProgressFn = _no_progress,
+) -> Dict[str, Any]:
+    """
+    Incrementally bring the Chroma collection in line with `paths`
+    (and crawled `site_docs`, if given) using the ingest manifest:
+    - unchanged files (mtime/size, then sha256) are skipped entirely
+    - changed files are parsed concurrently and split one file at a time
+    - only new chunk hashes get embedded, in bounded upsert batches
+    - vectors for vanished chunks / deleted files are removed
+    """
+    from src.loaders import iter_local_files
+
+    manifest_path = index_sidecar_path("manifest.json", chroma_dir)
+    config = _manifest_config()
+    manifest = None if full_rebuild else IngestManifest.load(manifest_path)
+
+    vectordb = _open_vectorstore(chroma_dir)
+    if manifest is None or manifest.config != config:
+        # No usable manifest: the collection may hold vectors we cannot
+        # account for, so start from an empty one.
+        print("🔹 No compatible ingest manifest; rebuilding collection from scratch.")
+        vectordb.delete_collection()
+        vectordb = _open_vectorstore(chroma_dir)
+        manifest = IngestManifest(manifest_path, config)
+
+    stats: Dict[str, Any] = {
+        "added": 0, "removed": 0, "unchanged": 0,
+        "files_changed": 0, "files_unchanged": 0, "files_removed": 0,
+    }
+    throughput = _Throughput()
+    buffer = _UpsertBuffer(vectordb, settings.ingest_batch_size, throughput)
+
+    def _apply(key: str, docs: List["Document"], path: Optional[Path]) -> None:
+        t0 = time.perf_counter()
+        old_ids = set(manifest.chunk_ids(key))
+        ids, chunks = _chunk_with_ids(docs)
+        throughput.add("split", len(ids), time.perf_counter() - t0)
+        new = [(i, c) for i, c in zip(ids, chunks) if i not in old_ids]
+        stale = list(old_ids - set(ids))
+        if stale:
+            _delete_chunks(vectordb, stale)
+        if new:
+            buffer.add([i for i, _ in new], [c for _, c in new])
+        manifest.record(key, path, ids)
+        stats["added"] += len(new)
+        stats["removed"] += len(stale)
+        stats["unchanged"] += len(ids) - len(new)
+        stats["files_changed"] += 1
+        progress("embedding", {
+            "files_done": stats["files_changed"], "files_total": len(changed) + (site_docs is not None),
+            "chunks_added": stats["added"],
+        })
+
+    # 1. Cheap change detection (stat, then hash) before any parsing
+    seen_keys = set()
+    changed: Dict[str, str] = {}  # path as given -> manifest key
+    for p in paths:
+        path = Path(p)
+        if not path.exists():
+            print(f"[ingest] WARNING: file not found, skipping: {p}")
+            continue
+        key = str(path.resolve())
+        if key in seen_keys:
+            continue
+        seen_keys.add(key)
+        if manifest.is_unchanged(key, path):
+            stats["unchanged"] += len(manifest.chunk_ids(key))
+            stats["files_unchanged"] += 1
+            continue
+        changed[p] = key
+    progress("parsing", {"files_changed": len(changed), "files_unchanged": stats["files_unchanged"]})
+
+    # 2. Parse changed files in a pool; split + embed as each one arrives
+    t_start = time.perf_counter()
+    for p, docs in iter_local_files(
+        list(changed), max_workers=settings.ingest_workers, use_processes=settings.ingest_use_processes
+    ):
+        throughput.add("parse", len(docs), 0.0)
+        _apply(changed[p], docs, Path(p))
+    if changed:
+        throughput.seconds["parse"] = time.perf_counter() - t_start
+
+    if site_docs is not None:
+        seen_keys.add(CRAWL_KEY)
+        _apply(CRAWL_KEY, site_docs, None)
+    elif CRAWL_KEY in manifest.files:
+        # Crawl not requested this run: keep previously crawled pages
+        seen_keys.add(CRAWL_KEY)
+    buffer.flush()
+
+    for key in [k for k in manifest.files if k not in seen_keys]:
+        stale = manifest.chunk_ids(key)
+        _delete_chunks(vectordb, stale)
+        del manifest.files[key]
+        stats["removed"] += len(stale)
+        stats["files_removed"] += 1
+
+    vectordb.persist()
+    manifest.save()
+    progress("indexing", {"chunks_added": stats["added"], "chunks_removed": stats["removed"]})
+    with metrics.span("ingest", "lexical_index"):
+        build_lexical_index(vectordb, chroma_dir)
+    print(
+        f"✅ Vectorstore synced: +{stats['added']} / -{stats['removed']} chunks, "
+        f"{stats['unchanged']} unchanged."
+    )
+    throughput.log()
+    for stage, n in throughput.items.items():
+        metrics.record("ingest", stage, throughput.seconds[stage])
+        metrics.INGEST_ITEMS.inc(n, stage=stage)
+    stats["throughput"] = throughput.report()
+    return stats
+
+
 # -------------------------------------------------------------------------
 # 🔹 Main Ingest Function
 # -------------------------------------------------------------------------
 def run_ingest(
-    include_crawl: bool = False, crawl_depth: int = 1, extra_paths: List[str] = None
+    include_crawl: bool = False,
+    crawl_depth: int = 1,
+    extra_paths: List[str] = None,
+    full_rebuild: bool = False,
+    crawl_cache_only: bool = False,
+    progress: ProgressFn = _no_progress,
 ) -> dict:
     """
-    Ingests local and/or crawled data, embeds it, and saves to Chroma.
+    Ingests local and/or crawled data, embeds only new or changed chunks,
+    and saves to Chroma.
+
+    The sync runs against a fresh index version (a copy of the active one);
+    only once it has finished is the active pointer switched, so readers
+    never see a half-written collection. Stage timings go to /metrics and
+    into the result under "timings".
     """
-    documents: List[Document] = []
+    with metrics.trace() as trace:
+        res = _ingest(include_crawl, crawl_depth, extra_paths, full_rebuild, crawl_cache_only, progress)
+    res["timings"] = trace.as_dict()
+    return res
+
 
+def _ingest(
+    include_crawl: bool,
+    crawl_depth: int,
+    extra_paths: Optional[List[str]],
+    full_rebuild: bool,
+    crawl_cache_only: bool,
+    progress: ProgressFn,
+) -> dict:
+    progress("scanning", {})
     # 1️⃣ Auto-scan data_files/ for available data
-    scanned = list_data_files()
+    with metrics.span("ingest", "scan"):
+        scanned = list_data_files()
     paths = scanned.copy()
 
     # 2️⃣ Include default fallback paths (if defined)
-    for p in DEFAULT_LOCAL_FILES:
+    for p in data_paths.DEFAULT_LOCAL_FILES:
         if p not in paths:
             paths.append(p)
 
@@ -71,28 +373,69 @@ def run_ingest(
                 paths.append(p)
 
     print(f"🔹 Ingesting local files ({len(paths)}): {paths}")
-    local_docs = load_local_files(paths)
-    documents.extend(local_docs)
 
     # 4️⃣ Optional crawl (scrape site data)
+    site_docs = None
     if include_crawl:
-        print(f"🔹 Crawling ARV / Mt Hotham site data (depth={crawl_depth})...")
-        site_docs = load_site(max_depth=crawl_depth)
-        documents.extend(site_docs)
+        print(f"🔹 Crawling ARV / Mt Hotham site data (depth={crawl_depth}, cache_only={crawl_cache_only})...")
+        progress("crawling", {"depth": crawl_depth, "cache_only": crawl_cache_only})
+        from src.loaders import load_site
+
+        with metrics.span("ingest", "crawl"):
+            site_docs = load_site(max_depth=crawl_depth, cache_only=crawl_cache_only)
 
-    if not documents:
+    if not paths and not site_docs:
         return {
             "ok": False,
             "message": "No documents to ingest (is data_files/ empty?)",
         }
 
-    # 5️⃣ Build vectorstore
-    build_vectorstore(documents)
+    # 5️⃣ Sync a staging copy of the index (only new/changed chunks are embedded)
+    progress("staging", {})
+    with metrics.span("ingest", "stage"):
+        chroma_dir = index_versions.new_version(copy_active=not full_rebuild)
+    try:
+        with metrics.span("ingest", "sync"):
+            stats = sync_vectorstore(
+                paths, site_docs=site_docs, full_rebuild=full_rebuild, chroma_dir=chroma_dir, progress=progress
+            )
+    except Exception:
+        close_vectordb(chroma_dir)
+        index_versions.discard_version(chroma_dir)
+        raise
+    # The staging handle is done; workers open the version fresh once active
+    close_vectordb(chroma_dir)
+
+    # 6️⃣ Atomically make the new version the one /chat reads. A refresh
+    # that changed nothing keeps the active index: activating an identical
+    # copy would push the last real change out of `previous` (and rollback)
+    if not full_rebuild and not stats["added"] and not stats["removed"]:
+        index_versions.discard_version(chroma_dir)
+        chroma_dir = index_versions.active_chroma_dir()
+        pointer = {"active": chroma_dir, "previous": index_versions.previous_chroma_dir()}
+        print(f"✅ Index unchanged, keeping {chroma_dir}")
+    else:
+        progress("activating", {"chroma_dir": chroma_dir})
+        with metrics.span("ingest", "activate"):
+            pointer = index_versions.activate(chroma_dir)
+    stats["active_index"] = pointer["active"]
+    stats["previous_index"] = pointer["previous"]
+
+    # 7️⃣ Refresh the columnar visitation / snow tables
+    with metrics.span("ingest", "structured"):
+        registry.structured().load(paths)
+    if stats["added"] or stats["removed"]:
+        # New data landed: invalidate answers cached against the old index
+        stats["generation"] = bump_generation()
 
     return {
         "ok": True,
-        "message": f"Ingested {len(documents)} source docs into {settings.chroma_dir}.",
+        "message": (
+            f"Ingested {len(paths)} local files into {chroma_dir} "
+            f"(+{stats['added']} / -{stats['removed']} chunks, {stats['unchanged']} unchanged)."
+        ),
         "model": settings.embedding_model_name,
+        **stats,
     }
 
 
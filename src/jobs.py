@@ -0,0 +1,92 @@
+# src/jobs.py
+"""
+Background ingest jobs.
+
+POST /ingest queues a job and returns its id straight away; a single
+worker thread runs jobs one at a time (each builds its own index version,
+see src/index_versions.py) and GET /ingest/{id} reads the recorded stage
+and progress. Job state lives in the API process, so with several uvicorn
+workers poll the worker that accepted the job (the index switch itself is
+visible to all of them).
+"""
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+
+@dataclass
+class IngestJob:
+    id: str
+    params: Dict[str, Any]
+    status: str = "queued"  # queued | running | succeeded | failed
+    stage: str = "queued"
+    progress: Dict[str, Any] = field(default_factory=dict)
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        out = asdict(self)
+        end = self.finished_at or time.time()
+        out["elapsed_s"] = round(end - self.started_at, 2) if self.started_at else None
+        return out
+
+
+class IngestJobManager:
+    def __init__(self, run: Callable[..., Dict[str, Any]], max_history: int = 50,
+                 on_success: Optional[Callable[[Dict[str, Any]], None]] = None):
+        self._run = run
+        self._on_success = on_success
+        self._max_history = max_history
+        self._lock = threading.Lock()
+        self._jobs: "OrderedDict[str, IngestJob]" = OrderedDict()
+        # One job at a time: each starts from the index the previous one activated
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ingest-job")
+
+    def submit(self, **params: Any) -> IngestJob:
+        job = IngestJob(id=uuid.uuid4().hex[:12], params=params)
+        with self._lock:
+            self._jobs[job.id] = job
+            while len(self._jobs) > self._max_history:
+                oldest = next(iter(self._jobs.values()))
+                if oldest.status in ("queued", "running"):
+                    break
+                self._jobs.popitem(last=False)
+        self._executor.submit(self._execute, job)
+        return job
+
+    def get(self, job_id: str) -> Optional[IngestJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self) -> List[IngestJob]:
+        with self._lock:
+            return list(self._jobs.values())
+
+    def _execute(self, job: IngestJob) -> None:
+        def progress(stage: str, details: Dict[str, Any]) -> None:
+            job.stage = stage
+            job.progress = dict(details)
+
+        job.status, job.started_at = "running", time.time()
+        try:
+            result = self._run(**job.params, progress=progress)
+            if not result.get("ok"):
+                job.status, job.error = "failed", result.get("message")
+            else:
+                if self._on_success is not None:
+                    self._on_success(result)
+                job.status = "succeeded"
+            job.result = result
+            job.stage = "done"
+        except Exception as e:
+            print(f"❌ Ingest job {job.id} failed: {e}")
+            job.status, job.error = "failed", str(e)
+        finally:
+            job.finished_at = time.time()
@@ -0,0 +1,190 @@
+# src/lexical.py
+"""
+Compact in-process BM25 index over the ingested chunks.
+
+Postings are stored CSR-style in flat NumPy arrays (term offsets, doc ids,
+term frequencies) and persisted next to the Chroma directory:
+    <chroma_dir>.bm25.npz   offsets / doc_ids / tfs / doc_len
+    <chroma_dir>.bm25.json  vocabulary + chunk ids, texts, metadata
+"""
+import json
+import os
+import re
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_CAMEL_RE = re.compile(r"(?<=[a-z])(?=[A-Z])")
+_TOKEN_RE = re.compile(r"\d{4}/\d{2}|[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have how i in is it its of on or that the this to was were what when "
+    "where which who why will with you your can do does".split()
+)
+# Spelling variants that should hit the same postings
+_SYNONYMS = {"mount": "mt", "mtn": "mt"}
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lower-cased word tokens with CamelCase split ("MtStirling" -> mt, stirling),
+    "mount" folded to "mt", and seasons kept whole ("2019/20") alongside
+    their start year.
+    """
+    text = _CAMEL_RE.sub(" ", text).lower()
+    out: List[str] = []
+    for tok in _TOKEN_RE.findall(text):
+        if tok in _STOPWORDS:
+            continue
+        if "/" in tok:
+            out.append(tok[:4])
+        out.append(_SYNONYMS.get(tok, tok))
+    return out
+
+
+class LexicalIndex:
+    def __init__(
+        self,
+        vocab: Dict[str, int],
+        offsets: np.ndarray,
+        doc_ids: np.ndarray,
+        tfs: np.ndarray,
+        doc_len: np.ndarray,
+        ids: List[str],
+        texts: List[str],
+        metadatas: List[dict],
+    ):
+        self.vocab = vocab
+        self.offsets = offsets
+        self.doc_ids = doc_ids
+        self.tfs = tfs
+        self.doc_len = doc_len
+        self.ids = ids
+        self.texts = texts
+        self.metadatas = metadatas
+        n = len(ids)
+        self.avgdl = float(doc_len.mean()) if n else 0.0
+        df = np.diff(offsets).astype(np.float32)
+        self.idf = np.log(1.0 + (n - df + 0.5) / (df + 0.5)).astype(np.float32)
+        self._flag_masks: Dict[str, np.ndarray] = {}
+        self._norm = (BM25_K1 * (1 - BM25_B + BM25_B * doc_len / self.avgdl)).astype(np.float32) if n else doc_len
+
+    # -- building ------------------------------------------------------
+    @classmethod
+    def build(cls, ids: List[str], texts: List[str], metadatas: List[dict]) -> "LexicalIndex":
+        builder = LexicalIndexBuilder()
+        builder.add(ids, texts, metadatas)
+        return builder.build()
+
+    # -- persistence ---------------------------------------------------
+    @staticmethod
+    def _paths(prefix: Path) -> Tuple[Path, Path]:
+        return prefix.with_name(prefix.name + ".npz"), prefix.with_name(prefix.name + ".json")
+
+    def save(self, prefix: Path) -> None:
+        npz_path, json_path = self._paths(Path(prefix))
+        npz_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_npz = npz_path.with_name(npz_path.name + ".tmp.npz")
+        np.savez(tmp_npz, offsets=self.offsets, doc_ids=self.doc_ids, tfs=self.tfs, doc_len=self.doc_len)
+        terms = sorted(self.vocab, key=self.vocab.get)
+        tmp_json = json_path.with_name(json_path.name + ".tmp")
+        tmp_json.write_text(
+            json.dumps({"terms": terms, "ids": self.ids, "texts": self.texts, "metadatas": self.metadatas},
+                       ensure_ascii=False),
+            encoding="utf-8",
+        )
+        os.replace(tmp_npz, npz_path)
+        os.replace(tmp_json, json_path)
+
+    @classmethod
+    def load(cls, prefix: Path) -> Optional["LexicalIndex"]:
+        npz_path, json_path = cls._paths(Path(prefix))
+        if not (npz_path.exists() and json_path.exists()):
+            return None
+        try:
+            arrays = np.load(npz_path)
+            side = json.loads(json_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            print(f"[lexical] WARNING: could not load BM25 index {npz_path}: {e}")
+            return None
+        vocab = {t: i for i, t in enumerate(side["terms"])}
+        return cls(vocab, arrays["offsets"], arrays["doc_ids"], arrays["tfs"], arrays["doc_len"],
+                   side["ids"], side["texts"], side["metadatas"])
+
+    # -- search --------------------------------------------------------
+    def _flag_mask(self, flag: str) -> np.ndarray:
+        mask = self._flag_masks.get(flag)
+        if mask is None:
+            mask = np.fromiter((bool(m.get(flag)) for m in self.metadatas), dtype=bool, count=len(self.ids))
+            self._flag_masks[flag] = mask
+        return mask
+
+    def search(self, query: str, k: int, metadata_flag: Optional[str] = None) -> List[Tuple[Document, float]]:
+        """Top-k BM25 hits; `metadata_flag` restricts to chunks with that flag set."""
+        if not self.ids:
+            return []
+        scores = np.zeros(len(self.ids), dtype=np.float32)
+        for term in set(tokenize(query)):
+            tid = self.vocab.get(term)
+            if tid is None:
+                continue
+            lo, hi = self.offsets[tid], self.offsets[tid + 1]
+            docs = self.doc_ids[lo:hi]
+            tf = self.tfs[lo:hi].astype(np.float32)
+            scores[docs] += self.idf[tid] * tf * (BM25_K1 + 1) / (tf + self._norm[docs])
+        if metadata_flag is not None:
+            scores[~self._flag_mask(metadata_flag)] = 0.0
+        nonzero = int(np.count_nonzero(scores))
+        if nonzero == 0:
+            return []
+        k = min(k, nonzero)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [
+            (Document(page_content=self.texts[i], metadata=self.metadatas[i]), float(scores[i]))
+            for i in top
+        ]
+
+
+class LexicalIndexBuilder:
+    """Collects postings a page of chunks at a time; build() packs them CSR-style."""
+
+    def __init__(self) -> None:
+        self.vocab: Dict[str, int] = {}
+        self._per_term: List[List[Tuple[int, int]]] = []
+        self._doc_len: List[int] = []
+        self.ids: List[str] = []
+        self.texts: List[str] = []
+        self.metadatas: List[dict] = []
+
+    def add(self, ids: List[str], texts: List[str], metadatas: List[Optional[dict]]) -> None:
+        for text in texts:
+            d = len(self._doc_len)
+            counts = Counter(tokenize(text))
+            self._doc_len.append(sum(counts.values()))
+            for term, tf in counts.items():
+                tid = self.vocab.setdefault(term, len(self.vocab))
+                if tid == len(self._per_term):
+                    self._per_term.append([])
+                self._per_term[tid].append((d, tf))
+        self.ids.extend(ids)
+        self.texts.extend(texts)
+        self.metadatas.extend(dict(m or {}) for m in metadatas)
+
+    def build(self) -> LexicalIndex:
+        offsets = np.zeros(len(self.vocab) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(p) for p in self._per_term])
+        doc_ids = np.empty(offsets[-1], dtype=np.int32)
+        tfs = np.empty(offsets[-1], dtype=np.uint16)
+        for tid, postings in enumerate(self._per_term):
+            lo = offsets[tid]
+            for j, (d, tf) in enumerate(postings):
+                doc_ids[lo + j] = d
+                tfs[lo + j] = min(tf, 65535)
+        doc_len = np.asarray(self._doc_len, dtype=np.float32)
+        return LexicalIndex(self.vocab, offsets, doc_ids, tfs, doc_len, self.ids, self.texts, self.metadatas)
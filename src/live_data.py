@@ -0,0 +1,123 @@
+# src/live_data.py
+"""
+Live conditions store for fast-changing files (LIVE_DATA_FILES, default
+hotham_snow.csv).
+
+These files are left out of ingest, so they are never embedded or indexed.
+The store keeps the latest values of each one in memory with the file's
+modification time. Files are polled lazily: when the store is read and
+LIVE_DATA_POLL_S has passed since the last check, every live file is
+stat()ed and only those whose mtime or size changed are parsed again.
+Dropping a new hotham_snow.csv into data_files/ therefore shows up in the
+next weather answer, with no ingest and no re-embedding.
+
+    CSV   last row: {column: value}
+    JSON  top-level scalar fields of an object
+"""
+import csv
+import json
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from src.config import settings
+from src.data_paths import list_live_data_files
+
+
+@dataclass
+class LiveReading:
+    name: str
+    values: Dict[str, Any]
+    updated_at: str  # file mtime, ISO 8601
+    signature: Tuple[int, int] = field(repr=False, default=(0, 0))
+
+    def facts(self) -> List[str]:
+        return [f"{k}: {_fmt(v)}" for k, v in self.values.items()]
+
+
+def _fmt(value: Any) -> str:
+    return f"{value:g}" if isinstance(value, float) else str(value)
+
+
+def _number(text: str) -> Any:
+    try:
+        return float(text)
+    except (TypeError, ValueError):
+        return text.strip() if isinstance(text, str) else text
+
+
+def _parse(path: Path) -> Dict[str, Any]:
+    if path.suffix.lower() == ".csv":
+        with path.open(newline="", encoding="utf-8", errors="ignore") as f:
+            rows = [r for r in csv.DictReader(f) if any((v or "").strip() for v in r.values())]
+        if not rows:
+            return {}
+        return {k.strip(): _number(v) for k, v in rows[-1].items() if k and (v or "").strip()}
+    if path.suffix.lower() == ".json":
+        data = json.loads(path.read_text(encoding="utf-8", errors="ignore"))
+        if isinstance(data, dict):
+            return {k: v for k, v in data.items() if isinstance(v, (str, int, float, bool))}
+        return {}
+    return {"text": path.read_text(encoding="utf-8", errors="ignore").strip()}
+
+
+class LiveDataStore:
+    def __init__(self, poll_interval_s: float = 10.0):
+        self.poll_interval_s = poll_interval_s
+        self._lock = threading.Lock()
+        self._readings: Dict[str, LiveReading] = {}
+        self._last_poll = float("-inf")
+        self.reloads = 0
+
+    def refresh(self, force: bool = False) -> None:
+        """Re-read live files whose mtime/size changed (at most once per poll interval)."""
+        now = time.monotonic()
+        if not force and now - self._last_poll < self.poll_interval_s:
+            return
+        with self._lock:
+            if not force and now - self._last_poll < self.poll_interval_s:
+                return
+            readings: Dict[str, LiveReading] = {}
+            for p in list_live_data_files():
+                path = Path(p)
+                previous = self._readings.get(path.name)
+                try:
+                    st = path.stat()
+                    signature = (st.st_mtime_ns, st.st_size)
+                    if previous is not None and previous.signature == signature:
+                        readings[path.name] = previous
+                        continue
+                    updated = datetime.fromtimestamp(st.st_mtime, ZoneInfo(settings.app_timezone))
+                    readings[path.name] = LiveReading(
+                        path.name, _parse(path), updated.isoformat(timespec="seconds"), signature
+                    )
+                    self.reloads += 1
+                except Exception as e:
+                    # e.g. caught mid-write: keep serving the last good values
+                    print(f"[live_data] ERROR reading {p}: {e}")
+                    if previous is not None:
+                        readings[path.name] = previous
+            self._readings = readings
+            self._last_poll = now
+
+    def get(self, name: str) -> Optional[LiveReading]:
+        self.refresh()
+        return self._readings.get(name)
+
+    def readings(self) -> List[LiveReading]:
+        self.refresh()
+        return [r for r in self._readings.values() if r.values]
+
+    def context(self) -> List[str]:
+        """Prompt lines: one per live file, its values tagged with the update time."""
+        return [f"{r.name} (updated {r.updated_at}): " + "; ".join(r.facts()) for r in self.readings()]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "files": {name: r.updated_at for name, r in self._readings.items()},
+            "reloads": self.reloads,
+        }
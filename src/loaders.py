@@ -1,14 +1,14 @@
-from typing import List, Iterable
+import asyncio
+from typing import List, Iterable, Iterator, Tuple
 from pathlib import Path
-from bs4 import SoupStrainer
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from itertools import islice
 from langchain_core.documents import Document
 import json
 import pandas as pd
 
-from langchain_community.document_loaders import RecursiveUrlLoader
-
-# Optional crawler (kept for future use)
-from langchain_community.document_loaders import RecursiveUrlLoader
+from src import chunkers
+from src.config import settings
 
 DEFAULT_URLS = [
     "https://www.mthotham.com.au/",
@@ -19,25 +19,25 @@ DEFAULT_URLS = [
     "https://www.mthotham.com.au/on-the-mountain/safety",
 ]
 
-def load_site(urls: List[str] = None, max_depth: int = 1) -> List[Document]:
-    urls = urls or DEFAULT_URLS
-    docs_all: List[Document] = []
-    for u in urls:
-        loader = RecursiveUrlLoader(
-            url=u,
-            max_depth=max_depth,
-            use_async=True,
-            extractor=lambda x: SoupStrainer(["article","main","section","div","p","li","h1","h2","h3"]),
-        )
-        docs = loader.load()
-        seen = set()
-        for d in docs:
-            key = (d.metadata.get("source",""), d.page_content.strip())
-            if key in seen:
-                continue
-            seen.add(key)
-            docs_all.append(d)
-    return docs_all
+def load_site(urls: List[str] = None, max_depth: int = 1, cache_only: bool = False) -> List[Document]:
+    """
+    Crawl the seed URLs concurrently with one pooled client, deduplicating
+    URLs and page content across all seeds. Unchanged pages are revalidated
+    with ETag / Last-Modified and read from the local page cache.
+    `cache_only` skips the network and returns what the page cache holds.
+    """
+    from src.crawler import SiteCrawler  # httpx / bs4 only when crawling
+
+    crawler = SiteCrawler(
+        settings.crawl_cache_dir,
+        max_concurrency=settings.crawl_concurrency,
+        timeout_s=settings.crawl_timeout_s,
+    )
+    if cache_only:
+        return crawler.cached_documents()
+    result = asyncio.run(crawler.crawl(urls or DEFAULT_URLS, max_depth=max_depth))
+    print(f"[load_site] {len(result.documents)} unique pages; {result.stats.as_dict()}")
+    return result.documents
 
 # ----- Local files (CSV / JSON / TXT / MD) -----
 
@@ -48,38 +48,75 @@ def _rows_to_docs(rows: Iterable[dict], source: str, doc_tag: str) -> List[Docum
         out.append(Document(page_content=text, metadata={"source": source, "row_index": i, "doc_type": doc_tag}))
     return out
 
-def load_local_files(paths: List[str]) -> List[Document]:
+def load_file(p: str) -> List[Document]:
+    """Parse one CSV / JSON / TXT / MD file into documents (safe to run in a worker)."""
     out: List[Document] = []
-    for p in paths:
-        path = Path(p)
-        if not path.exists():
-            print(f"[load_local_files] WARNING: file not found, skipping: {p}")
-            continue
-        src = str(path.resolve())
-        suff = path.suffix.lower()
-        try:
-            if suff == ".csv":
+    path = Path(p)
+    if not path.exists():
+        print(f"[load_local_files] WARNING: file not found, skipping: {p}")
+        return out
+    src = str(path.resolve())
+    suff = path.suffix.lower()
+    try:
+        if suff == ".csv":
+            if chunkers.is_visitation_table(path):
+                out.extend(chunkers.chunk_visitation_table(path, src))
+            else:
                 df = pd.read_csv(path)
                 out.extend(_rows_to_docs(df.to_dict(orient="records"), src, "csv"))
-            elif suff == ".json":
-                data = json.loads(path.read_text(encoding="utf-8", errors="ignore"))
-                if isinstance(data, list):
-                    out.extend(_rows_to_docs(data, src, "json"))
-                elif isinstance(data, dict):
-                    out.append(Document(page_content=json.dumps(data, ensure_ascii=False, indent=2),
-                                        metadata={"source": src, "doc_type": "json"}))
-                    for k, v in data.items():
-                        out.append(Document(
-                            page_content=f"key: {k}\nvalue: {json.dumps(v, ensure_ascii=False)}",
-                            metadata={"source": src, "json_key": k, "doc_type": "json"}
-                        ))
-                else:
-                    out.append(Document(page_content=str(data), metadata={"source": src, "doc_type": "json"}))
-            elif suff in {".txt", ".md"}:
-                out.append(Document(page_content=path.read_text(encoding="utf-8", errors="ignore"),
-                                    metadata={"source": src, "doc_type": "text"}))
+        elif suff == ".json":
+            data = json.loads(path.read_text(encoding="utf-8", errors="ignore"))
+            if isinstance(data, list):
+                out.extend(_rows_to_docs(data, src, "json"))
+            elif isinstance(data, dict) and (chunked := chunkers.chunk_json(data, src)) is not None:
+                out.extend(chunked)
+            elif isinstance(data, dict):
+                out.append(Document(page_content=json.dumps(data, ensure_ascii=False, indent=2),
+                                    metadata={"source": src, "doc_type": "json"}))
+                for k, v in data.items():
+                    out.append(Document(
+                        page_content=f"key: {k}\nvalue: {json.dumps(v, ensure_ascii=False)}",
+                        metadata={"source": src, "json_key": k, "doc_type": "json"}
+                    ))
             else:
-                print(f"[load_local_files] NOTE: unsupported type {suff} for {p}, skipping.")
-        except Exception as e:
-            print(f"[load_local_files] ERROR reading {p}: {e}")
+                out.append(Document(page_content=str(data), metadata={"source": src, "doc_type": "json"}))
+        elif suff in {".txt", ".md"}:
+            out.append(Document(page_content=path.read_text(encoding="utf-8", errors="ignore"),
+                                metadata={"source": src, "doc_type": "text"}))
+        else:
+            print(f"[load_local_files] NOTE: unsupported type {suff} for {p}, skipping.")
+    except Exception as e:
+        print(f"[load_local_files] ERROR reading {p}: {e}")
     return out
+
+def load_local_files(paths: List[str]) -> List[Document]:
+    out: List[Document] = []
+    for p in paths:
+        out.extend(load_file(p))
+    return out
+
+def iter_local_files(
+    paths: List[str], max_workers: int = 4, use_processes: bool = False
+) -> Iterator[Tuple[str, List[Document]]]:
+    """
+    Parse files concurrently and yield (path, docs) as each one finishes.
+    At most 2 * max_workers files are in flight, so memory stays bounded
+    no matter how many paths are given.
+    """
+    if max_workers <= 1:
+        for p in paths:
+            yield p, load_file(p)
+        return
+    pool_cls = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+    pending = iter(paths)
+    with pool_cls(max_workers=max_workers) as pool:
+        in_flight = {}
+        for p in islice(pending, 2 * max_workers):
+            in_flight[pool.submit(load_file, p)] = p
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for fut in done:
+                p = in_flight.pop(fut)
+                for nxt in islice(pending, 1):
+                    in_flight[pool.submit(load_file, nxt)] = nxt
+                yield p, fut.result()
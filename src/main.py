@@ -1,8 +1,5 @@
 # src/main.py
 import argparse
-import uvicorn
-from src.api import app
-from src.ingest import run_ingest
 from src.config import settings
 
 
@@ -20,15 +17,56 @@ def main():
         action="store_true",
         help="Also crawl ARV/Mt Hotham websites during ingestion",
     )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Ignore the ingest manifest and re-embed every file",
+    )
+    parser.add_argument(
+        "--inference-server",
+        action="store_true",
+        help="Run only the shared inference server (models) on INFERENCE_SERVER",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=settings.api_workers,
+        help="API worker processes (set USE_INFERENCE_SERVER=true so they share one model)",
+    )
     args = parser.parse_args()
 
-    if args.ingest:
+    if args.inference_server:
+        from src.inference_server import serve
+
+        serve()
+    elif args.ingest:
+        from src.ingest import run_ingest
+
         print("📥 Starting ingestion process...")
-        result = run_ingest(include_crawl=args.crawl, crawl_depth=1, extra_paths=None)
+        result = run_ingest(
+            include_crawl=args.crawl, crawl_depth=1, extra_paths=None, full_rebuild=args.full
+        )
         print("✅ Ingestion complete:", result)
     else:
-        print(f"🚀 Launching FastAPI app with model: {settings.llm_model_name}")
-        uvicorn.run(app, host="0.0.0.0", port=8000, reload=True)
+        import uvicorn
+
+        server = None
+        if settings.use_inference_server:
+            from src.inference_client import InferenceClient, spawn_server
+
+            server = spawn_server(InferenceClient(settings.inference_server))
+        print(f"🚀 Launching FastAPI app with model: {settings.llm_model_name} ({args.workers} worker(s))")
+        # Import string (not the app object) so --reload/--workers work and
+        # the CLI itself does not import the API
+        try:
+            uvicorn.run(
+                "src.api:app", host="0.0.0.0", port=8000,
+                reload=args.workers == 1, workers=args.workers,
+            )
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait(timeout=10)
 
 
 if __name__ == "__main__":
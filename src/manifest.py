@@ -0,0 +1,100 @@
+# src/manifest.py
+"""
+Ingest manifest: remembers which files (and which chunks of them) are
+already embedded, so ingest only touches what changed.
+"""
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+MANIFEST_VERSION = 1
+
+
+def file_sha256(path: Path, block_size: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def chunk_id(source: str, text: str) -> str:
+    """Stable vector id for a chunk: hash of its source and content."""
+    return hashlib.sha256(f"{source}\0{text}".encode("utf-8")).hexdigest()[:32]
+
+
+class IngestManifest:
+    """
+    JSON manifest stored next to the Chroma directory.
+
+    Layout:
+        {
+          "version": 1,
+          "config": {...},            # embedding model + splitter settings
+          "files": {
+            "<abs path>": {"mtime": ..., "size": ..., "sha256": ..., "chunk_ids": [...]},
+            ...
+          }
+        }
+    """
+
+    def __init__(self, path: Path, config: Dict[str, Any], files: Optional[Dict[str, dict]] = None):
+        self.path = Path(path)
+        self.config = config
+        self.files: Dict[str, dict] = files or {}
+
+    @classmethod
+    def load(cls, path: Path) -> Optional["IngestManifest"]:
+        path = Path(path)
+        if not path.exists():
+            return None
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            print(f"[manifest] WARNING: unreadable manifest {path}: {e}")
+            return None
+        if data.get("version") != MANIFEST_VERSION:
+            return None
+        return cls(path, data.get("config", {}), data.get("files", {}))
+
+    def save(self) -> None:
+        """Write atomically so a crash never leaves a half-written manifest."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(
+            json.dumps(
+                {"version": MANIFEST_VERSION, "config": self.config, "files": self.files},
+                ensure_ascii=False,
+            ),
+            encoding="utf-8",
+        )
+        os.replace(tmp, self.path)
+
+    # -- file bookkeeping ----------------------------------------------
+    def is_unchanged(self, key: str, path: Path) -> bool:
+        """
+        Cheap check first (mtime + size); fall back to the content hash
+        so a touched-but-identical file is still skipped.
+        """
+        entry = self.files.get(key)
+        if entry is None:
+            return False
+        st = path.stat()
+        if entry.get("mtime") == st.st_mtime and entry.get("size") == st.st_size:
+            return True
+        if entry.get("sha256") == file_sha256(path):
+            entry["mtime"], entry["size"] = st.st_mtime, st.st_size
+            return True
+        return False
+
+    def record(self, key: str, path: Optional[Path], chunk_ids: List[str]) -> None:
+        entry: Dict[str, Any] = {"chunk_ids": chunk_ids}
+        if path is not None:
+            st = path.stat()
+            entry.update(mtime=st.st_mtime, size=st.st_size, sha256=file_sha256(path))
+        self.files[key] = entry
+
+    def chunk_ids(self, key: str) -> List[str]:
+        return list(self.files.get(key, {}).get("chunk_ids", []))
@@ -0,0 +1,243 @@
+# src/metrics.py
+"""
+In-process metrics with Prometheus text exposition.
+
+A few Counter / Gauge / Histogram types (no client library needed) plus
+timing spans:
+
+    with trace() as t:                  # per-request collector (optional)
+        with span("chat", "retrieve"):  # observed into STAGE_SECONDS
+            ...
+    t.as_dict()                         # {"retrieve_ms": 12.3, ...}
+
+Spans always feed the histograms; they also add to the current trace when
+one is active (a contextvar, so LangChain's worker threads see it too).
+Recording is a perf_counter pair, a bisect and a short lock.
+
+Metrics are per process: with several uvicorn workers each one exposes its
+own /metrics (scrape them individually or aggregate in Prometheus).
+"""
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+TOKEN_BUCKETS = (16, 32, 64, 128, 256, 512, 768, 1024, 1536, 2048)
+RATE_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _fmt(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        REGISTRY.register(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return self.header() + [f"{self.name}{_labels(self.labelnames, k)} {_fmt(v)}" for k, v in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # per label set: [bucket counts..., +Inf count], sum
+        self._series: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = ([0] * (len(self.buckets) + 1), [0.0])
+            series[0][i] += 1
+            series[1][0] += value
+
+    def totals(self) -> Dict[Tuple[str, ...], Tuple[int, float]]:
+        """(count, sum) per label set."""
+        with self._lock:
+            return {k: (sum(c), s[0]) for k, (c, s) in self._series.items()}
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = [(k, list(c), s[0]) for k, (c, s) in self._series.items()]
+        lines = self.header()
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + ("+Inf",), counts):
+                cumulative += n
+                le = 'le="%s"' % (bound if isinstance(bound, str) else _fmt(bound))
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_fmt(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> None:
+        self._metrics.append(metric)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for m in self._metrics:
+            lines.extend(m.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+# ---------------------------------------------------------------------
+# --- Service metrics ---
+# ---------------------------------------------------------------------
+STAGE_SECONDS = Histogram(
+    "mthotham_stage_duration_seconds", "Duration of one pipeline stage", ("pipeline", "stage")
+)
+HTTP_SECONDS = Histogram(
+    "mthotham_http_request_duration_seconds", "HTTP request latency by route", ("method", "route", "status")
+)
+ANSWERS = Counter("mthotham_answers_total", "Answers served, by where the answer came from", ("source",))
+PROMPT_TOKENS = Histogram("mthotham_prompt_tokens", "Prompt length in LLM tokens", buckets=TOKEN_BUCKETS)
+GENERATED_TOKENS = Counter("mthotham_generated_tokens_total", "Tokens generated by the LLM")
+GENERATION_TOKENS_PER_SECOND = Histogram(
+    "mthotham_generation_tokens_per_second", "Generation throughput per request", buckets=RATE_BUCKETS
+)
+INGEST_ITEMS = Counter("mthotham_ingest_items_total", "Items processed by ingest", ("stage",))
+ADMISSION_DEPTH = Gauge(
+    "mthotham_admission_requests", "Requests queued or running per admission queue", ("queue", "state")
+)
+ADMISSION_WAIT_SECONDS = Histogram(
+    "mthotham_admission_wait_seconds", "Time a request waited for an execution slot", ("queue",)
+)
+ADMISSION_REJECTED = Counter(
+    "mthotham_admission_rejected_total", "Requests turned away by admission control", ("queue", "reason")
+)
+
+
+# ---------------------------------------------------------------------
+# --- Spans / traces ---
+# ---------------------------------------------------------------------
+class Trace:
+    """Per-request stage timings (ms) and counters, returned under the debug flag."""
+
+    def __init__(self) -> None:
+        self.stages: Dict[str, float] = {}
+        self.values: Dict[str, float] = {}
+        self._start = time.perf_counter()
+
+    def add(self, stage: str, seconds: float) -> None:
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def set(self, name: str, value: float) -> None:
+        self.values[name] = value
+
+    def as_dict(self) -> Dict[str, float]:
+        out = {f"{k}_ms": round(v * 1000, 2) for k, v in self.stages.items()}
+        out["total_ms"] = round((time.perf_counter() - self._start) * 1000, 2)
+        out.update(self.values)
+        return out
+
+
+_current: "contextvars.ContextVar[Optional[Trace]]" = contextvars.ContextVar("mthotham_trace", default=None)
+
+
+@contextmanager
+def trace(existing: Optional[Trace] = None) -> Iterator[Trace]:
+    """
+    Make a Trace current for the block. Generators that yield between stages
+    (streaming) pass the same `existing` trace to each non-yielding segment,
+    since a contextvar must not stay set across a yield.
+    """
+    t = existing if existing is not None else Trace()
+    token = _current.set(t)
+    try:
+        yield t
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def span(pipeline: str, stage: str) -> Iterator[None]:
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(pipeline, stage, time.perf_counter() - t0)
+
+
+def record(pipeline: str, stage: str, seconds: float) -> None:
+    """Observe an already-measured stage duration (histogram + current trace)."""
+    STAGE_SECONDS.observe(seconds, pipeline=pipeline, stage=stage)
+    t = _current.get()
+    if t is not None:
+        t.add(stage, seconds)
+
+
+def record_generation(prompt_tokens: Optional[int], generated_tokens: int, seconds: float) -> None:
+    if prompt_tokens is not None:
+        PROMPT_TOKENS.observe(prompt_tokens)
+    GENERATED_TOKENS.inc(generated_tokens)
+    rate = generated_tokens / seconds if seconds > 0 else 0.0
+    GENERATION_TOKENS_PER_SECOND.observe(rate)
+    t = _current.get()
+    if t is not None:
+        if prompt_tokens is not None:
+            t.set("prompt_tokens", prompt_tokens)
+        t.set("generated_tokens", generated_tokens)
+        t.set("tokens_per_s", round(rate, 2))
@@ -0,0 +1,128 @@
+# src/prefix_cache.py
+"""
+Reusable KV cache for the static prompt prefix.
+
+Every answer prompt starts with the same rendered STATIC_PREFIX (system
+primer + instructions, a few hundred tokens). Its past_key_values are
+computed once per model load; each generation then starts from that cache
+and only prefills the question + context.
+
+A prompt only reuses the cache when its token ids really start with the
+cached prefix ids (checked per prompt), otherwise it falls back to a
+full prefill, so a tokenizer quirk at the boundary cannot corrupt output.
+
+Batches: rows are laid out as [prefix | left pad | suffix] so the shared
+prefix sits at the same positions in every row; the attention mask hides
+the padding and position ids continue across it.
+"""
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import torch
+from transformers import DynamicCache
+
+
+class PrefixKVCache:
+    def __init__(self, model, tokenizer, prefix_text: str):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.prefix_text = prefix_text
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        enc = tokenizer(prefix_text, return_tensors="pt")
+        self.prefix_ids = enc["input_ids"][0].to(model.device)
+        with torch.inference_mode():
+            out = model(input_ids=enc["input_ids"].to(model.device), use_cache=True)
+        pkv = out.past_key_values
+        # Kept as plain tensors; every generation wraps them in a fresh
+        # DynamicCache, whose updates concatenate rather than write in place
+        self._legacy = pkv.to_legacy_cache() if hasattr(pkv, "to_legacy_cache") else tuple(pkv)
+
+    @property
+    def length(self) -> int:
+        return int(self.prefix_ids.shape[0])
+
+    def cache(self, batch_size: int = 1) -> DynamicCache:
+        if batch_size == 1:
+            return DynamicCache.from_legacy_cache(self._legacy)
+        return DynamicCache.from_legacy_cache(tuple(
+            (k.expand(batch_size, -1, -1, -1), v.expand(batch_size, -1, -1, -1)) for k, v in self._legacy
+        ))
+
+    def _matches(self, ids: torch.Tensor) -> bool:
+        n = self.length
+        return ids.shape[0] > n and torch.equal(ids[:n], self.prefix_ids)
+
+    def _count(self, hit: bool, n: int = 1) -> None:
+        with self._lock:
+            if hit:
+                self.hits += n
+            else:
+                self.misses += n
+
+    # -- single prompt -------------------------------------------------
+    def prepare(self, prompt: str) -> Dict[str, Any]:
+        """model.generate() kwargs for one prompt (input ids, mask and, on a hit, the prefix cache)."""
+        enc = self.tokenizer(prompt, return_tensors="pt").to(self.model.device)
+        hit = self._matches(enc["input_ids"][0])
+        self._count(hit)
+        kwargs = {"input_ids": enc["input_ids"], "attention_mask": enc["attention_mask"]}
+        if hit:
+            kwargs["past_key_values"] = self.cache()
+        return kwargs
+
+    def generate(self, prompt: str, **generation_kwargs) -> str:
+        kwargs = self.prepare(prompt)
+        with torch.inference_mode():
+            out = self.model.generate(
+                **kwargs, **generation_kwargs, pad_token_id=self.tokenizer.eos_token_id
+            )
+        return self.tokenizer.decode(out[0, kwargs["input_ids"].shape[1]:], skip_special_tokens=True)
+
+    # -- batches -------------------------------------------------------
+    def prepare_batch(self, prompts: List[str]) -> Optional[Dict[str, Any]]:
+        """
+        Batched generate() kwargs laid out as [prefix | pad | suffix], or
+        None when some prompt does not start with the cached prefix.
+        """
+        rows = [self.tokenizer(p, return_tensors="pt")["input_ids"][0].to(self.model.device) for p in prompts]
+        if not all(self._matches(r) for r in rows):
+            self._count(False, len(prompts))
+            return None
+        self._count(True, len(prompts))
+        n = self.length
+        suffixes = [r[n:] for r in rows]
+        width = max(s.shape[0] for s in suffixes)
+        pad_id = self.tokenizer.pad_token_id if self.tokenizer.pad_token_id is not None else self.tokenizer.eos_token_id
+        input_ids = torch.full((len(rows), n + width), pad_id, dtype=rows[0].dtype, device=self.model.device)
+        attention_mask = torch.zeros_like(input_ids)
+        input_ids[:, :n] = self.prefix_ids
+        attention_mask[:, :n] = 1
+        for i, s in enumerate(suffixes):
+            input_ids[i, n + width - s.shape[0]:] = s
+            attention_mask[i, n + width - s.shape[0]:] = 1
+        return {
+            "input_ids": input_ids,
+            "attention_mask": attention_mask,
+            "past_key_values": self.cache(len(rows)),
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "prefix_tokens": self.length,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
+
+
+def prefix_is_supported(model) -> Tuple[bool, str]:
+    """Only plain PyTorch transformers models accept a DynamicCache in generate()."""
+    if not isinstance(model, torch.nn.Module):
+        return False, f"{type(model).__name__} is not a PyTorch module"
+    if not getattr(model, "_supports_cache_class", False):
+        return False, f"{type(model).__name__} does not support Cache objects"
+    return True, ""
@@ -15,7 +15,12 @@ Never make assumptions or add details that are not present in the provided conte
 If something is unclear or not mentioned, say you’re not certain and suggest
 checking the official Mt Hotham website for the latest updates.
 """
-ANSWER_PROMPT = """{system_primer}
+# The answer prompt is split at a fixed boundary: everything up to and
+# including "Question:\n" is identical for every request, so its
+# key/value cache is computed once per model load (src/prefix_cache.py)
+# and only the question + context are prefilled per request. Keep any
+# per-request text out of ANSWER_PREFIX.
+ANSWER_PREFIX = """{system_primer}
 
 Answer the following question using **only** the information found in the provided context.
 
@@ -34,10 +39,15 @@ politely state that the information is not included in the available data
 and suggest visiting the official Mt Hotham website for the most recent statistics.
 
 Question:
-{question}
+"""
+ANSWER_SUFFIX = """{question}
 
 Context:
 {context}
 
 Answer:
 """
+ANSWER_PROMPT = ANSWER_PREFIX + ANSWER_SUFFIX
+
+# The rendered static prefix (what every formatted ANSWER_PROMPT starts with)
+STATIC_PREFIX = ANSWER_PREFIX.format(system_primer=SYSTEM_PRIMER)
@@ -1,102 +1,434 @@
 # src/rag_chain.py
-from typing import Dict, Any, Optional
+import threading
+import time
+from operator import itemgetter
+from typing import TYPE_CHECKING, Callable, Dict, Any, Iterator, List, Optional
 from datetime import datetime
 from zoneinfo import ZoneInfo
-import torch
-from transformers import AutoModelForCausalLM, AutoTokenizer, pipeline
 
-from langchain_community.vectorstores import Chroma
-from langchain.llms import HuggingFacePipeline
+from langchain_core.documents import Document
 from langchain_core.prompts import PromptTemplate
-from langchain_core.runnables import RunnablePassthrough
+from langchain_core.runnables import RunnableLambda
 from langchain_core.output_parsers import StrOutputParser
-from langchain_community.embeddings import HuggingFaceEmbeddings
 
+from src import metrics
 from src.config import settings
+from src.context_packing import pack_context, tokenizer_budget_fns
 from src.prompts import SYSTEM_PRIMER, ANSWER_PROMPT
-from src.router import route_intent
+from src.registry import registry, GENERATION_KWARGS
+from src.retrieval import retrieve
+from src.router import route_intent, is_numeric_question
+
+if TYPE_CHECKING:
+    # torch / transformers / Chroma are only needed once a model is loaded;
+    # the registry imports them and the streaming path pulls them in lazily
+    from langchain_community.llms import HuggingFacePipeline
+    from langchain_community.vectorstores import Chroma
+
+    from src.prefix_cache import PrefixKVCache
+    from src.structured import StructuredResult
 
 
 # ---------------------------------------------------------------------
 # --- Vector DB (Chroma) using local HF embeddings ---
 # ---------------------------------------------------------------------
-def _get_vectordb() -> Chroma:
-    embeddings = HuggingFaceEmbeddings(model_name=settings.embedding_model_name)
-    return Chroma(
-        persist_directory=settings.chroma_dir,
-        embedding_function=embeddings,
-        collection_name="mthotham",
-    )
+def _get_vectordb() -> "Chroma":
+    """Shared Chroma handle from the process-wide registry."""
+    return registry.vectordb()
 
 
 # ---------------------------------------------------------------------
 # --- Local LLM (TinyLlama via HuggingFacePipeline) ---
 # ---------------------------------------------------------------------
-def _get_llm() -> HuggingFacePipeline:
+def _get_llm() -> "HuggingFacePipeline":
+    """Shared TinyLlama pipeline from the process-wide registry."""
+    return registry.llm()
+
+
+# ---------------------------------------------------------------------
+# --- Chain construction (once per vectorstore handle) ---
+# ---------------------------------------------------------------------
+def _format_docs(docs: List[Document], facts: Optional[List[str]] = None, live: Optional[List[str]] = None) -> str:
+    parts = []
+    if live:
+        parts.append("Current conditions (live data):\n" + "\n".join(f"- {f}" for f in live))
+    if facts:
+        parts.append("Exact figures computed from the data tables:\n" + "\n".join(f"- {f}" for f in facts))
+    parts.extend(d.page_content for d in docs)
+    return "\n\n".join(parts)
+
+
+def _retrieve(
+    inputs: Dict[str, Any], vectordb=None, embeddings=None, lexical=None, pipeline: str = "chat"
+) -> List[Document]:
+    if inputs.get("live"):
+        # Live conditions are the context; the index only holds stale copies
+        return []
+    # With computed figures in the prompt, only a little supporting text is needed
+    facts = inputs.get("facts")
+    if facts:
+        k = settings.structured_k
+    else:
+        # Packing drops duplicates and merges neighbours, so it starts from
+        # a multiple of RETRIEVAL_K candidates
+        k = settings.retrieval_k * max(1, settings.context_fetch_factor) if settings.context_packing_enabled else None
+    if vectordb is None:
+        vectordb, embeddings, lexical = registry.vectordb(), registry.embeddings(), registry.lexical()
+    query_vector = inputs.get("query_vector")
+    if query_vector is None:
+        with metrics.span(pipeline, "embed_query"):
+            query_vector = embeddings.embed_query(inputs["question"])
+    with metrics.span(pipeline, "search"):
+        docs = retrieve(
+            vectordb, embeddings, inputs["question"], inputs["intent"],
+            k=k, query_vector=query_vector, lexical=lexical,
+        )
+    if not settings.context_packing_enabled:
+        return docs
+    with metrics.span(pipeline, "pack"):
+        count, truncate = tokenizer_budget_fns(registry.tokenizer())
+        budget = settings.context_token_budget - (count(_format_docs([], facts)) if facts else 0)
+        return pack_context(docs, max(budget, 0), count, truncate)
+
+
+def _token_count(text: str) -> int:
+    return len(registry.tokenizer()(text, add_special_tokens=False)["input_ids"])
+
+
+def _timed_generation(prompt_text: str, generate: Callable[[str], str], pipeline: str = "chat") -> str:
+    """Run `generate`, recording its latency, prompt / output token counts and tokens/sec."""
+    t0 = time.perf_counter()
+    output = generate(prompt_text)
+    elapsed = time.perf_counter() - t0
+    metrics.record(pipeline, "generate", elapsed)
+    metrics.record_generation(_token_count(prompt_text), _token_count(output), elapsed)
+    return output
+
+
+def build_prompt() -> PromptTemplate:
+    return PromptTemplate(
+        template=ANSWER_PROMPT,
+        input_variables=["context", "question"],
+        partial_variables={"system_primer": SYSTEM_PRIMER},
+    )
+
+
+def build_chain(
+    llm: "HuggingFacePipeline", vectordb: "Chroma", embeddings, lexical=None,
+    prefix_cache: Optional["PrefixKVCache"] = None,
+):
     """
-    Load a local TinyLlama model using HuggingFace transformers.
-    No API token required. Uses GPU if available.
+    Compile the LCEL chain:
+    {question, intent[, query_vector, facts, live]} -> retrieve -> prompt -> llm -> parse text
+    With a prefix cache, generation starts from the cached static prefix
+    instead of going through the pipeline's full prefill.
     """
-    print(f"🔹 Loading model: {settings.llm_model_name} on device: {settings.device}")
 
-    tokenizer = AutoTokenizer.from_pretrained(settings.llm_model_name)
-    model = AutoModelForCausalLM.from_pretrained(
-        settings.llm_model_name,
-        torch_dtype=torch.float16 if torch.cuda.is_available() else torch.float32,
-        device_map="auto" if torch.cuda.is_available() else None,
-    )
+    prompt = build_prompt()
 
-    pipe = pipeline(
-        "text-generation",
-        model=model,
-        tokenizer=tokenizer,
-        max_new_tokens=512,
-        temperature=0.2,
-        do_sample=True,
-        pad_token_id=tokenizer.eos_token_id,
-        device=0 if torch.cuda.is_available() else -1,
-    )
+    def _context(inputs: Dict[str, Any]) -> str:
+        return _format_docs(
+            _retrieve(inputs, vectordb, embeddings, lexical), inputs.get("facts"), inputs.get("live")
+        )
 
-    return HuggingFacePipeline(pipeline=pipe)
+    def _prompt(inputs: Dict[str, Any]) -> str:
+        with metrics.span("chat", "prompt"):
+            return prompt.format(**inputs)
+
+    if prefix_cache is not None:
+        def _generate(prompt_text: str) -> str:
+            return prefix_cache.generate(prompt_text, **GENERATION_KWARGS)
+    else:
+        _generate = llm.invoke
+
+    return (
+        {"context": RunnableLambda(_context), "question": itemgetter("question")}
+        | RunnableLambda(_prompt)
+        | RunnableLambda(lambda prompt_text: _timed_generation(prompt_text, _generate))
+        | StrOutputParser()
+    )
 
 
 # ---------------------------------------------------------------------
 # --- Main RAG answer pipeline ---
 # ---------------------------------------------------------------------
-def answer(question: str, intent: Optional[str] = None) -> Dict[str, Any]:
+def answer(question: str, intent: Optional[str] = None, debug: bool = False) -> Dict[str, Any]:
     """
     RAG answer generation:
-    1. Retrieve top documents from Chroma
+    1. Retrieve top documents from Chroma (intent partition first)
     2. Insert context into prompt
     3. Generate grounded answer using TinyLlama
+    Every stage is timed into the /metrics histograms; with `debug` the
+    per-stage timings of this request are returned under "timings".
     """
-    final_intent = intent or route_intent(question)
+    with metrics.trace() as trace:
+        res = _answer(question, intent)
+    metrics.ANSWERS.inc(source=res.get("source") or _cache_source(res))
+    if debug:
+        res["timings"] = trace.as_dict()
+    return res
 
-    llm = _get_llm()
-    vectordb = _get_vectordb()
-    retriever = vectordb.as_retriever(search_kwargs={"k": 4})
 
-    prompt = PromptTemplate(
-        template=ANSWER_PROMPT,
-        input_variables=["context", "question"],
-        partial_variables={"system_primer": SYSTEM_PRIMER},
-    )
+def _cache_source(res: Dict[str, Any]) -> str:
+    hit = (res.get("cache") or {}).get("hit")
+    return f"cache_{hit}" if hit else "llm"
 
-    # Pipeline: (question) -> retrieve -> prompt -> llm -> parse text
-    chain = (
-        {"context": retriever, "question": RunnablePassthrough()}
-        | prompt
-        | llm
-        | StrOutputParser()
-    )
 
-    output = chain.invoke(question)
+def _answer(question: str, intent: Optional[str]) -> Dict[str, Any]:
+    if intent:
+        final_intent = intent
+    else:
+        with metrics.span("chat", "route"):
+            final_intent = route_intent(question)
+
+    with metrics.span("chat", "structured"):
+        structured = _structured(question)
+    if structured is not None and structured.answer:
+        return _structured_payload(question, final_intent, structured)
+    facts = structured.facts if structured is not None else None
+
+    # Live conditions change between ingests, so those answers bypass the cache
+    live = _live_context(final_intent)
+    cache = registry.answer_cache() if settings.answer_cache_enabled and live is None else None
+    query_vector = None
+    if cache is not None:
+        with metrics.span("chat", "cache"):
+            cached = cache.get_exact(question, final_intent)
+        if cached is not None:
+            return _from_cache(cached, question, "exact", None, cache)
+        with metrics.span("chat", "embed_query"):
+            query_vector = registry.embeddings().embed_query(question)
+        with metrics.span("chat", "cache"):
+            similar = cache.get_similar(query_vector, final_intent)
+        if similar is not None:
+            return _from_cache(similar[0], question, "semantic", similar[1], cache)
+
+    if settings.batching_enabled and not settings.use_inference_server:
+        # Same steps as the chain, but generation goes through the shared
+        # micro-batching scheduler so concurrent requests share one generate()
+        # (with an inference server, batching happens there instead)
+        inputs = {
+            "question": question, "intent": final_intent, "query_vector": query_vector, "facts": facts, "live": live,
+        }
+        context = _format_docs(_retrieve(inputs), facts, live)
+        with metrics.span("chat", "prompt"):
+            prompt_text = build_prompt().format(context=context, question=question)
+        scheduler = registry.scheduler()
+        output = _timed_generation(
+            prompt_text, lambda p: scheduler.submit(p, timeout=settings.generation_timeout_s)
+        )
+    else:
+        output = registry.chain().invoke(
+            {"question": question, "intent": final_intent, "query_vector": query_vector, "facts": facts, "live": live}
+        )
+
+    res = _answer_payload(question, final_intent, output)
+    if live is not None:
+        res["source"] = "live"
+        res["live"] = registry.live_data().stats()["files"]
+    if cache is not None:
+        cache.put(question, final_intent, query_vector, dict(res))
+        res["cache"] = {"hit": None, **cache.stats()}
+    return res
 
+
+def _live_context(intent: str) -> Optional[List[str]]:
+    """Latest live-data values for weather questions (None: use retrieval as usual)."""
+    if intent != "weather" or not settings.live_data_enabled:
+        return None
+    return registry.live_data().context() or None
+
+
+def _structured(question: str) -> Optional["StructuredResult"]:
+    if not (settings.structured_enabled and is_numeric_question(question)):
+        return None
+    return registry.structured().query(question)
+
+
+def _structured_payload(question: str, intent: str, result: "StructuredResult") -> Dict[str, Any]:
+    """Answered straight from the tables: no retrieval, no generation."""
+    res = _answer_payload(question, intent, result.answer)
+    res["source"] = "structured"
+    res["facts"] = result.facts
+    return res
+
+
+def _from_cache(
+    payload: Dict[str, Any], question: str, level: str, similarity: Optional[float], cache
+) -> Dict[str, Any]:
+    res = dict(payload)
+    res["question"] = question
+    res["cached_at"] = payload["time"]
+    res["time"] = datetime.now(ZoneInfo(settings.app_timezone)).isoformat()
+    res["cache"] = {"hit": level, "similarity": similarity, **cache.stats()}
+    return res
+
+
+def _answer_payload(question: str, intent: str, output: str) -> Dict[str, Any]:
     return {
         "ok": True,
         "question": question,
-        "intent": final_intent,
+        "intent": intent,
         "answer": output.strip(),
         "model": settings.llm_model_name,
         "time": datetime.now(ZoneInfo(settings.app_timezone)).isoformat(),
     }
+
+
+# ---------------------------------------------------------------------
+# --- Streaming answer pipeline ---
+# ---------------------------------------------------------------------
+def _cancel_criteria(cancel_event: threading.Event):
+    """StoppingCriteriaList that stops model.generate() as soon as `cancel_event` is set."""
+    import torch
+    from transformers import StoppingCriteria, StoppingCriteriaList
+
+    class _CancelCriteria(StoppingCriteria):
+        def __call__(self, input_ids: torch.LongTensor, scores: torch.FloatTensor, **kwargs) -> torch.BoolTensor:
+            return torch.full(
+                (input_ids.shape[0],), cancel_event.is_set(), dtype=torch.bool, device=input_ids.device
+            )
+
+    return StoppingCriteriaList([_CancelCriteria()])
+
+
+def _source_metadata(docs: List[Document]) -> List[Dict[str, Any]]:
+    out = []
+    for d in docs:
+        meta = {k: v for k, v in d.metadata.items() if k in ("source", "doc_type", "row_index", "json_key")}
+        meta["preview"] = d.page_content[:200]
+        out.append(meta)
+    return out
+
+
+def stream_tokens(prompt_text: str, cancel_event: threading.Event) -> Iterator[str]:
+    """
+    Decoded text pieces from the local model as it generates. Setting
+    `cancel_event` or closing the iterator stops model.generate().
+    """
+    pipe = registry.llm().pipeline
+    tokenizer, model = pipe.tokenizer, pipe.model
+    if model is None:
+        # Stub backend: no incremental decoding, emit the whole answer at once
+        yield registry.llm().invoke(prompt_text)
+        return
+
+    from transformers import TextIteratorStreamer
+
+    streamer = TextIteratorStreamer(tokenizer, skip_prompt=True, skip_special_tokens=True)
+    prefix = registry.prefix_cache()
+    if prefix is not None:
+        inputs = prefix.prepare(prompt_text)
+    else:
+        inputs = dict(tokenizer(prompt_text, return_tensors="pt").to(model.device))
+    worker = threading.Thread(
+        target=model.generate,
+        kwargs={
+            **inputs,
+            **GENERATION_KWARGS,
+            "streamer": streamer,
+            "stopping_criteria": _cancel_criteria(cancel_event),
+            "pad_token_id": tokenizer.eos_token_id,
+        },
+        name="stream-generate",
+        daemon=True,
+    )
+    worker.start()
+
+    finished = False
+    try:
+        for text in streamer:
+            if cancel_event.is_set():
+                break
+            if text:
+                yield text
+        finished = True
+    finally:
+        if not finished:
+            cancel_event.set()
+        worker.join()
+
+
+def stream_answer(
+    question: str, intent: Optional[str] = None, cancel_event: Optional[threading.Event] = None,
+    debug: bool = False,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Same pipeline as answer(), but yields events as they become available:
+    1. {"event": "sources", ...}  retrieved document metadata
+    2. {"event": "token", ...}    decoded text pieces as TinyLlama generates
+    3. {"event": "done", ...}     the payload answer() would have returned
+    Setting `cancel_event` (e.g. on client disconnect) stops generation.
+    Stages are recorded under pipeline="stream", plus time to first token.
+    """
+    trace = metrics.Trace()
+    cancel_event = cancel_event or threading.Event()
+
+    with metrics.trace(trace):
+        if intent:
+            final_intent = intent
+        else:
+            with metrics.span("stream", "route"):
+                final_intent = route_intent(question)
+        with metrics.span("stream", "structured"):
+            structured = _structured(question)
+
+    if structured is not None and structured.answer:
+        metrics.ANSWERS.inc(source="structured")
+        yield {"event": "sources", "data": {"intent": final_intent, "sources": [], "facts": structured.facts}}
+        done = _structured_payload(question, final_intent, structured)
+        if debug:
+            done["timings"] = trace.as_dict()
+        yield {"event": "done", "data": done}
+        return
+    facts = structured.facts if structured is not None else None
+    live = _live_context(final_intent)
+
+    with metrics.trace(trace):
+        inputs = {"question": question, "intent": final_intent, "facts": facts, "live": live}
+        docs = _retrieve(inputs, pipeline="stream")
+    yield {"event": "sources", "data": {
+        "intent": final_intent, "sources": _source_metadata(docs), "facts": facts, "live": live,
+    }}
+
+    with metrics.trace(trace), metrics.span("stream", "prompt"):
+        prompt_text = build_prompt().format(context=_format_docs(docs, facts, live), question=question)
+
+    if settings.use_inference_server:
+        pieces = registry.inference_client().stream(prompt_text)
+    else:
+        pieces = stream_tokens(prompt_text, cancel_event)
+    t0 = time.perf_counter()
+
+    parts: List[str] = []
+    completed = False
+    try:
+        for text in pieces:
+            if cancel_event.is_set():
+                break
+            if not parts:
+                with metrics.trace(trace):
+                    metrics.record("stream", "first_token", time.perf_counter() - t0)
+            parts.append(text)
+            yield {"event": "token", "data": text}
+        completed = not cancel_event.is_set()
+    finally:
+        # Client went away (generator closed) or cancelled: free the model
+        if not completed:
+            cancel_event.set()
+        pieces.close()
+
+    if completed:
+        output = "".join(parts)
+        with metrics.trace(trace):
+            elapsed = time.perf_counter() - t0
+            metrics.record("stream", "generate", elapsed)
+            metrics.record_generation(_token_count(prompt_text), _token_count(output), elapsed)
+        metrics.ANSWERS.inc(source="live" if live is not None else "llm")
+        done = _answer_payload(question, final_intent, output)
+        if live is not None:
+            done["source"] = "live"
+            done["live"] = registry.live_data().stats()["files"]
+        if debug:
+            done["timings"] = trace.as_dict()
+        yield {"event": "done", "data": done}
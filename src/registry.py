@@ -0,0 +1,462 @@
+# src/registry.py
+"""
+Process-wide model/resource registry.
+
+The LLM, the embedding model, the Chroma handle and the compiled LCEL chain
+are loaded once per process (normally from the FastAPI lifespan hook) and
+shared by every request.
+
+torch, transformers, Chroma and the other heavy modules are imported inside
+the loaders, so importing this module (and src.api / src.ingest through it)
+stays cheap; the cost is paid by the first code path that needs a model.
+"""
+import sys
+import threading
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Dict, Optional
+from zoneinfo import ZoneInfo
+
+from src.config import settings
+from src.data_paths import index_sidecar_path
+from src import index_versions
+from src.index_versions import active_chroma_dir
+
+if TYPE_CHECKING:
+    from langchain_community.llms import HuggingFacePipeline
+    from langchain_community.vectorstores import Chroma
+    from langchain_core.embeddings import Embeddings
+
+    from src.answer_cache import AnswerCache
+    from src.batching import BatchScheduler
+    from src.inference_client import InferenceClient
+    from src.live_data import LiveDataStore
+    from src.lexical import LexicalIndex
+    from src.prefix_cache import PrefixKVCache
+    from src.structured import StructuredEngine
+
+COLLECTION_NAME = "mthotham"
+
+# Sampling settings shared by the pipeline and direct model.generate() calls
+GENERATION_KWARGS = {"max_new_tokens": 512, "temperature": 0.2, "do_sample": True}
+
+
+# ---------------------------------------------------------------------
+# --- Loaders (called once per process) ---
+# ---------------------------------------------------------------------
+def embedding_model_key(backend: Optional[str] = None) -> str:
+    """Identity of the vectors produced: model name plus any non-baseline backend."""
+    backend = backend or settings.embedding_backend
+    name = settings.embedding_model_name
+    return name if backend == "torch" else f"{name}@{backend}"
+
+
+def load_embeddings(backend: Optional[str] = None) -> "Embeddings":
+    from src.embedding_cache import CachedEmbeddings, EmbeddingCache
+    from src.inference_backends import load_base_embeddings
+
+    backend = backend or settings.embedding_backend
+    print(f"🔹 Loading embedding model: {settings.embedding_model_name} (backend={backend})")
+    base = load_base_embeddings(settings.embedding_model_name, backend)
+    if not settings.embed_cache_enabled:
+        return base
+    # Vectors from different backends differ slightly, so each gets its own cache
+    cache = EmbeddingCache(
+        settings.embed_cache_dir,
+        embedding_model_key(backend),
+        max_entries=settings.embed_cache_max_entries,
+        dtype=settings.embed_cache_dtype,
+    )
+    return CachedEmbeddings(base, cache, batch_size=settings.embed_batch_size)
+
+
+def load_llm(backend: Optional[str] = None) -> "HuggingFacePipeline":
+    """
+    Load a local TinyLlama model using HuggingFace transformers.
+    No API token required. Uses GPU if available.
+    `backend` (default settings.llm_backend): torch | int8 | compile | onnx,
+    or stub (EchoLLM, no model download).
+    """
+    backend = backend or settings.llm_backend
+    if backend == "stub":
+        from src.stub_models import EchoLLM
+
+        print("🔹 Using the stub echo LLM (no model loaded)")
+        return EchoLLM()
+
+    import torch
+    from transformers import pipeline
+    from langchain.llms import HuggingFacePipeline
+    from src.inference_backends import load_causal_lm
+
+    print(f"🔹 Loading model: {settings.llm_model_name} on device: {settings.device} (backend={backend})")
+
+    model, tokenizer = load_causal_lm(settings.llm_model_name, backend)
+
+    pipe = pipeline(
+        "text-generation",
+        model=model,
+        tokenizer=tokenizer,
+        **GENERATION_KWARGS,
+        pad_token_id=tokenizer.eos_token_id,
+        device=0 if torch.cuda.is_available() else -1,
+    )
+
+    return HuggingFacePipeline(pipeline=pipe)
+
+
+def open_vectordb(embeddings: "Embeddings", chroma_dir: Optional[str] = None) -> "Chroma":
+    """Chroma collection, or the memory-mapped index with VECTOR_STORE=mmap (same directory)."""
+    if settings.vector_store == "mmap":
+        from src.vector_index import MmapVectorStore
+
+        return MmapVectorStore(
+            chroma_dir or settings.chroma_dir,
+            embeddings,
+            nlist=settings.vector_index_nlist,
+            nprobe=settings.vector_index_nprobe,
+        )
+    if settings.vector_store != "chroma":
+        raise ValueError(f"Unknown VECTOR_STORE {settings.vector_store!r}; expected chroma or mmap")
+    from langchain_community.vectorstores import Chroma
+
+    return Chroma(
+        persist_directory=chroma_dir or settings.chroma_dir,
+        embedding_function=embeddings,
+        collection_name=COLLECTION_NAME,
+    )
+
+
+def close_vectordb(chroma_dir: str) -> None:
+    """
+    Release the vectorstore opened on `chroma_dir`. chromadb keeps one
+    started System (SQLite + HNSW segments) per persist directory for the
+    life of the process, even after the directory is deleted; stop it and
+    evict it. Every handle on that directory is unusable afterwards. The
+    mmap store holds nothing beyond its arrays, so there is nothing to do.
+    """
+    shared = sys.modules.get("chromadb.api.shared_system_client")
+    if shared is None:  # chromadb never loaded in this process
+        return
+    system = shared.SharedSystemClient._identifier_to_system.pop(chroma_dir, None)
+    if system is not None:
+        system.stop()
+
+
+# ---------------------------------------------------------------------
+# --- Registry ---
+# ---------------------------------------------------------------------
+class ResourceRegistry:
+    """
+    Holds the shared LLM, embeddings, vectorstore and chain.
+    Every accessor loads lazily under a lock, so a request arriving before
+    startup has finished waits for the same load instead of starting its own.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.RLock()
+        self._embeddings: Optional["Embeddings"] = None
+        self._llm: Optional["HuggingFacePipeline"] = None
+        self._vectordb: Optional["Chroma"] = None
+        self._chain: Any = None
+        self._chroma_dir: Optional[str] = None
+        # The handle swapped out last stays open for requests still using it;
+        # it is closed on the next swap or when its version is pruned
+        self._retired_dir: Optional[str] = None
+        self._scheduler: Optional["BatchScheduler"] = None
+        self._answer_cache: Optional["AnswerCache"] = None
+        self._structured: Optional["StructuredEngine"] = None
+        self._live_data: Optional["LiveDataStore"] = None
+        self._lexical: Optional["LexicalIndex"] = None
+        self._lexical_loaded = False
+        self._prefix_cache: Optional["PrefixKVCache"] = None
+        self._prefix_loaded = False
+        self._tokenizer: Any = None
+        self._inference_client: Optional["InferenceClient"] = None
+        self.ready: bool = False
+        self.warmed_up: bool = False
+        self.loaded_at: Optional[str] = None
+        self.vectorstore_version: int = 0
+        self.error: Optional[str] = None
+        index_versions.on_remove(self.release_version)
+
+    # -- accessors ------------------------------------------------------
+    def inference_client(self) -> "InferenceClient":
+        """Pooled client for the shared inference server (USE_INFERENCE_SERVER mode)."""
+        if self._inference_client is None:
+            with self._lock:
+                if self._inference_client is None:
+                    from src.inference_client import InferenceClient
+
+                    self._inference_client = InferenceClient(
+                        settings.inference_server,
+                        pool_size=settings.inference_pool_size,
+                        queue_timeout_s=settings.inference_queue_timeout_s,
+                        timeout_s=settings.generation_timeout_s,
+                    )
+        return self._inference_client
+
+    def embeddings(self) -> "Embeddings":
+        if self._embeddings is None:
+            with self._lock:
+                if self._embeddings is None:
+                    if settings.use_inference_server:
+                        from src.remote_models import RemoteEmbeddings
+
+                        self._embeddings = RemoteEmbeddings(self.inference_client(), settings.embed_batch_size)
+                    else:
+                        self._embeddings = load_embeddings()
+        return self._embeddings
+
+    def llm(self) -> "HuggingFacePipeline":
+        """Local pipeline, or a RemoteLLM (no `.pipeline`) in inference-server mode."""
+        if self._llm is None:
+            with self._lock:
+                if self._llm is None:
+                    if settings.use_inference_server:
+                        from src.remote_models import RemoteLLM
+
+                        self._llm = RemoteLLM(client=self.inference_client())
+                    else:
+                        self._llm = load_llm()
+        return self._llm
+
+    def _follow_active(self) -> None:
+        """Reopen the vectorstore when an ingest job (in any worker) switched the active index."""
+        active = active_chroma_dir()
+        if self._vectordb is not None and active != self._chroma_dir:
+            self.reload_vectorstore(active)
+
+    def vectordb(self) -> "Chroma":
+        self._follow_active()
+        if self._vectordb is None:
+            with self._lock:
+                if self._vectordb is None:
+                    self._chroma_dir = active_chroma_dir()
+                    self._vectordb = open_vectordb(self.embeddings(), self._chroma_dir)
+        return self._vectordb
+
+    def chain(self):
+        """Compiled LCEL chain, rebuilt only when the vectorstore handle changes."""
+        self._follow_active()
+        # Return what was read or built under the lock: a concurrent
+        # reload_vectorstore() may reset self._chain right after it is released
+        chain = self._chain
+        if chain is None:
+            with self._lock:
+                chain = self._chain
+                if chain is None:
+                    from src.rag_chain import build_chain
+
+                    chain = self._chain = build_chain(
+                        self.llm(), self.vectordb(), self.embeddings(), self.lexical(), self.prefix_cache()
+                    )
+        return chain
+
+    def tokenizer(self):
+        """
+        The LLM's tokenizer, for token counting (context packing). Taken from
+        the loaded pipeline when there is one, else loaded on its own (API
+        workers in inference-server mode only ever load the tokenizer).
+        """
+        local = not settings.use_inference_server
+        if local and (self._llm is not None or settings.llm_backend == "stub"):
+            return self.llm().pipeline.tokenizer
+        if self._tokenizer is None:
+            with self._lock:
+                if self._tokenizer is None:
+                    if settings.llm_backend == "stub":
+                        from src.stub_models import WordTokenizer
+
+                        self._tokenizer = WordTokenizer()
+                    else:
+                        from transformers import AutoTokenizer
+
+                        self._tokenizer = AutoTokenizer.from_pretrained(settings.llm_model_name)
+        return self._tokenizer
+
+    def scheduler(self) -> "BatchScheduler":
+        """Micro-batching scheduler sharing the pipeline's model and tokenizer."""
+        if self._scheduler is None:
+            with self._lock:
+                if self._scheduler is None:
+                    from src.batching import BatchScheduler
+
+                    pipe = self.llm().pipeline
+                    self._scheduler = BatchScheduler(
+                        pipe.model,
+                        pipe.tokenizer,
+                        max_batch_size=settings.batch_max_size,
+                        window_ms=settings.batch_window_ms,
+                        generation_kwargs=GENERATION_KWARGS,
+                        prefix_cache=self.prefix_cache(),
+                    ).start()
+        return self._scheduler
+
+    def prefix_cache(self) -> Optional["PrefixKVCache"]:
+        """
+        past_key_values of the static prompt prefix, computed once per model
+        load (None when disabled or the backend cannot take a KV cache).
+        """
+        if not settings.prefix_cache_enabled or settings.use_inference_server:
+            return None
+        if not self._prefix_loaded:
+            with self._lock:
+                if not self._prefix_loaded:
+                    pipe = self.llm().pipeline
+                    if pipe.model is None:  # stub backend
+                        self._prefix_loaded = True
+                        return None
+                    from src.prefix_cache import PrefixKVCache, prefix_is_supported
+                    from src.prompts import STATIC_PREFIX
+
+                    supported, reason = prefix_is_supported(pipe.model)
+                    if supported:
+                        self._prefix_cache = PrefixKVCache(pipe.model, pipe.tokenizer, STATIC_PREFIX)
+                        print(f"✅ Prompt prefix cached ({self._prefix_cache.length} tokens).")
+                    else:
+                        print(f"[registry] WARNING: prefix KV cache disabled: {reason}")
+                    self._prefix_loaded = True
+        return self._prefix_cache
+
+    def answer_cache(self) -> "AnswerCache":
+        if self._answer_cache is None:
+            with self._lock:
+                if self._answer_cache is None:
+                    from src.answer_cache import AnswerCache
+
+                    self._answer_cache = AnswerCache(
+                        max_entries=settings.answer_cache_max_entries,
+                        ttl_s=settings.answer_cache_ttl_s,
+                        similarity_threshold=settings.answer_cache_similarity,
+                    )
+        return self._answer_cache
+
+    def lexical(self) -> Optional["LexicalIndex"]:
+        """BM25 index built by ingest next to chroma_dir (None if missing or disabled)."""
+        if not settings.hybrid_enabled:
+            return None
+        if not self._lexical_loaded:
+            with self._lock:
+                if not self._lexical_loaded:
+                    from src.lexical import LexicalIndex
+
+                    self._lexical = LexicalIndex.load(index_sidecar_path("bm25", self._chroma_dir or active_chroma_dir()))
+                    self._lexical_loaded = True
+        return self._lexical
+
+    def structured(self) -> "StructuredEngine":
+        """Columnar visitation/snow tables (reloaded when the ingest generation changes)."""
+        if self._structured is None:
+            with self._lock:
+                if self._structured is None:
+                    from src.structured import StructuredEngine
+
+                    self._structured = StructuredEngine()
+        return self._structured
+
+    def live_data(self) -> "LiveDataStore":
+        """Latest values of the LIVE_DATA_FILES (re-read when they change, never embedded)."""
+        if self._live_data is None:
+            with self._lock:
+                if self._live_data is None:
+                    from src.live_data import LiveDataStore
+
+                    self._live_data = LiveDataStore(settings.live_data_poll_s)
+        return self._live_data
+
+    # -- lifecycle ------------------------------------------------------
+    def startup(self, warmup: bool = True) -> None:
+        """Load every resource and optionally run one short generation."""
+        try:
+            self.chain()
+            if settings.batching_enabled and not settings.use_inference_server:
+                self.scheduler()
+            if warmup:
+                self.warm_up()
+            self.loaded_at = datetime.now(ZoneInfo(settings.app_timezone)).isoformat()
+            self.ready = True
+            print("✅ Models and vectorstore loaded; worker is ready.")
+        except Exception as e:
+            self.error = str(e)
+            print(f"❌ Startup failed: {e}")
+            raise
+
+    def warm_up(self) -> None:
+        """Run a tiny generation so the first real request skips lazy kernel setup."""
+        if settings.use_inference_server:
+            # The server warms its own models; wait until it has them loaded
+            print(f"🔹 Waiting for the inference server at {settings.inference_server}...")
+            self.inference_client().wait_ready(timeout_s=600)
+            self.embeddings().embed_query("warm up")
+            self.warmed_up = True
+            return
+        print("🔹 Warming up LLM...")
+        self.embeddings().embed_query("warm up")
+        pipe = self.llm().pipeline
+        pipe("Hello", max_new_tokens=1, do_sample=False)
+        self.warmed_up = True
+
+    def reload_vectorstore(self, chroma_dir: Optional[str] = None) -> None:
+        """
+        Swap in a fresh Chroma handle (by default for the active index version)
+        while keeping the loaded LLM and embedding model.
+        """
+        chroma_dir = chroma_dir or active_chroma_dir()
+        with self._lock:
+            if self._vectordb is not None and chroma_dir == self._chroma_dir:
+                return
+            # chromadb shares one System per directory: on a rollback to the
+            # retired version the new handle reuses it, so it must stay open
+            if self._retired_dir not in (None, chroma_dir):
+                close_vectordb(self._retired_dir)
+            self._retired_dir = self._chroma_dir if self._vectordb is not None else None
+            self._vectordb = open_vectordb(self.embeddings(), chroma_dir)
+            self._chroma_dir = chroma_dir
+            self._chain = None
+            self._lexical, self._lexical_loaded = None, False
+            self.vectorstore_version += 1
+        print(f"🔄 Vectorstore handle reloaded (version {self.vectorstore_version}).")
+
+    def release_version(self, chroma_dir: str) -> None:
+        """Close every handle on an index version that is about to be deleted."""
+        with self._lock:
+            if chroma_dir == self._retired_dir:
+                self._retired_dir = None
+            elif chroma_dir == self._chroma_dir:
+                # Lagging behind the pointer: reopen the active one on next use
+                self._vectordb = self._chroma_dir = None
+                self._chain = None
+                self._lexical, self._lexical_loaded = None, False
+            else:
+                return
+        close_vectordb(chroma_dir)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "warmed_up": self.warmed_up,
+            "llm_loaded": self._llm is not None,
+            "backends": {
+                "llm": settings.llm_backend,
+                "embeddings": settings.embedding_backend,
+                "vector_store": settings.vector_store,
+            },
+            "embeddings_loaded": self._embeddings is not None,
+            "vectorstore_loaded": self._vectordb is not None,
+            "vectorstore_version": self.vectorstore_version,
+            "active_index": self._chroma_dir,
+            "lexical_index": self._lexical is not None,
+            "scheduler": self._scheduler.stats() if self._scheduler else None,
+            "inference_server": self._inference_client.stats() if self._inference_client else None,
+            "live_data": self._live_data.stats() if self._live_data else None,
+            "prefix_cache": self._prefix_cache.stats() if self._prefix_cache else None,
+            "answer_cache": self._answer_cache.stats() if self._answer_cache else None,
+            "loaded_at": self.loaded_at,
+            "error": self.error,
+        }
+
+
+# ---------------------------------------------------------------------
+# Global registry instance
+# ---------------------------------------------------------------------
+registry = ResourceRegistry()
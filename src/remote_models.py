@@ -0,0 +1,39 @@
+# src/remote_models.py
+"""
+LangChain wrappers that forward to the shared inference server, used by
+API workers in USE_INFERENCE_SERVER mode in place of the local TinyLlama
+pipeline and MiniLM embeddings.
+"""
+from typing import Any, List, Optional
+
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.llms import LLM
+
+from src.inference_client import InferenceClient
+
+
+class RemoteLLM(LLM):
+    client: Any = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "remote-inference"
+
+    def _call(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> str:
+        return self.client.generate(prompt)
+
+
+class RemoteEmbeddings(Embeddings):
+    def __init__(self, client: InferenceClient, batch_size: int = 64):
+        self.client = client
+        self.batch_size = batch_size
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        texts = list(texts)
+        out: List[List[float]] = []
+        for i in range(0, len(texts), self.batch_size):
+            out.extend(self.client.embed(texts[i:i + self.batch_size]))
+        return out
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.client.embed([text], query=True)[0]
@@ -0,0 +1,80 @@
+# src/retrieval.py
+"""
+Intent-partitioned hybrid retrieval.
+
+Chunks are tagged with intents at ingest (see router.intent_metadata).
+A routed query first searches only its intent's partition and falls back
+to the whole collection when that partition returns too few or too weak
+matches. When a BM25 index is available (see src/lexical.py), vector and
+lexical candidates are merged with reciprocal-rank fusion.
+"""
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from langchain_core.documents import Document
+
+from src.config import settings
+from src.router import intent_metadata_key
+
+RRF_K = 60
+
+
+def _relevance(distance: float) -> float:
+    """Chroma's default squared-L2 distance on unit vectors -> cosine similarity."""
+    return 1.0 - distance / 2.0
+
+
+def _search(vectordb, query_vector: Sequence[float], k: int, intent: Optional[str] = None) -> List[Tuple[Document, float]]:
+    filter_ = {intent_metadata_key(intent): True} if intent else None
+    hits = vectordb.similarity_search_by_vector_with_relevance_scores(list(query_vector), k=k, filter=filter_)
+    return [(doc, _relevance(dist)) for doc, dist in hits]
+
+
+def _doc_key(doc: Document) -> Tuple[str, str]:
+    return doc.metadata.get("source", ""), doc.page_content
+
+
+def reciprocal_rank_fusion(rankings: List[List[Document]], k: int) -> List[Document]:
+    """Merge ranked lists: score(d) = sum over lists of 1 / (RRF_K + rank)."""
+    scores: Dict[Tuple[str, str], float] = {}
+    docs: Dict[Tuple[str, str], Document] = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking, start=1):
+            key = _doc_key(doc)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (RRF_K + rank)
+            docs.setdefault(key, doc)
+    ordered = sorted(scores, key=scores.get, reverse=True)
+    return [docs[key] for key in ordered[:k]]
+
+
+def retrieve(
+    vectordb,
+    embeddings,
+    question: str,
+    intent: str,
+    k: Optional[int] = None,
+    query_vector: Optional[Sequence[float]] = None,
+    lexical=None,
+) -> List[Document]:
+    k = k or settings.retrieval_k
+    if query_vector is None:
+        query_vector = embeddings.embed_query(question)
+    # Fetch a few extra candidates per list when fusing, so RRF has something to reorder
+    n = max(k, settings.hybrid_fetch_k) if lexical is not None else k
+
+    def _lexical(flag: Optional[str] = None) -> List[Document]:
+        if lexical is None:
+            return []
+        return [d for d, _ in lexical.search(question, n, metadata_flag=flag)]
+
+    partition: List[Document] = []
+    if settings.intent_partitioning and intent and intent != "general":
+        partition = [
+            d for d, s in _search(vectordb, query_vector, n, intent)
+            if s >= settings.partition_min_score
+        ]
+        if len(partition) >= k:
+            return reciprocal_rank_fusion([partition, _lexical(intent_metadata_key(intent))], k)
+
+    # Partition too small or weak: fuse what it had with the global collection
+    global_hits = [d for d, _ in _search(vectordb, query_vector, n)]
+    return reciprocal_rank_fusion([partition, global_hits, _lexical()], k)
@@ -1,4 +1,35 @@
 # src/router.py
+import re
+from typing import Dict, List
+
+# Ordered: the first intent whose keyword appears in the question wins
+INTENT_KEYWORDS = [
+    ("weather", ("snow", "weather", "conditions")),
+    ("ski_pass", ("ski pass", "lift ticket", "pass")),
+    ("accommodation", ("accommodation", "hotel", "lodge")),
+    ("transport", ("transport", "bus", "shuttle")),
+    ("dining", ("food", "dining", "restaurant")),
+    ("safety", ("safety", "guidelines", "rules")),
+]
+
+INTENTS = [name for name, _ in INTENT_KEYWORDS]
+
+# Bump when the tagging rules change so ingest re-tags every chunk
+TAGGER_VERSION = 1
+
+_NUMERIC_RE = re.compile(
+    r"\b(?:19|20)\d{2}\b|\b(how many|how much|number of|numbers|compare|comparison|trend|"
+    r"increase|decrease|changed?|average|total|highest|lowest|greatest|most|least|percent)\b|%",
+    re.IGNORECASE,
+)
+
+# Chunk tagging matches keywords at word starts ("pass" hits "passes",
+# not "compassion"); long documents would otherwise match almost everything.
+_TAG_PATTERNS = {
+    name: re.compile(r"\b(?:" + "|".join(re.escape(k) for k in keywords) + ")", re.IGNORECASE)
+    for name, keywords in INTENT_KEYWORDS
+}
+
 
 def route_intent(question: str) -> str:
     """Very simple rule-based intent router.
@@ -6,17 +37,29 @@ def route_intent(question: str) -> str:
     """
     q = question.lower()
 
-    if "snow" in q or "weather" in q or "conditions" in q:
-        return "weather"
-    elif "ski pass" in q or "lift ticket" in q or "pass" in q:
-        return "ski_pass"
-    elif "accommodation" in q or "hotel" in q or "lodge" in q:
-        return "accommodation"
-    elif "transport" in q or "bus" in q or "shuttle" in q:
-        return "transport"
-    elif "food" in q or "dining" in q or "restaurant" in q:
-        return "dining"
-    elif "safety" in q or "guidelines" in q or "rules" in q:
-        return "safety"
-    else:
-        return "general"
+    for name, keywords in INTENT_KEYWORDS:
+        if any(k in q for k in keywords):
+            return name
+    return "general"
+
+
+def is_numeric_question(question: str) -> bool:
+    """Years, counts, comparisons or trends: candidates for the structured fast path."""
+    return bool(_NUMERIC_RE.search(question))
+
+
+def tag_intents(text: str) -> List[str]:
+    """All intents whose keywords occur in a chunk (used at ingest time)."""
+    return [name for name, pattern in _TAG_PATTERNS.items() if pattern.search(text)]
+
+
+def intent_metadata_key(intent: str) -> str:
+    return f"intent_{intent}"
+
+
+def intent_metadata(text: str) -> Dict[str, bool]:
+    """
+    Chroma metadata values must be scalars, so tags are stored as one
+    boolean flag per intent, e.g. {"intent_weather": True}.
+    """
+    return {intent_metadata_key(name): True for name in tag_intents(text)}
@@ -0,0 +1,264 @@
+# src/structured.py
+"""
+Structured query engine for the visitation and snow CSVs.
+
+The CSVs are loaded into one long-format pandas table
+(dataset, season, year, resort, visitors) with normalized resort and
+season names. Numeric / comparison / trend questions are answered from
+it directly, or the exact computed figures are handed to the prompt
+instead of flattened `key: value` rows. When hotham_snow.csv is a live-data
+file, snow figures are read from the live store instead.
+"""
+import re
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.data_paths import is_live_data_file, list_data_files
+from src.generation import current_generation
+
+VISITATION_PATTERN = "historic-visitation-data_table*.csv"
+SNOW_FILE = "hotham_snow.csv"
+
+ALL_RESORTS = "All resorts"
+
+# Lower-cased, space-free spellings -> canonical resort name
+_RESORT_ALIASES = {
+    "mtbawbaw": "Mt Baw Baw", "mountbawbaw": "Mt Baw Baw", "bawbaw": "Mt Baw Baw",
+    "lakemountain": "Lake Mountain",
+    "mtstirling": "Mt Stirling", "mountstirling": "Mt Stirling", "stirling": "Mt Stirling",
+    "mthotham": "Mt Hotham", "mounthotham": "Mt Hotham", "hotham": "Mt Hotham",
+    "fallscreek": "Falls Creek",
+    "mtbuller": "Mt Buller", "mountbuller": "Mt Buller", "buller": "Mt Buller",
+    "all": ALL_RESORTS, "totalacrossallresorts": ALL_RESORTS, "allresorts": ALL_RESORTS,
+}
+
+# How each table shape is described in facts (ARV's historic visitation page)
+DATASET_LABELS = {
+    "winter": "winter visitors",
+    "season": "visitors for the season",
+}
+WINTER_NOTE = "Winter figures for 2007–2021 are rounded to '000s; 2022 is the season-to-date count."
+
+_YEAR_RE = re.compile(r"\b((?:19|20)\d{2})(?:\s*[/-]\s*(\d{2}))?\b")
+_EXPLAIN_RE = re.compile(r"\b(why|factor|factors|cause|caused|indicate|indicates|mean|means|impact|explain)\b", re.I)
+_TREND_RE = re.compile(r"\b(trend|changed?|increase|decrease|growth|decline|recover(?:y|ed)?|between)\b", re.I)
+_RANK_RE = re.compile(r"\b(which resort|greatest|highest|most|largest|lowest|least|biggest)\b", re.I)
+_ALL_RE = re.compile(r"\b(other resorts|all resorts|each resort|every resort|which resort|compare)\b", re.I)
+# The fast path only answers when a figure is actually asked for: a count,
+# ranking, comparison or trend attached to visitation. Other questions that
+# merely mention visitors ("events for visitors in 2022") go to the LLM.
+_VISIT = r"(?:visitation|visitors?|visits)"
+_FIGURE_RE = re.compile(
+    rf"\b(?:how many|number of|numbers of|count of|totals?)\b(?:\W+\w+){{0,3}}?\W+{_VISIT}\b"
+    rf"|\b{_VISIT}\s+(?:numbers?|figures?|counts?|statistics|stats|totals?|data)\b"
+    rf"|\b(?:most|highest|lowest|least|greatest|fewest|largest|biggest)\b(?:\W+\w+){{0,2}}?\W+{_VISIT}\b"
+    r"|\bwhich resort\b",
+    re.I,
+)
+_CHANGE_RE = re.compile(
+    r"\b(trend|changed?|increased?|decreased?|growth|grew|declined?|recover(?:y|ed)?|compare[ds]?|comparison)\b", re.I
+)
+_SNOW_RE = re.compile(r"\b(snowfall|snow depth|how much snow|fresh snow|new snow|snow (?:today|this week|total))\b", re.I)
+
+MAX_FACTS = 24
+
+
+def normalize_resort(name: str) -> Optional[str]:
+    key = re.sub(r"[^a-z]", "", str(name).lower())
+    return _RESORT_ALIASES.get(key)
+
+
+def normalize_season(label) -> Optional[Dict[str, object]]:
+    """'2019/20*' -> season '2019/20', year 2019; 2021 -> season '2021', year 2021."""
+    text = str(label).strip()
+    m = _YEAR_RE.search(text)
+    if not m:
+        return None
+    year = int(m.group(1))
+    if m.group(2):
+        return {"season": f"{year}/{m.group(2)}", "year": year, "footnote": text.endswith("*")}
+    return {"season": str(year), "year": year, "footnote": text.endswith("*")}
+
+
+def _mentioned_resorts(question: str) -> List[str]:
+    q = re.sub(r"[^a-z ]", " ", question.lower())
+    words = q.split()
+    found: List[str] = []
+    # Try three-, two- then one-word windows so "mount stirling" and "hotham" both resolve
+    for n in (3, 2, 1):
+        for i in range(len(words) - n + 1):
+            name = normalize_resort("".join(words[i:i + n]))
+            if name and name != ALL_RESORTS and name not in found:
+                found.append(name)
+    return found
+
+
+def format_count(value: float) -> str:
+    """Visitor count as a whole number with thousands separators."""
+    return f"{int(round(value)):,}"
+
+
+def load_visitation_table(path: Path) -> pd.DataFrame:
+    """
+    One ARV visitation CSV as long-format rows (dataset, season, year,
+    resort, visitors, footnote), with normalized names and visitors in
+    people (the year-indexed winter table is published in thousands).
+    """
+    df = pd.read_csv(path)
+    label_col = df.columns[0]
+    rows = []
+    for _, r in df.iterrows():
+        label = r[label_col]
+        season = normalize_season(label)
+        scale = 1
+        if season is None:
+            # Single "Visitors" row: exact 2022 winter season-to-date counts
+            dataset, season = "winter", {"season": "2022 (to date)", "year": 2022, "footnote": True}
+        elif "/" in season["season"]:
+            dataset = "season"
+        else:
+            # Year-indexed winter table is published in thousands
+            dataset, scale = "winter", 1000
+        for col in df.columns[1:]:
+            resort = normalize_resort(col)
+            if resort is None or pd.isna(r[col]):
+                continue
+            rows.append({"dataset": dataset, **season, "resort": resort,
+                         "visitors": float(r[col]) * scale})
+    return pd.DataFrame(rows)
+
+
+@dataclass
+class StructuredResult:
+    facts: List[str] = field(default_factory=list)
+    answer: Optional[str] = None  # set when the figures fully answer the question
+
+
+class StructuredEngine:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.visitation = pd.DataFrame(columns=["dataset", "season", "year", "resort", "visitors", "footnote"])
+        self.snow: Dict[str, float] = {}
+        self._generation: Optional[int] = None
+
+    # -- loading -------------------------------------------------------
+    def load(self, paths: Optional[List[str]] = None) -> None:
+        paths = paths if paths is not None else list_data_files()
+        frames = []
+        snow: Dict[str, float] = {}
+        for p in paths:
+            path = Path(p)
+            try:
+                if path.match(VISITATION_PATTERN):
+                    frames.append(load_visitation_table(path))
+                elif path.name == SNOW_FILE:
+                    snow = self._load_snow(path)
+            except Exception as e:
+                print(f"[structured] ERROR reading {p}: {e}")
+        with self._lock:
+            if frames:
+                self.visitation = pd.concat(frames, ignore_index=True)
+            self.snow = snow
+            self._generation = current_generation()
+        print(f"✅ Structured tables loaded: {len(self.visitation)} visitation rows, snow={bool(snow)}")
+
+    @staticmethod
+    def _load_snow(path: Path) -> Dict[str, float]:
+        df = pd.read_csv(path)
+        if df.empty:
+            return {}
+        return {str(k): float(v) for k, v in df.iloc[-1].items() if pd.notna(v)}
+
+    def _latest_snow(self) -> Tuple[Dict[str, float], Optional[str]]:
+        """From the live-data store when the snow CSV is a live file, else as loaded at ingest."""
+        if not is_live_data_file(SNOW_FILE):
+            return self.snow, None
+        from src.registry import registry
+
+        reading = registry.live_data().get(SNOW_FILE)
+        if reading is None:
+            return {}, None
+        return {k: v for k, v in reading.values.items() if isinstance(v, float)}, reading.updated_at
+
+    def _ensure_loaded(self) -> None:
+        if self._generation is None or self._generation != current_generation():
+            self.load()
+
+    # -- querying ------------------------------------------------------
+    def query(self, question: str) -> Optional[StructuredResult]:
+        self._ensure_loaded()
+        explain = bool(_EXPLAIN_RE.search(question))
+
+        snow, updated_at = self._latest_snow()
+        if _SNOW_RE.search(question) and snow:
+            facts = [f"Mt Hotham {k.lower()}: {v:g} cm" for k, v in snow.items()]
+            when = f" (updated {updated_at})" if updated_at else ""
+            return StructuredResult(facts, None if explain else f"Latest Mt Hotham snow figures{when}: " + "; ".join(facts) + ".")
+
+        if not re.search(rf"\b{_VISIT}\b", question, re.I) or self.visitation.empty:
+            return None
+        asks_figure = bool(_FIGURE_RE.search(question) or _CHANGE_RE.search(question))
+        if not asks_figure and not re.search(r"\bvisitation\b", question, re.I):
+            return None
+
+        df = self.visitation
+        resorts = _mentioned_resorts(question)
+        years = sorted({int(m.group(1)) for m in _YEAR_RE.finditer(question)})
+        if _ALL_RE.search(question) or not resorts:
+            resorts = sorted(df["resort"].unique())
+
+        sel = df[df["resort"].isin(resorts)]
+        if years:
+            lo, hi = min(years), max(years)
+            sel = sel[sel["year"].isin(years) if not _TREND_RE.search(question) else sel["year"].between(lo, hi)]
+        if sel.empty:
+            return StructuredResult([f"No visitation figures are available for {', '.join(map(str, years)) or 'that period'}."])
+
+        order = {r: i for i, r in enumerate(resorts)}
+        sel = sel.assign(_order=sel["resort"].map(lambda r: (r == ALL_RESORTS, order.get(r, 0))))
+        facts: List[str] = []
+        for (dataset, _, resort), g in sel.sort_values("year").groupby(["dataset", "_order", "resort"]):
+            values = g["visitors"].to_numpy(dtype=np.float64)
+            seasons = g["season"].tolist()
+            pairs = ", ".join(f"{s}: {format_count(v)}" for s, v in zip(seasons, values))
+            line = f"{resort} {DATASET_LABELS[dataset]} — {pairs}"
+            if len(values) >= 2 and values[0]:
+                change = values[-1] - values[0]
+                line += f" (change {seasons[0]}→{seasons[-1]}: {'+' if change >= 0 else ''}{format_count(change)}, {change / values[0] * 100:+.1f}%)"
+            facts.append(line)
+
+        if _RANK_RE.search(question):
+            facts.extend(self._rankings(sel))
+        if (sel["dataset"] == "winter").any():
+            facts.append(WINTER_NOTE)
+
+        facts = facts[-MAX_FACTS:] if len(facts) > MAX_FACTS else facts
+        # Facts only (the LLM writes the answer) unless the figures are the answer
+        answer = None if explain or not asks_figure else "Figures from ARV historic visitation data:\n" + "\n".join(f"- {f}" for f in facts)
+        return StructuredResult(facts, answer)
+
+    @staticmethod
+    def _rankings(sel: pd.DataFrame) -> List[str]:
+        out = []
+        per_resort = sel[sel["resort"] != ALL_RESORTS]
+        for dataset, g in per_resort.groupby("dataset"):
+            pivot = g.pivot_table(index="resort", columns="year", values="visitors", aggfunc="sum")
+            if pivot.shape[1] >= 2:
+                first, last = pivot.columns.min(), pivot.columns.max()
+                growth = ((pivot[last] - pivot[first]) / pivot[first].replace(0, np.nan)).dropna()
+                if not growth.empty:
+                    best = growth.idxmax()
+                    out.append(
+                        f"Greatest relative increase in {DATASET_LABELS[dataset]} {first}→{last}: "
+                        f"{best} ({growth[best] * 100:+.1f}%)"
+                    )
+            else:
+                totals = pivot.iloc[:, 0]
+                best = totals.idxmax()
+                out.append(f"Highest {DATASET_LABELS[dataset]} ({pivot.columns[0]}): {best} ({format_count(totals[best])})")
+        return out
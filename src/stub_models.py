@@ -0,0 +1,118 @@
+# src/stub_models.py
+"""
+Offline stand-ins for the generator and the embedding model (the `stub`
+inference backend), for benchmarks and CI runs without model downloads.
+
+    EchoLLM         deterministic: echoes the opening words of the prompt's
+                    context; optional per-token delay to mimic decoding
+    WordTokenizer   whitespace/punctuation tokens, enough for token budgets
+    HashEmbeddings  feature-hashed word unigrams + bigrams, L2-normalized,
+                    so lexically similar texts still land near each other
+
+/chat, /GetData and /chat/stream all run on the stub. Streaming has no
+incremental decoding here: it sends the sources, then the whole answer as
+one token event, then done. Only micro-batching and the prefix KV cache
+need a real transformers model.
+"""
+import hashlib
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.llms import LLM
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+_WORD_RE = re.compile(r"\w+")
+
+
+class WordTokenizer:
+    """Tokenizer-shaped helper: ids index a vocabulary grown on first sight."""
+
+    eos_token_id = 0
+    pad_token_id = 0
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._ids: Dict[str, int] = {"</s>": 0}
+        self._words: List[str] = ["</s>"]
+
+    def _id(self, token: str) -> int:
+        i = self._ids.get(token)
+        if i is None:
+            with self._lock:
+                i = self._ids.setdefault(token, len(self._words))
+                if i == len(self._words):
+                    self._words.append(token)
+        return i
+
+    def __call__(self, text: str, add_special_tokens: bool = True, **_: Any) -> Dict[str, List[int]]:
+        return {"input_ids": [self._id(t) for t in _TOKEN_RE.findall(text)]}
+
+    def decode(self, ids: List[int], skip_special_tokens: bool = True) -> str:
+        return " ".join(self._words[i] for i in ids if not (skip_special_tokens and i == 0))
+
+
+class _StubPipeline:
+    """The bits of a transformers pipeline the registry touches."""
+
+    model = None
+
+    def __init__(self, llm: "EchoLLM"):
+        self.llm = llm
+        self.tokenizer = llm.tokenizer
+
+    def __call__(self, prompt: str, **_: Any) -> List[Dict[str, str]]:
+        return [{"generated_text": prompt + self.llm.invoke(prompt)}]
+
+
+class EchoLLM(LLM):
+    """Deterministic LLM: answers with the first `max_new_tokens` words of the prompt's context."""
+
+    tokenizer: Any = None
+    max_new_tokens: int = 64
+    token_delay_s: float = 0.0
+
+    def __init__(self, **kwargs: Any):
+        super().__init__(**kwargs)
+        if self.tokenizer is None:
+            self.tokenizer = WordTokenizer()
+
+    @property
+    def _llm_type(self) -> str:
+        return "echo-stub"
+
+    @property
+    def pipeline(self) -> _StubPipeline:
+        return _StubPipeline(self)
+
+    def _call(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> str:
+        context = prompt.rsplit("Context:\n", 1)[-1].split("\n\nAnswer:", 1)[0]
+        words = context.split()[: self.max_new_tokens] or ["No", "context."]
+        if self.token_delay_s:
+            time.sleep(self.token_delay_s * len(words))
+        return " ".join(words)
+
+
+class HashEmbeddings(Embeddings):
+    """Feature hashing of word unigrams and bigrams into `dim` signed buckets."""
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+
+    def _vector(self, text: str) -> List[float]:
+        words = _WORD_RE.findall(text.lower())
+        v = np.zeros(self.dim, dtype=np.float32)
+        for feature in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+            h = int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=8).digest(), "little")
+            v[h % self.dim] += 1.0 if (h >> 63) & 1 else -1.0
+        norm = float(np.linalg.norm(v))
+        return (v / norm if norm else v).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._vector(t) for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._vector(text)
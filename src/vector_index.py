@@ -0,0 +1,400 @@
+# src/vector_index.py
+"""
+Compact memory-mapped vectorstore (VECTOR_STORE=mmap), an alternative to
+Chroma for a corpus this size.
+
+Files inside the index directory (the same versioned directory Chroma
+would use, so blue/green versions and rollback work unchanged):
+    vectors.<gen>.f16   L2-normalized float16 rows, memory-mapped on open
+    ivf.<gen>.npy       IVF centroids (only when IVF is built)
+    index.json          ids, texts, metadata, dim, the optional IVF layout
+                        and the names of the two files above
+
+Each persist() writes its data files under a new generation number and
+then switches to them by atomically replacing index.json, so a crash at
+any point leaves an index.json whose data files still match it. Older
+generations are deleted after the switch.
+
+Search is exact: the rows are scored in blocks of SCORE_BLOCK_ROWS, each
+upcast to float32 only while it is scored (the float16 memmap is never
+copied whole), then argpartition picks the top-k. Batches added before
+persist() stay separate segments and are concatenated once when written.
+With VECTOR_INDEX_NLIST > 0 and enough rows, persist() also clusters the
+rows into `nlist` k-means lists stored contiguously; a query then scores
+the centroids and only the `VECTOR_INDEX_NPROBE` closest lists.
+
+Scores follow Chroma's convention (squared L2 distance on unit vectors,
+2 - 2·cos) so src.retrieval treats both stores the same.
+"""
+import json
+import os
+import threading
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+INDEX_VERSION = 1
+INDEX_FILE = "index.json"
+# Data file names before generations were added (index.json without "vectors_file")
+VECTORS_FILE = "vectors.f16"
+CENTROIDS_FILE = "ivf.npy"
+DATA_GLOBS = ("vectors*.f16", "ivf*.npy")
+# IVF is only worth it with a few dozen rows per list
+IVF_MIN_ROWS_PER_LIST = 32
+KMEANS_ITERATIONS = 10
+# Rows upcast to float32 at a time while scoring (~3 MB at dim 384)
+SCORE_BLOCK_ROWS = 2048
+
+
+def _normalize(arr: np.ndarray) -> np.ndarray:
+    return arr / np.clip(np.linalg.norm(arr, axis=-1, keepdims=True), 1e-12, None)
+
+
+def _kmeans(x: np.ndarray, nlist: int, seed: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """Spherical k-means: (unit centroids [nlist, dim], list id per row)."""
+    rng = np.random.default_rng(seed)
+    centroids = x[rng.choice(len(x), size=nlist, replace=False)].copy()
+    for _ in range(KMEANS_ITERATIONS):
+        assign = np.argmax(x @ centroids.T, axis=1)
+        for c in range(nlist):
+            members = x[assign == c]
+            if len(members):  # an empty list keeps its previous centroid
+                centroids[c] = members.mean(axis=0)
+        centroids = _normalize(centroids)
+    return centroids, np.argmax(x @ centroids.T, axis=1)
+
+
+class _State:
+    """Immutable snapshot; mutations build a new one, so searches never lock."""
+
+    def __init__(
+        self,
+        blocks: Sequence[np.ndarray],
+        ids: List[str],
+        texts: List[str],
+        metadatas: List[dict],
+        centroids: Optional[np.ndarray] = None,
+        offsets: Optional[np.ndarray] = None,
+    ):
+        # float16 [rows, dim] segments in row order: the memmap when freshly
+        # loaded, plus one per batch added since the last persist()
+        self.blocks = [b for b in blocks if len(b)]
+        self.starts = np.cumsum([0] + [len(b) for b in self.blocks])
+        self.ids = ids
+        self.texts = texts
+        self.metadatas = metadatas
+        self.centroids = centroids
+        self.offsets = offsets  # list c holds rows offsets[c]:offsets[c + 1]
+        self._masks: Dict[Tuple[str, Any], np.ndarray] = {}
+
+    @property
+    def dim(self) -> int:
+        return int(self.blocks[0].shape[1]) if self.blocks else 0
+
+    def matrix(self) -> np.ndarray:
+        """All rows as one float16 array (copies when there are several segments)."""
+        if len(self.blocks) == 1:
+            return self.blocks[0]
+        if not self.blocks:
+            return np.zeros((0, 0), dtype=np.float16)
+        return np.concatenate(self.blocks)
+
+    def filtered(self, keep: np.ndarray) -> List[np.ndarray]:
+        """Segments with the rows where `keep` is False removed (untouched segments are shared)."""
+        out = []
+        for block, lo in zip(self.blocks, self.starts):
+            k = keep[lo:lo + len(block)]
+            out.append(block if k.all() else np.asarray(block)[k])
+        return out
+
+    def _take(self, rows: np.ndarray) -> np.ndarray:
+        if len(self.blocks) == 1:
+            return self.blocks[0][rows]
+        out = np.empty((len(rows), self.dim), dtype=np.float16)
+        which = np.searchsorted(self.starts, rows, side="right") - 1
+        for b in np.unique(which):
+            sel = which == b
+            out[sel] = self.blocks[b][rows[sel] - self.starts[b]]
+        return out
+
+    def scores(self, q: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Cosine scores of `rows` (default: all rows), one float32 block at a time."""
+        n = len(self.ids) if rows is None else len(rows)
+        out = np.empty(n, dtype=np.float32)
+        if rows is None:
+            for block, lo in zip(self.blocks, self.starts):
+                for i in range(0, len(block), SCORE_BLOCK_ROWS):
+                    part = block[i:i + SCORE_BLOCK_ROWS]
+                    out[lo + i:lo + i + len(part)] = part.astype(np.float32) @ q
+            return out
+        for i in range(0, n, SCORE_BLOCK_ROWS):
+            part = self._take(rows[i:i + SCORE_BLOCK_ROWS])
+            out[i:i + len(part)] = part.astype(np.float32) @ q
+        return out
+
+    def mask(self, filter_: Dict[str, Any]) -> np.ndarray:
+        out = np.ones(len(self.ids), dtype=bool)
+        for key, value in filter_.items():
+            m = self._masks.get((key, value))
+            if m is None:
+                m = np.fromiter((md.get(key) == value for md in self.metadatas), dtype=bool, count=len(self.ids))
+                self._masks[(key, value)] = m
+            out &= m
+        return out
+
+
+class MmapVectorStore(VectorStore):
+    def __init__(
+        self,
+        persist_directory: str,
+        embedding_function: Embeddings,
+        nlist: int = 0,
+        nprobe: int = 4,
+    ):
+        self.dir = Path(persist_directory)
+        self._embedding = embedding_function
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._state = self._load()
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embedding
+
+    # -- persistence ---------------------------------------------------
+    def _load(self) -> _State:
+        index_path = self.dir / INDEX_FILE
+        empty = _State([], [], [], [])
+        if not index_path.exists():
+            return empty
+        try:
+            meta = json.loads(index_path.read_text(encoding="utf-8"))
+            if meta.get("version") != INDEX_VERSION:
+                print(f"[vector_index] NOTE: index format changed, starting empty: {self.dir}")
+                return empty
+            vectors_path = self.dir / meta.get("vectors_file", VECTORS_FILE)
+            n, dim = len(meta["ids"]), int(meta["dim"])
+            if vectors_path.stat().st_size != n * dim * 2:
+                print(f"[vector_index] WARNING: {vectors_path} does not match {INDEX_FILE}, starting empty")
+                return empty
+            blocks = [np.memmap(vectors_path, dtype=np.float16, mode="r", shape=(n, dim))] if n else []
+            ivf = meta.get("ivf")
+            centroids = np.load(self.dir / meta.get("centroids_file", CENTROIDS_FILE)) if ivf else None
+            offsets = np.asarray(ivf["offsets"], dtype=np.int64) if ivf else None
+            self._generation = int(meta.get("generation", 0))
+            return _State(blocks, meta["ids"], meta["texts"], meta["metadatas"], centroids, offsets)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"[vector_index] WARNING: could not load {self.dir}, starting empty: {e}")
+            return empty
+
+    def _remove_data_files(self, keep: Sequence[str] = ()) -> None:
+        for pattern in DATA_GLOBS:
+            for path in self.dir.glob(pattern):
+                if path.name not in keep:
+                    try:
+                        path.unlink()
+                    except OSError:  # e.g. still mapped on Windows; retried next persist
+                        pass
+
+    def persist(self) -> None:
+        """Write vectors + sidecar (rows regrouped by IVF list when IVF applies)."""
+        with self._lock:
+            state = self._state
+            n = len(state.ids)
+            centroids = offsets = None
+            order = np.arange(n)
+            # The only concatenation of the batches added since the last persist
+            vectors = np.asarray(state.matrix())
+            if self.nlist and n >= self.nlist * IVF_MIN_ROWS_PER_LIST:
+                centroids, assign = _kmeans(vectors.astype(np.float32), self.nlist)
+                order = np.argsort(assign, kind="stable")
+                offsets = np.searchsorted(assign[order], np.arange(self.nlist + 1))
+                vectors = vectors[order]
+            vectors = np.ascontiguousarray(vectors, dtype=np.float16)
+            ids = [state.ids[i] for i in order]
+            texts = [state.texts[i] for i in order]
+            metadatas = [state.metadatas[i] for i in order]
+
+            # New data files never overwrite the ones index.json names now
+            self.dir.mkdir(parents=True, exist_ok=True)
+            generation = self._generation + 1
+            vectors_file = f"vectors.{generation}.f16"
+            with open(self.dir / vectors_file, "wb") as f:
+                vectors.tofile(f)
+                f.flush()
+                os.fsync(f.fileno())
+            centroids_file = None
+            if centroids is not None:
+                centroids_file = f"ivf.{generation}.npy"
+                np.save(self.dir / centroids_file, centroids.astype(np.float32))
+            meta = {
+                "version": INDEX_VERSION,
+                "generation": generation,
+                "vectors_file": vectors_file,
+                "centroids_file": centroids_file,
+                "dim": int(vectors.shape[1]) if n else 0,
+                "ids": ids,
+                "texts": texts,
+                "metadatas": metadatas,
+                "ivf": {"nlist": self.nlist, "offsets": offsets.tolist()} if centroids is not None else None,
+            }
+            # The switch: one atomic rename of index.json
+            tmp = self.dir / (INDEX_FILE + ".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(json.dumps(meta, ensure_ascii=False))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.dir / INDEX_FILE)
+            self._generation = generation
+            self._remove_data_files(keep=(vectors_file, centroids_file))
+            self._state = _State([vectors], ids, texts, metadatas, centroids, offsets)
+
+    def delete_collection(self) -> None:
+        with self._lock:
+            # index.json first: it must never name files that are gone
+            (self.dir / INDEX_FILE).unlink(missing_ok=True)
+            self._remove_data_files()
+            self._state = _State([], [], [], [])
+
+    # -- writes --------------------------------------------------------
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> List[str]:
+        texts = list(texts)
+        if not texts:
+            return []
+        ids = list(ids) if ids else [str(uuid.uuid4()) for _ in texts]
+        metadatas = list(metadatas) if metadatas else [{} for _ in texts]
+        new = _normalize(np.asarray(self._embedding.embed_documents(texts), dtype=np.float32)).astype(np.float16)
+        replaced = set(ids)
+        with self._lock:
+            state = self._state
+            # Upsert semantics (as in Chroma): re-added ids replace their old
+            # rows. The batch becomes its own segment; persist() joins them
+            keep = np.fromiter((i not in replaced for i in state.ids), dtype=bool, count=len(state.ids))
+            self._state = _State(
+                state.filtered(keep) + [new],
+                [i for i, k in zip(state.ids, keep) if k] + ids,
+                [t for t, k in zip(state.texts, keep) if k] + texts,
+                [m for m, k in zip(state.metadatas, keep) if k] + metadatas,
+            )
+        return ids
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        if not ids:
+            return None
+        drop = set(ids)
+        with self._lock:
+            state = self._state
+            keep = np.fromiter((i not in drop for i in state.ids), dtype=bool, count=len(state.ids))
+            self._state = _State(
+                state.filtered(keep),
+                [i for i, k in zip(state.ids, keep) if k],
+                [t for t, k in zip(state.texts, keep) if k],
+                [m for m, k in zip(state.metadatas, keep) if k],
+            )
+        return True
+
+    # -- reads ---------------------------------------------------------
+    def get(
+        self,
+        ids: Optional[List[str]] = None,
+        include: Sequence[str] = ("documents", "metadatas"),
+        limit: Optional[int] = None,
+        offset: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """Chroma-style dump of stored chunks, pageable with limit/offset (used to rebuild the BM25 sidecar)."""
+        state = self._state
+        rows = range(len(state.ids))
+        if ids is not None:
+            wanted = set(ids)
+            rows = [r for r in rows if state.ids[r] in wanted]
+        start = offset or 0
+        rows = rows[start:start + limit if limit is not None else None]
+        out: Dict[str, Any] = {"ids": [state.ids[r] for r in rows]}
+        if "documents" in include:
+            out["documents"] = [state.texts[r] for r in rows]
+        if "metadatas" in include:
+            out["metadatas"] = [state.metadatas[r] for r in rows]
+        return out
+
+    def _candidates(self, state: _State, q: np.ndarray) -> Optional[np.ndarray]:
+        """Row indices of the nprobe closest IVF lists (None = scan everything)."""
+        if state.centroids is None:
+            return None
+        probe = np.argsort(-(state.centroids @ q))[: self.nprobe]
+        return np.concatenate([np.arange(state.offsets[c], state.offsets[c + 1]) for c in probe])
+
+    def similarity_search_by_vector_with_relevance_scores(
+        self, embedding: Sequence[float], k: int = 4, filter: Optional[Dict[str, Any]] = None, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        """Top-k docs with Chroma-compatible distances (2 - 2·cos)."""
+        state = self._state
+        if not state.ids:
+            return []
+        q = _normalize(np.asarray(embedding, dtype=np.float32))
+        rows = self._candidates(state, q)
+        if filter:
+            mask = state.mask(filter)
+            rows = np.flatnonzero(mask) if rows is None else rows[mask[rows]]
+        scores = state.scores(q, rows)
+        if not len(scores):
+            return []
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        out = []
+        for i in top:
+            r = int(i if rows is None else rows[i])
+            doc = Document(page_content=state.texts[r], metadata=dict(state.metadatas[r]))
+            out.append((doc, float(2.0 - 2.0 * scores[i])))
+        return out
+
+    def similarity_search_with_score(
+        self, query: str, k: int = 4, filter: Optional[Dict[str, Any]] = None, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        return self.similarity_search_by_vector_with_relevance_scores(
+            self._embedding.embed_query(query), k=k, filter=filter
+        )
+
+    def similarity_search_by_vector(
+        self, embedding: List[float], k: int = 4, filter: Optional[Dict[str, Any]] = None, **kwargs: Any
+    ) -> List[Document]:
+        return [d for d, _ in self.similarity_search_by_vector_with_relevance_scores(embedding, k, filter)]
+
+    def similarity_search(
+        self, query: str, k: int = 4, filter: Optional[Dict[str, Any]] = None, **kwargs: Any
+    ) -> List[Document]:
+        return [d for d, _ in self.similarity_search_with_score(query, k, filter)]
+
+    def _select_relevance_score_fn(self) -> Callable[[float], float]:
+        return lambda distance: 1.0 - distance / 2.0
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: List[str],
+        embedding: Embeddings,
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        persist_directory: Optional[str] = None,
+        **kwargs: Any,
+    ) -> "MmapVectorStore":
+        store = cls(persist_directory or "data/chroma", embedding, **kwargs)
+        store.add_texts(texts, metadatas, ids)
+        store.persist()
+        return store
+
+    def __len__(self) -> int:
+        return len(self._state.ids)
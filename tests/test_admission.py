@@ -0,0 +1,50 @@
+# tests/test_admission.py
+"""/chat/stream holds its admission slot only while the body runs."""
+import asyncio
+
+import pytest
+
+from src import api
+from src.admission import AdmissionQueue, Overloaded
+from src.api import ChatRequest, chat_stream_endpoint
+
+
+class _Request:
+    async def is_disconnected(self):
+        return False
+
+
+@pytest.fixture()
+def queue(monkeypatch):
+    q = AdmissionQueue("test", concurrency=1, max_queue=0, queue_timeout_s=1, deadline_s=5)
+    monkeypatch.setattr(api, "chat_queue", q)
+    monkeypatch.setattr("src.rag_chain.stream_answer", _stream_answer)
+    return q
+
+
+def _stream_answer(*args, **kwargs):
+    yield {"event": "sources", "data": {}}
+    yield {"event": "done", "data": {"answer": "ok"}}
+
+
+def test_unstarted_stream_holds_no_slot(queue):
+    async def scenario():
+        # Response built but its body never iterated (client gone before the first send)
+        await chat_stream_endpoint(ChatRequest(message="hi"), _Request())
+        assert queue.running == 0
+        response = await chat_stream_endpoint(ChatRequest(message="hi"), _Request())
+        body = [chunk async for chunk in response.body_iterator]
+        assert [c.split("\n")[0] for c in body] == ["event: sources", "event: done"]
+        assert queue.running == 0 and queue.admitted == 1
+
+    asyncio.run(scenario())
+
+
+def test_full_queue_is_rejected_up_front(queue):
+    async def scenario():
+        async with queue.admit():
+            with pytest.raises(Overloaded):
+                await chat_stream_endpoint(ChatRequest(message="hi"), _Request())
+        assert queue.running == 0
+
+    asyncio.run(scenario())
@@ -0,0 +1,27 @@
+# tests/test_chunkers.py
+"""Site-page chunker keeps the scraped visitation-statistics links."""
+from src.chunkers import chunk_site_pages
+from src.lexical import LexicalIndex
+
+STATS_URL = "https://www.alpineresorts.vic.gov.au/the-resorts/visitation-statistics/historic-visitation-data"
+PAGES = {
+    "www.alpineresorts.vic.gov.au_home": {
+        "headings": ["Alpine Resorts Victoria"],
+        "paragraphs": ["Six alpine resorts across Victoria's high country."],
+        "lists": [["Home", "The resorts"]],
+        "visitation_links": [STATS_URL, STATS_URL],
+    },
+    "www.mthotham.com.au_": {"headings": ["Lift passes"], "paragraphs": ["Buy passes online."], "lists": []},
+}
+
+
+def test_visitation_links_are_indexed_once():
+    docs = chunk_site_pages(PAGES, "site_data.json")
+    text = "\n".join(d.page_content for d in docs)
+    assert text.count(STATS_URL) == 1
+    assert "Links on this page" in text
+
+    index = LexicalIndex.build([str(i) for i in range(len(docs))], [d.page_content for d in docs],
+                               [d.metadata for d in docs])
+    top, _ = index.search("where do the visitation statistics come from", 1)[0]
+    assert STATS_URL in top.page_content
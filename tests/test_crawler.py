@@ -0,0 +1,100 @@
+# tests/test_crawler.py
+"""SiteCrawler against a local stand-in server serving tests/fixtures/site/."""
+import asyncio
+import hashlib
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+from src.crawler import SiteCrawler
+
+FIXTURES = Path(__file__).parent / "fixtures" / "site"
+
+
+class _FixtureHandler(BaseHTTPRequestHandler):
+    """Serves fixture files with an ETag and answers If-None-Match with 304."""
+
+    requests: Counter = Counter()
+    not_modified: Counter = Counter()
+
+    def do_GET(self):
+        path = FIXTURES / self.path.lstrip("/")
+        if path.is_dir():
+            path = path / "index.html"
+        if not path.is_file():
+            self.send_error(404)
+            return
+        body = path.read_bytes()
+        etag = '"%s"' % hashlib.sha1(body).hexdigest()
+        self.requests[self.path] += 1
+        if self.headers.get("If-None-Match") == etag:
+            self.not_modified[self.path] += 1
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture()
+def site():
+    _FixtureHandler.requests.clear()
+    _FixtureHandler.not_modified.clear()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _FixtureHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+def _crawl(cache_dir, seed, depth):
+    return asyncio.run(SiteCrawler(str(cache_dir), max_concurrency=2).crawl([seed], max_depth=depth))
+
+
+def test_depth_one_fetches_only_the_seed(site, tmp_path):
+    result = _crawl(tmp_path, f"{site}/docs/index.html", 1)
+    assert [d.metadata["source"] for d in result.documents] == [f"{site}/docs/index.html"]
+    assert set(_FixtureHandler.requests) == {"/docs/index.html"}
+
+
+def test_links_stay_under_the_seed_prefix(site, tmp_path):
+    result = _crawl(tmp_path, f"{site}/docs/", 2)
+    assert "/news.html" not in _FixtureHandler.requests
+    assert {"/docs/parking.html", "/docs/parking-copy.html"} <= set(_FixtureHandler.requests)
+    # parking-copy.html has the same text as parking.html
+    assert result.stats.duplicate_content == 1
+    assert result.stats.skipped_urls == 2
+    assert len(result.documents) == 2
+
+
+def test_second_crawl_revalidates_and_reuses_the_cache(site, tmp_path):
+    first = _crawl(tmp_path, f"{site}/docs/", 2)
+    assert first.stats.fetched == 3 and first.stats.not_modified == 0
+
+    second = _crawl(tmp_path, f"{site}/docs/", 2)
+    assert second.stats.fetched == 0
+    assert second.stats.not_modified == 3
+    assert sum(_FixtureHandler.not_modified.values()) == 3
+    assert [d.page_content for d in second.documents] == [d.page_content for d in first.documents]
+
+
+def test_cached_documents_need_no_network(site, tmp_path):
+    _crawl(tmp_path, f"{site}/docs/", 2)
+    served = sum(_FixtureHandler.requests.values())
+    docs = SiteCrawler(str(tmp_path)).cached_documents()
+    assert sum(_FixtureHandler.requests.values()) == served
+    assert sorted(d.page_content for d in docs) == sorted(
+        d.page_content for d in _crawl(tmp_path, f"{site}/docs/", 2).documents
+    )
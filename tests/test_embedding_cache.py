@@ -0,0 +1,62 @@
+# tests/test_embedding_cache.py
+"""EmbeddingCache single-writer enforcement."""
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from src.embedding_cache import EmbeddingCache
+
+pytest.importorskip("fcntl")
+
+
+def _vec(i, dim=8):
+    return np.full(dim, float(i), dtype=np.float32)
+
+
+def _fill(cache, texts):
+    cache.put_many([cache.key(t) for t in texts], [_vec(int(t.split()[-1])) for t in texts])
+    cache.flush()
+
+
+def test_second_open_is_read_only(tmp_path):
+    owner = EmbeddingCache(str(tmp_path), "m", max_entries=10)
+    _fill(owner, [f"text {i}" for i in range(5)])
+    reader = EmbeddingCache(str(tmp_path), "m", max_entries=10)
+    assert not owner.read_only and reader.read_only
+
+    reader.put_many([reader.key("text 99")], [_vec(99)])
+    reader.flush()
+    assert reader.get_many([reader.key("text 99")]) == [None]
+    assert owner.get_many([owner.key("text 99")]) == [None]
+    assert reader.get_many([reader.key("text 3")])[0][0] == 3.0
+
+
+def test_reader_snapshot_survives_owner_eviction(tmp_path):
+    owner = EmbeddingCache(str(tmp_path), "m", max_entries=10)
+    _fill(owner, [f"text {i}" for i in range(10)])
+    reader = EmbeddingCache(str(tmp_path), "m", max_entries=10)
+    # The owner evicts and overwrites slots the reader's index still names
+    _fill(owner, [f"text {i}" for i in range(100, 110)])
+
+    found = reader.get_many([reader.key(f"text {i}") for i in range(10)])
+    assert [v[0] for v in found] == [float(i) for i in range(10)]
+    # A reader opening now sees the owner's current index
+    late = EmbeddingCache(str(tmp_path), "m", max_entries=10)
+    for i, v in zip(range(100, 110), late.get_many([late.key(f"text {i}") for i in range(100, 110)])):
+        assert v is None or v[0] == float(i)
+
+
+def test_lock_is_per_process_and_released_on_close(tmp_path):
+    owner = EmbeddingCache(str(tmp_path), "m", max_entries=10)
+    _fill(owner, ["text 1"])
+    probe = (
+        "from src.embedding_cache import EmbeddingCache;"
+        f"c = EmbeddingCache({str(tmp_path)!r}, 'm', max_entries=10);"
+        "print(c.read_only, c.get_many([c.key('text 1')])[0][0])"
+    )
+    run = lambda: subprocess.run([sys.executable, "-c", probe], capture_output=True, text=True, check=True)
+    assert run().stdout.split()[-2:] == ["True", "1.0"]
+    owner.close()
+    assert run().stdout.split()[-2:] == ["False", "1.0"]
@@ -0,0 +1,68 @@
+# tests/test_ingest.py
+"""Blue/green ingest: a refresh that changes nothing keeps the active version."""
+from pathlib import Path
+
+import pytest
+
+from src import index_versions
+from src.config import settings
+from src.ingest import run_ingest
+from src.registry import registry
+
+
+@pytest.fixture()
+def isolated_index(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "chroma_dir", str(tmp_path / "chroma"))
+    monkeypatch.setattr(settings, "data_dir", str(tmp_path))
+    monkeypatch.setattr(settings, "vector_store", "mmap")
+    monkeypatch.setattr(settings, "embedding_backend", "stub")
+    monkeypatch.setattr(settings, "embed_cache_enabled", False)
+    monkeypatch.setattr(settings, "use_inference_server", False)
+    monkeypatch.setattr(index_versions, "_cached", None)
+    monkeypatch.setattr(registry, "_embeddings", None)
+    yield tmp_path
+    for d in (registry._retired_dir, registry._chroma_dir):
+        if d:
+            registry.release_version(d)
+    registry._embeddings = None
+
+
+def test_unchanged_refresh_does_not_activate_a_copy(isolated_index):
+    first = run_ingest()
+    assert first["ok"] and first["added"] > 0
+    second = run_ingest()
+    assert second["ok"] and second["added"] == second["removed"] == 0
+
+    # Same active index, nothing new on disk, previous untouched
+    assert second["active_index"] == first["active_index"]
+    assert second["previous_index"] == first["previous_index"]
+    assert index_versions.list_versions() == [first["active_index"]]
+    assert Path(first["active_index"]).exists()
+
+    rebuilt = run_ingest(full_rebuild=True)
+    assert rebuilt["active_index"] != first["active_index"]
+    assert rebuilt["previous_index"] == first["active_index"]
+
+
+def test_swapped_out_chroma_versions_are_released(isolated_index, monkeypatch):
+    shared = pytest.importorskip("chromadb.api.shared_system_client")
+    monkeypatch.setattr(settings, "vector_store", "chroma")
+    monkeypatch.setattr(settings, "index_versions_keep", 2)
+    systems = shared.SharedSystemClient._identifier_to_system
+    monkeypatch.setattr(shared.SharedSystemClient, "_identifier_to_system", dict(systems))
+    systems = shared.SharedSystemClient._identifier_to_system
+    before = set(systems)
+
+    for _ in range(4):
+        res = run_ingest(full_rebuild=True)
+        registry.reload_vectorstore(res["active_index"])  # what the job's on_success does
+        assert registry.vectordb().get(limit=1)["ids"]
+
+    on_disk = set(index_versions.list_versions())
+    open_dirs = set(systems) - before
+    assert len(on_disk) == 2
+    # The active handle plus the one swapped out last, both still on disk
+    assert open_dirs <= on_disk and registry._chroma_dir in open_dirs
+    for d in list(open_dirs):
+        registry.release_version(d)
+    assert not set(systems) - before
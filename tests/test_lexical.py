@@ -0,0 +1,39 @@
+# tests/test_lexical.py
+"""BM25 sidecar: the paged rebuild matches a one-shot build."""
+import numpy as np
+
+from src import ingest
+from src.data_paths import index_sidecar_path
+from src.lexical import LexicalIndex
+from src.vector_index import MmapVectorStore
+
+TEXTS = [f"Lift pass {i} at Mount Hotham, season 2019/20 row {i % 5}" for i in range(23)]
+
+
+class _Embeddings:
+    def embed_documents(self, texts):
+        return [[1.0, float(len(t))] for t in texts]
+
+    def embed_query(self, text):
+        return [1.0, 0.0]
+
+
+def test_paged_rebuild_matches_one_shot(tmp_path, monkeypatch):
+    monkeypatch.setattr(ingest, "LEXICAL_PAGE_SIZE", 7)
+    chroma_dir = str(tmp_path / "chroma")
+    store = MmapVectorStore(chroma_dir, _Embeddings())
+    ids = [f"c{i}" for i in range(len(TEXTS))]
+    metadatas = [{"row": i} for i in range(len(TEXTS))]
+    store.add_texts(TEXTS, metadatas, ids=ids)
+
+    ingest.build_lexical_index(store, chroma_dir)
+    paged = LexicalIndex.load(index_sidecar_path("bm25", chroma_dir))
+    whole = LexicalIndex.build(ids, TEXTS, metadatas)
+
+    assert paged.ids == whole.ids and paged.metadatas == whole.metadatas
+    assert paged.vocab == whole.vocab
+    for name in ("offsets", "doc_ids", "tfs", "doc_len"):
+        assert np.array_equal(getattr(paged, name), getattr(whole, name))
+    assert [d.page_content for d, _ in paged.search("hotham row 3", 3)] == [
+        d.page_content for d, _ in whole.search("hotham row 3", 3)
+    ]
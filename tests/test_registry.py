@@ -0,0 +1,44 @@
+# tests/test_registry.py
+"""ResourceRegistry accessors under a concurrent vectorstore reload."""
+import threading
+
+from src import rag_chain
+from src.registry import ResourceRegistry
+
+
+class _ReloadOnRelease:
+    """RLock that runs `hook` once, right after the outermost release."""
+
+    def __init__(self, hook):
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._hook = hook
+
+    def __enter__(self):
+        self._lock.__enter__()
+        self._depth += 1
+
+    def __exit__(self, *exc):
+        self._depth -= 1
+        outermost = self._depth == 0
+        self._lock.__exit__(*exc)
+        if outermost and self._hook is not None:
+            hook, self._hook = self._hook, None
+            hook()
+
+
+def test_chain_is_never_none_when_reset_after_build(monkeypatch):
+    reg = ResourceRegistry()
+    for name in ("llm", "vectordb", "embeddings", "lexical", "prefix_cache"):
+        monkeypatch.setattr(reg, name, lambda: None)
+    built = object()
+    monkeypatch.setattr(rag_chain, "build_chain", lambda *args: built)
+
+    def reload_in_between():
+        # What reload_vectorstore() does to the chain from another request
+        reg._chain = None
+
+    reg._lock = _ReloadOnRelease(reload_in_between)
+    assert reg.chain() is built
+    assert reg._chain is None  # the reset happened; the next call rebuilds
+    assert reg.chain() is built
@@ -0,0 +1,43 @@
+# tests/test_structured.py
+"""The structured fast path must only answer questions that ask for a figure."""
+import pytest
+
+from src.data_paths import list_data_files
+from src.router import is_numeric_question
+from src.structured import StructuredEngine
+
+
+@pytest.fixture(scope="module")
+def engine() -> StructuredEngine:
+    e = StructuredEngine()
+    e.load(list_data_files(include_live=True))
+    return e
+
+
+@pytest.mark.parametrize("question", [
+    "What events are on for visitors in 2022?",
+    "What are the most popular runs for visitors at Hotham?",
+    "What is the total cost of parking for visitors?",
+])
+def test_non_figure_questions_are_not_answered(engine, question):
+    # These pass the numeric pre-filter but do not ask for visitation figures
+    assert is_numeric_question(question)
+    result = engine.query(question)
+    assert result is None or result.answer is None
+
+
+@pytest.mark.parametrize("question", [
+    "How many visitors did Mt Hotham have in 2019?",
+    "Which resort had the most visitors in 2019?",
+    "Compare visitors at Hotham and Falls Creek in 2018",
+    "What were the visitor numbers for Mt Buller in 2015?",
+])
+def test_figure_questions_are_answered(engine, question):
+    result = engine.query(question)
+    assert result is not None and result.answer
+    assert result.answer.startswith("Figures from ARV historic visitation data")
+
+
+def test_explain_questions_get_facts_only(engine):
+    result = engine.query("Why did Mt Hotham visitation decrease between 2019 and 2020?")
+    assert result is not None and result.facts and result.answer is None
@@ -0,0 +1,89 @@
+# tests/test_vector_index.py
+"""MmapVectorStore: blockwise scoring over unpersisted segments and the memmap."""
+import zlib
+
+import numpy as np
+import pytest
+
+from src import vector_index
+from src.vector_index import MmapVectorStore
+
+
+class _Embeddings:
+    def embed_documents(self, texts):
+        return [np.random.default_rng(zlib.crc32(t.encode())).normal(size=16).tolist() for t in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+@pytest.fixture()
+def store(tmp_path, monkeypatch):
+    # Small blocks so every search crosses block and segment boundaries
+    monkeypatch.setattr(vector_index, "SCORE_BLOCK_ROWS", 7)
+    s = MmapVectorStore(str(tmp_path), _Embeddings())
+    for b in range(6):
+        s.add_texts([f"doc {b}-{i}" for i in range(10)], [{"odd": b % 2} for _ in range(10)],
+                    ids=[f"{b}-{i}" for i in range(10)])
+    return s
+
+
+def _brute_force(store, query, k, odd=None):
+    state = store._state
+    q = vector_index._normalize(np.asarray(store.embeddings.embed_query(query), dtype=np.float32))
+    scores = state.matrix().astype(np.float32) @ q
+    rows = [r for r in np.argsort(-scores) if odd is None or state.metadatas[r]["odd"] == odd]
+    return [state.texts[r] for r in rows[:k]]
+
+
+def test_batches_stay_segments_until_persist(store, tmp_path):
+    assert len(store._state.blocks) == 6
+    store.add_texts(["doc 2-2 again"], [{"odd": 0}], ids=["2-2"])  # upsert
+    store.delete(["0-0"])
+    assert len(store) == 59
+    assert store.get(["2-2"])["documents"] == ["doc 2-2 again"]
+    store.persist()
+    assert len(store._state.blocks) == 1
+    reopened = MmapVectorStore(str(tmp_path), _Embeddings())
+    assert isinstance(reopened._state.blocks[0], np.memmap)
+    assert reopened.get()["ids"] == store.get()["ids"]
+
+
+@pytest.mark.parametrize("persisted", [False, True])
+def test_blockwise_search_matches_brute_force(store, persisted):
+    if persisted:
+        store.persist()
+    for query in ("doc 3-4", "doc 5-9", "something else"):
+        got = [d.page_content for d in store.similarity_search(query, k=5)]
+        assert got == _brute_force(store, query, 5)
+        got = [d.page_content for d in store.similarity_search(query, k=5, filter={"odd": 1})]
+        assert got == _brute_force(store, query, 5, odd=1)
+
+
+def test_crash_before_the_index_switch_keeps_the_old_generation(store, tmp_path, monkeypatch):
+    store.persist()
+    before = store.get()
+    query = [d.page_content for d in store.similarity_search("doc 3-4", k=3)]
+
+    # Same row count, different rows: only the index.json switch can tell them apart
+    store.delete(["1-1"])
+    store.add_texts(["something new entirely"], [{"odd": 1}], ids=["new"])
+    real_replace = vector_index.os.replace
+
+    def crash(src, dst):
+        if str(dst).endswith(vector_index.INDEX_FILE):
+            raise OSError("simulated crash")
+        real_replace(src, dst)
+
+    monkeypatch.setattr(vector_index.os, "replace", crash)
+    with pytest.raises(OSError):
+        store.persist()
+    monkeypatch.setattr(vector_index.os, "replace", real_replace)
+
+    reopened = MmapVectorStore(str(tmp_path), _Embeddings())
+    assert reopened.get() == before
+    assert [d.page_content for d in reopened.similarity_search("doc 3-4", k=3)] == query
+
+    reopened.add_texts(["after restart"], ids=["later"])
+    reopened.persist()
+    assert sorted(p.name for p in tmp_path.glob("vectors*.f16")) == ["vectors.2.f16"]